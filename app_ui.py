@@ -0,0 +1,269 @@
+# app_ui.py
+# catch.py / main.py 가 같이 쓰는 Streamlit 화면 조각 (보드 그리기, 애니메이션 재생, 실행 / 힌트, 맵 은행, 큰 맵 모드, 관리자 사이드바)
+import base64
+import json
+import os
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+import metrics
+from metrics import phase
+from game_core import MAP_SIZE, render_grid, new_map_state
+from map_bank import MapBank
+from board_render import TILE_SIZE, BoardRenderer, map_renderer
+from commands import compile_commands
+from engine import simulate, iter_frames, simulate_board, OUTCOME_CLEAR, OUTCOME_CRASH, OUTCOME_CAUGHT
+from large_grid import distance_field, new_board_state
+from solver import map_solution, is_perfect, hint_plan, portal_plan
+
+OUTCOME_MESSAGES = {
+    OUTCOME_CRASH: '❌ 장애물 충돌 또는 벽 밖으로 벗어남',
+    OUTCOME_CAUGHT: '👻 귀신에게 잡힘!',
+}
+
+HINT_COST = 30  # AI 힌트 한 번에 빠지는 누적 점수
+
+# 사이드바에서 켤 때 샘플을 내보낼 곳. ROBOT_METRICS 가 있으면 그것, 없으면 두 앱 모두 SQLite 표
+ADMIN_METRICS_SINK = os.environ.get(metrics.METRICS_ENV) or "sqlite"
+
+
+def rerun():
+    try:
+        st.rerun()
+    except Exception:
+        st.experimental_rerun()
+
+
+def query_param(name):
+    try:
+        return st.query_params.get(name)
+    except AttributeError:
+        return st.experimental_get_query_params().get(name, [None])[0]  # 예전 버전
+
+
+# ----------------------------- 맵 ----------------------------- #
+@st.cache_resource
+def get_map_bank():
+    """프로세스 전체가 같이 쓰는 맵 은행 (세션마다 새로 만들지 않음)"""
+    return MapBank().start()
+
+
+def new_game(level_name):
+    """맵 은행에서 다음 맵을 꺼내 새 판 상태를 만든다"""
+    with phase("generate_map"):
+        seed, layout = get_map_bank().take(level_name)
+        return new_map_state(level_name, seed, layout)
+
+
+# ----------------------------- 보드 ----------------------------- #
+def draw_grid(position, direction, ghost, ghost_path, obstacles, goals, portals, renderer=None):
+    """renderer(board_render.BoardRenderer)를 주면 이미지로, 아니면 이모지 문자열로"""
+    if renderer is not None:
+        st.image(renderer.png(position, direction, ghost, ghost_path))
+    else:
+        st.text(render_grid(position, direction, ghost, ghost_path, obstacles, goals, portals))
+
+
+def png_data_url(data):
+    return "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+
+
+def run_frames(s, run, images=False):
+    """engine.simulate(record=True) 결과의 장면 목록. images=True 면 PNG data URL, 아니면 이모지 문자열"""
+    frames = []
+    ghost_path = []
+    for frame_pos, frame_dir, frame_ghost in iter_frames(run['trajectory']):
+        if frame_ghost:
+            ghost_path.append(frame_ghost)
+        if images:
+            frames.append(png_data_url(map_renderer(s).png(frame_pos, frame_dir, frame_ghost, ghost_path)))
+        else:
+            frames.append(render_grid(frame_pos, frame_dir, frame_ghost, ghost_path, s['obstacles'], s['goals'], s['portals']))
+    return frames
+
+
+def play_frames(frames, delay_ms, images=False):
+    """미리 만든 장면들을 브라우저에서 재생한다 (서버는 기다리지 않음)
+
+    images=True 이면 frames 는 PNG data URL 목록이다.
+    """
+    if images:
+        board = '<img id="board" style="display: block;">'
+        show = "board.src = frames[%s];"
+        height = MAP_SIZE * TILE_SIZE + 20
+    else:
+        board = '<pre id="board" style="font-family: monospace; font-size: 1rem; line-height: 1.4; margin: 0;"></pre>'
+        show = "board.textContent = frames[%s];"
+        height = MAP_SIZE * 26 + 20
+    html = """
+    %s
+    <script>
+      const frames = %s;
+      const board = document.getElementById("board");
+      let i = 0;
+      %s
+      const timer = setInterval(() => {
+        i += 1;
+        if (i >= frames.length) { clearInterval(timer); return; }
+        %s
+      }, %d);
+    </script>
+    """ % (board, json.dumps(frames), show % "0", show % "i", delay_ms)
+    try:
+        st.iframe(html, height=height)
+    except AttributeError:
+        components.html(html, height=height)  # st.iframe 이 없는 예전 버전
+
+
+# ----------------------------- 실행 / 힌트 ----------------------------- #
+def run_program(s, program, command_list, delay_ms, skip_animation=False, images=False):
+    """실행 버튼 한 번: 엔진으로 끝까지 돌려 장면을 재생하고 결과 / 점수 / Perfect 를 s 에 반영한다
+
+    장면은 모두 만든 뒤 한 번에 브라우저로 보내 재생한다 (서버는 기다리지 않음).
+    반환값 (run, solution). solution 은 이번 실행 시작 상태의 최적 풀이 (없으면 None).
+    """
+    run_from = (s['position'], s['direction'])
+    with phase("simulate"):
+        run = simulate(s, s, program, record=True)
+    if not skip_animation:
+        with phase("frames"):
+            frames = run_frames(s, run, images=images)
+            if frames:
+                play_frames(frames, delay_ms, images=images)
+
+    # 이번 실행 시작 상태에서의 최적 풀이 (맵마다 한 번 계산해 캐시)
+    with phase("solver"):
+        solution = map_solution(s, *run_from)
+
+    visited_goals = run['visited_goals']
+    if run['outcome'] != OUTCOME_CLEAR:
+        s['result'] = OUTCOME_MESSAGES[run['outcome']]
+    else:
+        score = run['score']
+        s['score'] = score
+        s['total_score'] += score
+        s['high_score'] = max(s['high_score'], score)
+        s['result'] = f"🎯 목표 도달: {len(visited_goals)}개, 점수: {score}"
+        if is_perfect(s, len(command_list), visited_goals, *run_from):
+            s['result'] += '\n🌟 Perfect!'
+
+    s.update({
+        'position': run['position'],
+        'direction': run['direction'],
+        'ghost': run['ghost'],
+        'ghost_path': run['ghost_path'],
+        'commands': command_list,
+    })
+    return run, solution
+
+
+def show_hint(s):
+    """AI 힌트: 귀신을 피하는 계획과 (포탈이 있으면) 포탈을 타는 계획을 보여 주고 HINT_COST 점을 뺀다"""
+    if s['total_score'] < HINT_COST:
+        st.warning(f"포인트가 부족합니다! ({HINT_COST}점 필요)")
+        return
+    # 귀신 움직임까지 따져서 잡히지 않는 가장 짧은 명령어 (탐색 예산 안에서)
+    with phase("hint"):
+        plan, plan_stats = hint_plan(s)
+        # 포탈이 있으면 포탈을 타는 계획도 (도착 칸은 무작위라 최악 / 평균 명령 수로 비교)
+        portal = portal_plan(s['position'], s['direction'], s['obstacles'], s['goals'], s['portals']) if s['portals'] else None
+    via_portal = portal and portal['expected']
+    if via_portal and (via_portal['branches'] == 0 or (plan and via_portal['steps'] >= plan['steps'])):
+        via_portal = None  # 포탈을 안 쓰거나, 써도 더 짧지 않으면 보여 주지 않는다
+    if plan is None and via_portal is None:
+        if plan_stats['exhausted']:
+            st.error("시간 안에 경로를 찾지 못했습니다.")
+        else:
+            st.error("경로를 찾을 수 없습니다.")
+        return
+    s['total_score'] -= HINT_COST
+    if plan:
+        st.info("**AI 추천 명령어**\n\n" + "\n".join(plan['program']))
+        st.caption(f"탐색한 상태 {plan_stats['expanded']}개, {plan_stats['elapsed_ms']:.0f} ms")
+    if via_portal:
+        worst = portal['worst']
+        st.info(
+            "**🌀 포탈을 타는 추천 명령어** (포탈까지)\n\n" + "\n".join(via_portal['program'])
+            + f"\n\n도착할 수 있는 칸 {via_portal['branches']}곳, 평균 {via_portal['steps']:.1f}개"
+            + (f", 최악 {worst['steps']}개" if worst else "") + " 명령으로 끝납니다. 도착한 뒤 다시 힌트를 보세요."
+            + (" (귀신은 고려하지 않은 계획)" if s['ghost'] else "")
+        )
+
+
+# ----------------------------- 큰 맵 모드 ----------------------------- #
+LARGE_SIZES = (16, 32, 64, 128, 256, 512)
+
+
+def large_renderer(big):
+    """큰 맵 상태의 렌더러 (판마다 한 번 만들어 big 에 넣어 둔다)"""
+    if big['renderer'] is None:
+        board = big['board']
+        big['renderer'] = BoardRenderer(board['blocked'], board['goal_mask'], board['portals'].tolist(), size=board['size'])
+    return big['renderer']
+
+
+def large_board_panel(level_name):
+    """맵 크기를 골라 large_grid 큰 맵에서 명령어를 돌려 보는 패널. 점수와 기록에는 넣지 않는다"""
+    with st.expander("🗺️ 큰 맵 모드"):
+        size = st.select_slider("맵 크기", LARGE_SIZES, value=64, key="large_size")
+        new_clicked = st.button("🔁 새 큰 맵", key="large_new")
+        big = st.session_state.get("large")
+        if new_clicked or big is None or big['level'] != level_name or big['board']['size'] != size:
+            with phase("generate_large_map"):
+                big = st.session_state["large"] = new_board_state(level_name, size)
+        board = big['board']
+
+        text = st.text_area("명령어 입력(한 줄에 하나씩)", key="large_commands")
+        program, _, errors = compile_commands(text)
+        if st.button("큰 맵에서 실행", key="large_run"):
+            if errors:
+                st.error("잘못된 명령어가 있어서 실행하지 않았습니다.")
+            else:
+                with phase("simulate_large"):
+                    run = simulate_board(board, big, program)
+                big['visited_goals'] |= run['visited_goals']
+                big['position'], big['direction'], big['ghosts'] = run['position'], run['direction'], run['ghosts']
+                if run['outcome'] != OUTCOME_CLEAR:
+                    big['result'] = OUTCOME_MESSAGES[run['outcome']]
+                else:
+                    big['result'] = f"🎯 목표 도달: {len(big['visited_goals'])} / {len(board['goals'])}개"
+
+        # 남은 목표 중 가장 가까운 곳까지의 거리 (NumPy BFS 한 번)
+        left = [g for g in map(tuple, board['goals'].tolist()) if g not in big['visited_goals']]
+        if left:
+            with phase("large_bfs"):
+                dist = int(distance_field(board, left)[big['position']])
+            st.caption(f"{size}x{size}, 맵 번호(seed) {big['seed']}, 귀신 {len(big['ghosts'])}마리, 남은 목표 {len(left)}개, 가장 가까운 목표까지 {dist}칸")
+        else:
+            st.caption(f"{size}x{size}, 맵 번호(seed) {big['seed']}, 귀신 {len(big['ghosts'])}마리, 목표를 모두 집었습니다")
+        if big['result']:
+            st.markdown(f"**결과:** {big['result']}")
+        with phase("render_large"):
+            st.image(large_renderer(big).png(big['position'], big['direction'], ghosts=big['ghosts']))
+
+
+# ----------------------------- 관리자 ----------------------------- #
+def admin_sidebar():
+    """?admin=1 로 열었을 때만: 단계별 시간 계측 켜고 끄기 + 이 세션 / 프로세스 전체 p50 / p95 / p99"""
+    if query_param("admin") != "1":
+        return
+    with st.sidebar:
+        st.subheader("⏱️ 단계별 시간")
+        on = st.toggle("계측 켜기 (프로세스 전체)", value=metrics.enabled())
+        if on != metrics.enabled():
+            metrics.configure(ADMIN_METRICS_SINK if on else None)
+            rerun()
+        if not on:
+            st.caption("꺼져 있습니다. 켜면 다음 화면부터 잽니다.")
+            return
+        st.caption(f"샘플 저장: {metrics.sink()}")
+        for title, summary in (("이 세션", metrics.session_summary(st.session_state["metrics"])),
+                               ("프로세스 전체", metrics.process_summary())):
+            st.markdown(f"**{title}** (ms)")
+            st.dataframe(
+                [{"단계": name, "n": n, "p50": round(p50, 2), "p95": round(p95, 2), "p99": round(p99, 2)}
+                 for name, n, p50, p95, p99, _ in metrics.summary_rows(summary)],
+                use_container_width=True,
+                hide_index=True,
+            )
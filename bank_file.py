@@ -0,0 +1,186 @@
+# bank_file.py
+# 미리 만든 맵을 담는 고정 길이 바이너리 파일 (mmap 으로 열어서 바로 꺼내 쓴다)
+#   python bank_file.py build maps.jsonl maps.bank   (mapgen_cli.py 결과로 만들기)
+#   python bank_file.py info maps.bank
+#
+# 파일 구조 (모두 little-endian)
+#   머리글   HEADER: magic, 버전, 레코드 크기, 레코드 수, 색인 항목 수
+#   색인     INDEX_ENTRY * 색인 항목 수: (레벨 번호, 최적 명령 수, 첫 레코드 번호, 레코드 수)
+#   레코드   RECORD * 레코드 수 (레벨, 최적 명령 수 순으로 정렬돼 있다)
+# 레코드 i 의 위치는 data_offset + i * RECORD.size 이므로 무작위로 하나 꺼내는 데 검색이 없다.
+import mmap
+import random
+import struct
+
+from game_core import LEVEL_NAMES, LEVEL_DIFFICULTY, MAP_SIZE, cell_index, cell_pos
+
+MAGIC = b"RBMB"
+VERSION = 1
+NONE = 255  # 칸 / 지표가 없을 때
+
+HEADER = struct.Struct("<4sHHII")
+INDEX_ENTRY = struct.Struct("<BBxxII")
+# seed, 장애물 비트보드(81비트 -> 11바이트), 시작 / 목표 2 / 포탈 2 칸,
+# 레벨 번호, 난이도, 최적 명령 수, 귀신 피하는 명령 수, 포탈 최악 명령 수, 귀신 최소 거리, 포탈 기대 명령 수 x100
+RECORD = struct.Struct("<I11s5B6BH")
+BITBOARD_BYTES = 11
+
+
+def encode_bitboard(obstacles):
+    bits = 0
+    for pos in obstacles:
+        bits |= 1 << cell_index(pos)
+    return bits.to_bytes(BITBOARD_BYTES, "little")
+
+
+def decode_bitboard(data):
+    bits = int.from_bytes(data, "little")
+    return {cell_pos(i) for i in range(MAP_SIZE * MAP_SIZE) if bits >> i & 1}
+
+
+def _byte(value):
+    return NONE if value is None else min(int(value), NONE - 1)
+
+
+def _cell(pos):
+    return NONE if pos is None else cell_index(tuple(pos))
+
+
+def pack_record(record):
+    """mapgen_cli.vet_map 이 만든 dict -> RECORD bytes"""
+    goals = [tuple(g) for g in record['goals']] + [None] * (2 - len(record['goals']))
+    portals = [tuple(p) for p in record['portals']] + [None] * (2 - len(record['portals']))
+    expected = record.get('portal_expected_steps')
+    return RECORD.pack(
+        record['seed'],
+        encode_bitboard(tuple(o) for o in record['obstacles']),
+        _cell(record['start']), _cell(goals[0]), _cell(goals[1]), _cell(portals[0]), _cell(portals[1]),
+        LEVEL_NAMES.index(record['level']),
+        LEVEL_DIFFICULTY[record['level']],
+        _byte(record.get('optimal_steps')),
+        _byte(record.get('safe_steps')),
+        _byte(record.get('portal_worst_steps')),
+        _byte(record.get('ghost_min_distance')),
+        0xFFFF if expected is None else min(round(expected * 100), 0xFFFE),
+    )
+
+
+def write_bank(path, records):
+    """records(dict 목록)를 레벨 / 최적 명령 수 순으로 정렬해 path 에 쓴다. 쓴 레코드 수를 돌려준다"""
+    rows = sorted(
+        (LEVEL_NAMES.index(r['level']), _byte(r.get('optimal_steps')), r['index'], pack_record(r))
+        for r in records
+    )
+    index = []
+    for i, (level_no, optimal, _, _) in enumerate(rows):
+        if index and index[-1][0] == level_no and index[-1][1] == optimal:
+            index[-1][3] += 1
+        else:
+            index.append([level_no, optimal, i, 1])
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(rows), len(index)))
+        for entry in index:
+            f.write(INDEX_ENTRY.pack(*entry))
+        for row in rows:
+            f.write(row[3])
+    return len(rows)
+
+
+class BankFile:
+    """write_bank 로 만든 파일을 mmap 으로 연다. 읽기 전용이라 스레드 / 프로세스끼리 같이 써도 된다"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, record_size, self.count, n_index = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            self._mm.close()
+            raise ValueError(f"{path}: 맵 은행 파일 형식이 아닙니다 ({magic!r} v{version})")
+        self._index = [INDEX_ENTRY.unpack_from(self._mm, HEADER.size + i * INDEX_ENTRY.size) for i in range(n_index)]
+        self._data = HEADER.size + n_index * INDEX_ENTRY.size
+        # 레벨별 (첫 레코드, 개수): 레코드가 레벨 순으로 붙어 있어서 구간 하나다
+        self._levels = {}
+        for level_no, _, first, count in self._index:
+            name = LEVEL_NAMES[level_no]
+            start, n = self._levels.get(name, (first, 0))
+            self._levels[name] = (start, n + count)
+
+    def close(self):
+        self._mm.close()
+
+    def __len__(self):
+        return self.count
+
+    def level_count(self, level_name):
+        return self._levels.get(level_name, (0, 0))[1]
+
+    def optimal_counts(self, level_name):
+        """{최적 명령 수: 맵 수} (None = 풀이 없음)"""
+        level_no = LEVEL_NAMES.index(level_name)
+        return {
+            (None if optimal == NONE else optimal): count
+            for no, optimal, _, count in self._index if no == level_no
+        }
+
+    def record(self, i):
+        """레코드 i 를 dict 로 (seed, layout, 지표)"""
+        (seed, board, start, g0, g1, p0, p1, level_no, difficulty,
+         optimal, safe, worst, ghost_min, expected) = RECORD.unpack_from(self._mm, self._data + i * RECORD.size)
+        goals = [cell_pos(c) for c in (g0, g1) if c != NONE]
+        portals = [cell_pos(c) for c in (p0, p1) if c != NONE]
+        return {
+            'seed': seed,
+            'level': LEVEL_NAMES[level_no],
+            'difficulty': difficulty,
+            'layout': (cell_pos(start), decode_bitboard(board), goals, portals),
+            'optimal_steps': None if optimal == NONE else optimal,
+            'safe_steps': None if safe == NONE else safe,
+            'portal_worst_steps': None if worst == NONE else worst,
+            'ghost_min_distance': None if ghost_min == NONE else ghost_min,
+            'portal_expected_steps': None if expected == 0xFFFF else expected / 100,
+        }
+
+    def take(self, level_name, rng=random, optimal_steps=None):
+        """level_name 맵 하나를 무작위로 (seed, layout). optimal_steps 를 주면 그 최적 명령 수인 맵 중에서
+
+        해당하는 맵이 없으면 None.
+        """
+        if optimal_steps is None:
+            first, count = self._levels.get(level_name, (0, 0))
+        else:
+            level_no = LEVEL_NAMES.index(level_name)
+            first, count = next(
+                ((f, c) for no, opt, f, c in self._index if no == level_no and opt == optimal_steps),
+                (0, 0),
+            )
+        if not count:
+            return None
+        rec = self.record(first + rng.randrange(count))
+        return rec['seed'], rec['layout']
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="맵 은행 바이너리 파일 만들기 / 보기")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_build = sub.add_parser("build", help="mapgen_cli.py 의 JSONL 로 파일 만들기 (valid 맵만)")
+    p_build.add_argument("jsonl")
+    p_build.add_argument("out")
+    p_info = sub.add_parser("info")
+    p_info.add_argument("path")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        with open(args.jsonl, encoding="utf-8") as f:
+            records = [r for r in map(json.loads, f) if r['valid']]
+        n = write_bank(args.out, records)
+        print(f"{n} maps ({RECORD.size} bytes each) -> {args.out}")
+    else:
+        bank = BankFile(args.path)
+        print(f"{args.path}: {len(bank)} maps")
+        for name in LEVEL_NAMES:
+            counts = bank.optimal_counts(name)
+            print(f"  {name}: {bank.level_count(name)}  " + ", ".join(f"{k}:{v}" for k, v in sorted(counts.items(), key=lambda kv: (kv[0] is None, kv[0]))))
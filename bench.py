@@ -0,0 +1,324 @@
+# bench.py
+# 게임 로직 / 기록 DB 성능 측정. 결과를 JSON 으로 남겨 두 커밋을 비교한다.
+#   python bench.py run --out before.json
+#   python bench.py run --rows 10000 100000 1000000 --db-dir /tmp/bench_db --out after.json
+#   python bench.py compare before.json after.json
+#
+# 각 항목은 한 라운드가 MIN_ROUND_SECONDS 이상이 되도록 반복 횟수를 맞춘 뒤 ROUNDS 라운드를 돌린다.
+# 호출 한 번당 시간의 중앙값 / 최솟값 / 평균 / 표준편차 / 사분위 범위를 남기고, 비교는 중앙값으로 한다.
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from game_core import (
+    LEVELS, LEVEL_NAMES, DIRECTIONS, MAP_SIZE, MOVE_OFFSET,
+    bfs_shortest_path, generate_level_map, move_ghost, new_map_state, path_to_commands, render_grid,
+)
+from commands import compile_commands
+from engine import simulate
+
+ROUNDS = 7
+MIN_ROUND_SECONDS = 0.05
+MAPS_PER_LEVEL = 50          # 레벨마다 돌려 쓰는 맵 수 (한 맵만 재면 운에 좌우된다)
+LONG_SCRIPT = 1000           # 긴 명령어 스크립트 줄 수
+DEFAULT_ROWS = (10000, 100000)
+NOISE_FLOOR = 0.03           # 비교할 때 이 비율 이하의 차이는 잡음으로 본다
+
+
+# ----------------------------- 측정 ----------------------------- #
+def measure(fn, rounds=ROUNDS, min_round=MIN_ROUND_SECONDS):
+    """fn() 한 번당 시간 통계 (µs). timeit 처럼 측정 중에는 gc 를 끈다"""
+    fn()  # 캐시 / 지연 import 등 첫 호출 비용은 빼고 잰다
+    # 반복 횟수 맞추기 (timeit.autorange 처럼 1, 2, 5, 10, 20, 50 ...)
+    number = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - t >= min_round:
+            break
+        number = number * 5 // 2 if str(number)[0] == "2" else number * 2
+    per_call = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            t = time.perf_counter()
+            for _ in range(number):
+                fn()
+            per_call.append((time.perf_counter() - t) / number * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    quartiles = statistics.quantiles(per_call, n=4) if len(per_call) > 1 else [per_call[0]] * 3
+    return {
+        'median_us': statistics.median(per_call),
+        'min_us': min(per_call),
+        'mean_us': statistics.fmean(per_call),
+        'stdev_us': statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        'iqr_us': quartiles[2] - quartiles[0],
+        'rounds': rounds,
+        'number': number,
+    }
+
+
+def _cycle(items):
+    # 호출마다 다음 항목 (여러 맵 / 사용자를 돌아가며 쓴다)
+    state = {'i': -1}
+
+    def next_item():
+        state['i'] = (state['i'] + 1) % len(items)
+        return items[state['i']]
+    return next_item
+
+
+def _short(level_name):
+    return f"L{LEVEL_NAMES.index(level_name) + 1}"
+
+
+# ----------------------------- 게임 로직 ----------------------------- #
+def _long_script(s, n=LONG_SCRIPT):
+    """s 에서 n 줄 동안 부딪히지 않는 명령어 (비어 있는 이웃 칸으로 갔다가 돌아오기 + 회전 + 집기)"""
+    r, c = s['start']
+    d = next(
+        d for d in DIRECTIONS
+        if 0 <= r + MOVE_OFFSET[d][0] < MAP_SIZE and 0 <= c + MOVE_OFFSET[d][1] < MAP_SIZE
+        and (r + MOVE_OFFSET[d][0], c + MOVE_OFFSET[d][1]) not in s['obstacles']
+    )
+    turns = ["오른쪽 회전"] * DIRECTIONS.index(d)
+    loop = ["앞으로", "뒤로 이동", "왼쪽 회전", "오른쪽 회전", "집기"]
+    return "\n".join(turns + (loop * (n // len(loop) + 1))[:n - len(turns)])
+
+
+def game_cases():
+    """(이름, 함수) 목록. 레벨마다 MAPS_PER_LEVEL 개 맵을 미리 만들어 돌려 쓴다"""
+    cases = []
+    for level_name in LEVEL_NAMES:
+        tag = _short(level_name)
+        seeds = list(range(MAPS_PER_LEVEL))
+        maps = [new_map_state(level_name, seed) for seed in seeds]
+        for s in maps:
+            s['level'] = level_name
+        next_seed = _cycle(seeds)
+        next_map = _cycle(maps)
+        paths = [bfs_shortest_path(s['start'], s['goals'], s['obstacles']) for s in maps]
+        next_path = _cycle([[s['start']] + p for s, p in zip(maps, paths)])
+
+        def generate(level_name=level_name, next_seed=next_seed):
+            generate_level_map(level_name, next_seed())
+
+        def bfs(next_map=next_map):
+            s = next_map()
+            bfs_shortest_path(s['start'], s['goals'], s['obstacles'])
+
+        def commands(next_path=next_path):
+            path_to_commands(next_path())
+
+        def draw(next_map=next_map):
+            # draw_grid 는 render_grid 결과를 st.text 로 내보내기만 한다
+            s = next_map()
+            render_grid(s['start'], 'UP', s['ghost'], [], s['obstacles'], s['goals'], s['portals'])
+
+        def ghost(next_map=next_map, ignore=LEVELS[level_name].get('ignore_obstacles', False)):
+            s = next_map()
+            move_ghost(s['ghost'], s['start'], s['obstacles'], ignore)
+
+        cases.append((f"generate_map/{tag}", generate))
+        cases.append((f"bfs_shortest_path/{tag}", bfs))
+        cases.append((f"path_to_commands/{tag}", commands))
+        cases.append((f"draw_grid/{tag}", draw))
+        if LEVELS[level_name]['ghost']:
+            cases.append((f"move_ghost/{tag}", ghost))
+
+    # 긴 스크립트: 귀신 없는 레벨 3 맵에서 LONG_SCRIPT 줄
+    s = new_map_state(LEVEL_NAMES[2], 0)
+    s['level'] = LEVEL_NAMES[2]
+    script = _long_script(s)
+    program = compile_commands(script)[0]
+    # compile_commands 는 lru_cache 라 캐시를 거치지 않은 본래 함수를 잰다
+    cases.append((f"compile_commands/long-{LONG_SCRIPT}", lambda: compile_commands.__wrapped__(script)))
+    cases.append((f"simulate/long-{LONG_SCRIPT}", lambda: simulate(s, s, program)))
+    # 아주 긴 경로 (9x9 보다 훨씬 긴, 지그재그 2000칸)
+    zigzag = [(r, c if r % 2 == 0 else 39 - c) for r in range(50) for c in range(40)]
+    cases.append(("path_to_commands/zigzag-2000", lambda: path_to_commands(zigzag)))
+    return cases
+
+
+# ----------------------------- 기록 DB ----------------------------- #
+def _bench_db(rows, db_dir):
+    """rows 줄짜리 가짜 기록 DB. db_dir 에 이미 있으면 다시 쓴다 (100만 줄은 만드는 데 오래 걸린다)"""
+    from run_db import fill_synthetic_runs, get_conn, rebuild_user_stats, _write_lock
+
+    os.makedirs(db_dir, exist_ok=True)
+    path = os.path.join(db_dir, f"bench_runs_{rows}.db")
+    conn = get_conn(path)
+    have = conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    if have < rows:
+        fill_synthetic_runs(conn, rows - have, seed=have)
+    elif have > rows:
+        # 지난번 log_run 항목이 넣은 기록을 지워 매번 같은 크기에서 잰다
+        with _write_lock, conn:
+            conn.execute("DELETE FROM runs WHERE id > ?", (rows,))
+            rebuild_user_stats(conn)
+    return conn, path
+
+
+def db_cases(rows_list, db_dir, writers):
+    """기록 DB 항목. 만든 RunWriter 는 writers 에 넣어 두고 다 잰 뒤 닫는다
+
+    log_run 계열은 기록을 늘리므로 읽기 항목 뒤에 재고, 다음 실행 때 _bench_db 가 rows 줄로 되돌린다.
+    """
+    from run_db import RunWriter, get_user_stats, load_runs_df, load_runs_page, log_run
+
+    cases = []
+    users = [f"u{i}" for i in range(300)]
+    for rows in rows_list:
+        conn, path = _bench_db(rows, db_dir)
+        tag = f"{rows // 1000}k" if rows < 1000000 else f"{rows // 1000000}M"
+        next_user = _cycle(users)
+        rng = random.Random(0)
+
+        cases.append((f"get_user_stats/{tag}", lambda conn=conn, next_user=next_user: get_user_stats(conn, next_user())))
+        cases.append((f"load_runs_page/{tag}", lambda conn=conn, next_user=next_user: load_runs_page(conn, next_user())))
+        cases.append((f"load_runs_df(user)/{tag}", lambda conn=conn, next_user=next_user: load_runs_df(conn, next_user())))
+        cases.append((f"load_runs_df(all)/{tag}", lambda conn=conn: load_runs_df(conn)))
+
+        # 쓰기 항목은 읽기 항목 다음에 (기록이 늘어나므로)
+        def one_run(conn=conn, next_user=next_user, rng=rng):
+            log_run(conn, next_user(), LEVEL_NAMES[0], 1, "앞으로\n집기", rng.randint(0, 1), 2, 2)
+
+        cases.append((f"log_run/{tag}", one_run))
+        # 화면에서 쓰는 경로: 큐에 넣기만 한다 (재는 동안 큐가 차서 버려지지 않게 크게)
+        writer = RunWriter(path, max_queue=10 ** 7)
+        writers.append(writer)
+
+        def queued_run(writer=writer, next_user=next_user):
+            writer.log_run(next_user(), LEVEL_NAMES[0], 1, "앞으로\n집기", 1, 2, 2)
+
+        cases.append((f"RunWriter.log_run/{tag}", queued_run))
+    return cases
+
+
+# ----------------------------- 실행 / 비교 ----------------------------- #
+def _git_revision():
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo, capture_output=True, text=True).stdout.strip())
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(rows_list, db_dir, pattern=None, rounds=ROUNDS, min_round=MIN_ROUND_SECONDS, out=sys.stdout):
+    """모든 항목을 재서 결과 dict (JSON 으로 그대로 쓸 수 있다)"""
+    regex = re.compile(pattern) if pattern else None
+    results = {}
+    writers = []
+    cases = game_cases()
+    if rows_list:
+        cases += db_cases(rows_list, db_dir, writers)
+    try:
+        for name, fn in cases:
+            if regex and not regex.search(name):
+                continue
+            stats = measure(fn, rounds, min_round)
+            results[name] = stats
+            print(f"  {name:<36} {stats['median_us']:>12.1f} µs  ±{stats['iqr_us'] / stats['median_us'] * 100:4.1f}%  (x{stats['number']})", file=out)
+            # 큐에 쌓인 기록이 다음 항목을 재는 동안 쓰이지 않게
+            for writer in writers:
+                writer.flush()
+    finally:
+        for writer in writers:
+            writer.close()
+    return {
+        'meta': {
+            'revision': _git_revision(),
+            'time': datetime.now().isoformat(timespec="seconds"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'rows': list(rows_list),
+            'rounds': rounds,
+            'min_round_seconds': min_round,
+        },
+        'results': results,
+    }
+
+
+def compare(old, new, threshold=0.05):
+    """두 결과의 중앙값 비교. (이름, 이전 µs, 이후 µs, 비율, 판정) 목록
+
+    차이가 threshold 보다 크고, 두 결과 중 큰 쪽 사분위 범위(잡음)보다도 클 때만 느려짐 / 빨라짐으로 본다.
+    """
+    rows = []
+    for name in sorted(set(old['results']) | set(new['results'])):
+        a, b = old['results'].get(name), new['results'].get(name)
+        if a is None or b is None:
+            rows.append((name, a and a['median_us'], b and b['median_us'], None, "only in old" if b is None else "new"))
+            continue
+        ratio = b['median_us'] / a['median_us']
+        noise = max(NOISE_FLOOR, a['iqr_us'] / a['median_us'], b['iqr_us'] / b['median_us'])
+        if abs(ratio - 1) <= max(threshold, noise):
+            verdict = ""
+        else:
+            verdict = "slower" if ratio > 1 else "faster"
+        rows.append((name, a['median_us'], b['median_us'], ratio, verdict))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="게임 로직 / 기록 DB 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run")
+    p_run.add_argument("--out", help="결과 JSON 파일")
+    p_run.add_argument("--rows", type=int, nargs="*", default=list(DEFAULT_ROWS), help="runs 테이블 크기 (비우면 DB 항목은 건너뜀)")
+    p_run.add_argument("--db-dir", help="가짜 기록 DB 를 둘 폴더 (다음 실행 때 다시 씀, 기본: 임시 폴더)")
+    p_run.add_argument("--filter", help="이름이 이 정규식에 맞는 항목만")
+    p_run.add_argument("--rounds", type=int, default=ROUNDS)
+    p_run.add_argument("--min-round", type=float, default=MIN_ROUND_SECONDS, help="라운드 하나의 최소 시간(초)")
+    p_cmp = sub.add_parser("compare")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.05, help="이 비율보다 큰 차이만 표시 (기본 5%%)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        print(f"{old['meta']['revision']} ({old['meta']['time']}) -> {new['meta']['revision']} ({new['meta']['time']})")
+        slower = 0
+        unmatched = []
+        for name, a, b, ratio, verdict in compare(old, new, args.threshold):
+            if ratio is None:
+                unmatched.append(f"{name} ({verdict})")
+                continue
+            slower += verdict == "slower"
+            print(f"  {name:<36} {a:>12.1f} -> {b:>12.1f} µs  {ratio:6.2f}x  {verdict}")
+        if unmatched:
+            print(f"  한쪽에만 있는 항목 {len(unmatched)}개: " + ", ".join(unmatched))
+        # 느려진 항목이 있으면 종료 코드 1 (CI 에서 쓸 수 있게)
+        return 1 if slower else 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(args.rows, args.db_dir or tmp, args.filter, args.rounds, args.min_round)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=1, sort_keys=True)
+        print(f"-> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,243 @@
+# board_render.py
+# 보드를 이모지 문자열 대신 이미지(PNG)로 그린다.
+# 타일 그림(atlas)은 NumPy 배열로 한 번만 만들고, 장애물 / 목표 / 포탈(정적 층)은 맵마다 한 번 깔아 둔다.
+# 장면마다 그 위에 로봇 / 귀신 / 귀신 발자국(동적 스프라이트)만 덮어 그리고, PNG 는 상태별로 캐시한다.
+#   python board_render.py bench
+import io
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from game_core import DIRECTIONS, MAP_SIZE
+
+TILE_SIZE = 32          # 9x9 맵 한 칸의 픽셀 수
+PNG_CACHE_SIZE = 512    # 렌더러(맵) 하나가 들고 있을 PNG 수
+
+# atlas 안 타일 번호
+TILE_EMPTY, TILE_OBSTACLE, TILE_GOAL, TILE_PORTAL, TILE_GHOST, TILE_TRAIL = range(6)
+TILE_PLAYER = 6  # + 방향 번호 (UP / RIGHT / DOWN / LEFT)
+
+_COLORS = {
+    'floor': (245, 245, 240),
+    'grid': (210, 210, 205),
+    'obstacle': (50, 50, 60),
+    'goal': (220, 60, 60),
+    'portal': (130, 70, 200),
+    'ghost': (120, 160, 230),
+    'trail': (150, 170, 210),
+    'player': (250, 190, 40),
+    'arrow': (60, 40, 20),
+}
+
+
+@lru_cache(maxsize=8)
+def tile_atlas(tile=TILE_SIZE):
+    """(타일 수, tile, tile, 3) uint8 배열. 도형은 픽셀 좌표 배열로 한 번에 칠한다"""
+    yy, xx = np.mgrid[0:tile, 0:tile] + 0.5
+    c = tile / 2
+    r = np.hypot(yy - c, xx - c) / (tile / 2)  # 칸 중심에서의 거리 (가장자리 = 1)
+
+    def blank():
+        t = np.empty((tile, tile, 3), dtype=np.uint8)
+        t[:] = _COLORS['floor']
+        if tile >= 6:
+            t[-1, :] = t[:, -1] = _COLORS['grid']
+        return t
+
+    atlas = []
+    atlas.append(blank())
+    t = blank()
+    t[:] = _COLORS['obstacle']
+    atlas.append(t)
+    t = blank()  # 과녁: 링 두 개
+    t[(r < 0.8) & ((r > 0.55) | (r < 0.3))] = _COLORS['goal']
+    atlas.append(t)
+    t = blank()  # 포탈: 소용돌이처럼 보이는 링 세 개
+    t[(r < 0.85) & (np.floor(r * 6) % 2 == 0)] = _COLORS['portal']
+    atlas.append(t)
+    t = blank()  # 귀신: 위는 반원, 아래는 사각형
+    t[((r < 0.7) & (yy < c)) | ((yy >= c) & (yy < tile * 0.85) & (np.abs(xx - c) < tile * 0.35))] = _COLORS['ghost']
+    atlas.append(t)
+    t = blank()  # 귀신 발자국: 작은 점
+    t[r < 0.22] = _COLORS['trail']
+    atlas.append(t)
+    for d in range(len(DIRECTIONS)):  # 로봇: 원 + 바라보는 방향 삼각형
+        t = blank()
+        t[r < 0.75] = _COLORS['player']
+        arrow = (yy < c) & (np.abs(xx - c) < (yy - tile * 0.15) * 0.6)  # 꼭짓점이 위쪽
+        t[np.rot90(arrow, -d)] = _COLORS['arrow']
+        atlas.append(t)
+    return np.stack(atlas)
+
+
+def compose(tile_ids, tile=TILE_SIZE):
+    """(H, W) 타일 번호 배열 -> (H*tile, W*tile, 3) 이미지. atlas 를 한 번에 인덱싱해서 붙인다"""
+    h, w = tile_ids.shape
+    return tile_atlas(tile)[tile_ids].transpose(0, 2, 1, 3, 4).reshape(h * tile, w * tile, 3)
+
+
+def _cells(points):
+    # 좌표 목록 -> (행 배열, 열 배열)
+    arr = np.asarray(list(points), dtype=np.intp).reshape(-1, 2)
+    return arr[:, 0], arr[:, 1]
+
+
+class BoardRenderer:
+    """맵 하나의 렌더러. 정적 층을 한 번 만들어 두고 장면마다 동적 스프라이트만 덮는다
+
+    obstacles / goals / portals 는 (r, c) 목록이거나 large_grid 보드의 bool 배열이어도 된다.
+    """
+
+    def __init__(self, obstacles, goals, portals, size=MAP_SIZE, tile=None):
+        self.size = size
+        self.tile = tile or max(2, min(TILE_SIZE, 1024 // size))
+        ids = np.full((size, size), TILE_EMPTY, dtype=np.uint8)
+        for tile_id, cells in ((TILE_PORTAL, portals), (TILE_GOAL, goals), (TILE_OBSTACLE, obstacles)):
+            if isinstance(cells, np.ndarray) and cells.dtype == bool:
+                ids[cells] = tile_id
+            else:
+                ids[_cells(cells)] = tile_id
+        self.static_ids = ids
+        self.static = compose(ids, self.tile)
+        self.atlas = tile_atlas(self.tile)
+        self._png = OrderedDict()
+        self.hits = self.misses = 0
+
+    def _blit(self, img, rows, cols, tile_id):
+        # img 를 (행, tile, 열, tile, 3) 으로 보면 여러 칸에 같은 타일을 한 번에 쓸 수 있다
+        t = self.tile
+        img.reshape(self.size, t, self.size, t, 3)[rows, :, cols, :] = self.atlas[tile_id]
+
+    def frame(self, position, direction, ghost=None, ghost_path=(), ghosts=()):
+        """한 장면 (H, W, 3) 배열. 겹칠 때 우선순위는 render_grid 와 같다 (로봇 > 장애물 > 목표 > 귀신 > 발자국 > 포탈)
+
+        ghosts 는 큰 맵의 귀신 여럿 ((N, 2) 배열). ghost 하나와 같이 그린다.
+        """
+        img = self.static.copy()
+        under = self.static_ids
+        for cells, tile_id in ((ghost_path, TILE_TRAIL), (ghosts, TILE_GHOST)):
+            if len(cells):
+                rows, cols = _cells(cells)
+                keep = (under[rows, cols] == TILE_EMPTY) | (under[rows, cols] == TILE_PORTAL)
+                self._blit(img, rows[keep], cols[keep], tile_id)
+        if ghost is not None and under[ghost[0], ghost[1]] in (TILE_EMPTY, TILE_PORTAL):
+            self._blit(img, ghost[0], ghost[1], TILE_GHOST)
+        if position is not None:
+            self._blit(img, position[0], position[1], TILE_PLAYER + DIRECTIONS.index(direction))
+        return img
+
+    def png(self, position, direction, ghost=None, ghost_path=(), ghosts=()):
+        """frame 을 PNG bytes 로. 같은 상태는 다시 그리지 않고 캐시에서 꺼낸다
+
+        캐시 키는 상태 튜플 그 자체다 (hash 값만 쓰면 서로 다른 상태가 같은 그림을 받을 수 있다).
+        """
+        key = (
+            tuple(position) if position is not None else None, direction,
+            tuple(ghost) if ghost is not None else None,
+            frozenset(map(tuple, ghost_path)),
+            frozenset(map(tuple, np.asarray(ghosts).reshape(-1, 2).tolist())),
+        )
+        data = self._png.get(key)
+        if data is not None:
+            self._png.move_to_end(key)
+            self.hits += 1
+            return data
+        self.misses += 1
+        buf = io.BytesIO()
+        Image.fromarray(self.frame(position, direction, ghost, ghost_path, ghosts)).save(buf, format="PNG", compress_level=1)
+        data = buf.getvalue()
+        self._png[key] = data
+        if len(self._png) > PNG_CACHE_SIZE:
+            self._png.popitem(last=False)
+        return data
+
+
+def map_renderer(s):
+    """맵 상태 dict 의 렌더러 (맵마다 한 번 만들어 s 에 넣어 둔다)"""
+    renderer = s.get('renderer')
+    if renderer is None:
+        renderer = s['renderer'] = BoardRenderer(s['obstacles'], s['goals'], s['portals'])
+    return renderer
+
+
+# ----------------------------- 벤치마크 ----------------------------- #
+def bench(frames=200, seed=0):
+    """맵 한 판의 장면 frames 개를 render_grid 문자열 / 이미지 배열 / PNG(첫 번째, 캐시) 로 그리는 시간 (장면당 µs)"""
+    import random
+
+    from game_core import LEVEL_NAMES, new_map_state, move_ghost, move_forward, render_grid, rotate
+    from large_grid import generate_large_map
+
+    s = new_map_state(LEVEL_NAMES[4], seed)
+    rng = random.Random(seed)
+    states = []
+    pos, d, ghost, path = s['start'], 'UP', s['ghost'], []
+    for _ in range(frames):
+        if rng.random() < 0.3:
+            d = rotate(d, rng.choice(["왼쪽 회전", "오른쪽 회전"]))
+        nxt = move_forward(pos, d)
+        if nxt is not None and nxt not in s['obstacles']:
+            pos = nxt
+        ghost = move_ghost(ghost, pos, s['obstacles'], ignore_obstacles=True)
+        path = path + [ghost]
+        states.append((pos, d, ghost, path))
+
+    def per_frame(fn):
+        t = time.perf_counter()
+        for st in states:
+            fn(*st)
+        return (time.perf_counter() - t) / len(states) * 1e6
+
+    results = {}
+    results['text (render_grid)'] = per_frame(lambda p, d, g, gp: render_grid(p, d, g, gp, s['obstacles'], s['goals'], s['portals']))
+    t = time.perf_counter()
+    renderer = BoardRenderer(s['obstacles'], s['goals'], s['portals'])
+    results['image static layer (once)'] = (time.perf_counter() - t) * 1e6
+    results['image frame (array)'] = per_frame(renderer.frame)
+    results['image png (first)'] = per_frame(renderer.png)
+    results['image png (cached)'] = per_frame(renderer.png)
+
+    # 큰 맵: render_grid 는 MAP_SIZE 고정이라 같은 방식(칸마다 문자열 붙이기)을 크기만 바꿔 비교
+    board = generate_large_map(256, LEVEL_NAMES[2], seed=seed)
+    size = board['size']
+    obstacles = set(zip(*np.nonzero(board['blocked'])))
+    goals = [tuple(g) for g in board['goals']]
+    start = tuple(board['start'])
+
+    def big_text(p, d, g, gp):
+        grid = ""
+        for i in range(size):
+            for j in range(size):
+                cell = '⬜'
+                if (i, j) == start:
+                    cell = '🤡'
+                elif (i, j) in obstacles:
+                    cell = '⬛'
+                elif (i, j) in goals:
+                    cell = '🎯'
+                grid += cell
+            grid += '\n'
+        return grid
+
+    t = time.perf_counter()
+    big = BoardRenderer(board['blocked'], board['goal_mask'], [], size=size)
+    results['256x256 static layer (once)'] = (time.perf_counter() - t) * 1e6
+    results['256x256 text'] = per_frame(big_text)
+    results['256x256 image frame (array)'] = per_frame(lambda p, d, g, gp: big.frame(start, d))
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="이미지 보드 렌더러")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="장면당 렌더 시간: 문자열 vs 이미지")
+    p_bench.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, us in bench(args.frames).items():
+        print(f"  {name:<32} {us:10.1f} µs")
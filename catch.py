@@ -1,16 +1,29 @@
 # streamlit_app.py
 import streamlit as st
-import random
-import time
+import tempfile
 import traceback
-from collections import deque
-import sqlite3
-import pandas as pd
-from datetime import datetime
+from datetime import timedelta
 
-st.set_page_config(page_title="🤖 로봇 명령 퍼즐", page_icon="🤖", layout="centered")
+from game_core import (
+    LEVEL_NAMES, LEVEL_DIFFICULTY,
+    new_map_state,
+)
+from board_render import map_renderer
+import metrics
+from metrics import phase
+from commands import compile_commands
+from run_db import (
+    connect, get_conn, get_run_writer, get_user_stats, data_version, list_users,
+    load_runs_page, run_aggregates, PAGE_SIZE,
+    export_preview, export_runs_csv,
+)
+from engine import OUTCOME_CLEAR
+from app_ui import (
+    HINT_COST, rerun, new_game, draw_grid, run_program, show_hint, large_board_panel, admin_sidebar,
+)
 
-import sqlite3
+st.set_page_config(page_title="🤖 로봇 명령 퍼즐", page_icon="🤖", layout="centered")
+metrics.start_rerun(st.session_state.setdefault("metrics", {}))
 
 
 
@@ -26,93 +39,7 @@ bgm_html = """
 st.markdown(bgm_html, unsafe_allow_html=True)
 
 
-# ----------------------------- 설정 ----------------------------- #
-DIRECTIONS = ['UP', 'RIGHT', 'DOWN', 'LEFT']
-MOVE_OFFSET = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
-LEVELS = {
-    "Level 1 (5점, 착한맛)": {"obstacles": 8, "score": 5, "ghost": False},
-    "Level 2 (10점, 보통맛)": {"obstacles": 14, "score": 10, "ghost": False},
-    "Level 3 (20점, 매운맛)": {"obstacles": 20, "score": 20, "ghost": False},
-    "Level 4 (30점, 불닭맛)": {"obstacles": 24, "score": 30, "ghost": True, "ghost_range": 4, "ignore_obstacles": False},
-    "Level 5 (50점, 핵불닭맛)": {"obstacles": 28, "score": 50, "ghost": True, "ghost_range": 3, "ignore_obstacles": True, "portals": True},
-}
-MAP_SIZE = 9
-PORTAL_SYMBOL = '🌀'
-
-LEVEL_NAMES = list(LEVELS.keys())
-LEVEL_DIFFICULTY = {name: i + 1 for i, name in enumerate(LEVEL_NAMES)}  # 난이도 1~5
-
-# ----------------------------- DB ----------------------------- #
-def get_conn():
-    conn = sqlite3.connect("robot_game_runs.db", check_same_thread=False)
-    conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS runs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id TEXT,
-            run_time TEXT,
-            level TEXT,
-            difficulty INTEGER,
-            commands TEXT,
-            success INTEGER,
-            steps INTEGER,
-            optimal_steps INTEGER
-        );
-        """
-    )
-    conn.commit()
-    return conn
-
-def log_run(conn, user_id, level, difficulty, commands, success, steps, optimal_steps):
-    """한 판 결과 기록"""
-    if not user_id:
-        return
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO runs (user_id, run_time, level, difficulty, commands, success, steps, optimal_steps)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        (
-            user_id,
-            datetime.now().isoformat(timespec="seconds"),
-            level,
-            difficulty,
-            commands,
-            int(success),
-            steps,
-            optimal_steps if optimal_steps is not None else None,
-        ),
-    )
-    conn.commit()
-
-def get_user_stats(conn, user_id, k=20):
-    """개인 최근 k판 기준 성공률 / 마지막 난이도"""
-    if not user_id:
-        return None
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT difficulty, success
-        FROM runs
-        WHERE user_id = ?
-        ORDER BY run_time DESC
-        LIMIT ?
-        """,
-        (user_id, k),
-    )
-    rows = cur.fetchall()
-    if not rows:
-        return None
-    n = len(rows)
-    success_rate = sum(r[1] for r in rows) / n
-    last_diff = rows[0][0]
-    return {
-        "n": n,
-        "success_rate": success_rate,
-        "last_diff": last_diff,
-    }
-
+# ----------------------------- 추천 ----------------------------- #
 def recommend_level_name(stats):
     """개인 맞춤 레벨 추천"""
     if stats is None or stats["n"] < 5:
@@ -125,148 +52,25 @@ def recommend_level_name(stats):
         diff -= 1
     return LEVEL_NAMES[diff - 1]
 
-def load_runs_df(conn):
-    return pd.read_sql_query(
-        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps, commands FROM runs ORDER BY run_time DESC",
-        conn,
-    )
+# ----------------------------- 캐시 ----------------------------- #
+@st.cache_data(max_entries=4)
+def cached_user_options(version):
+    """사용자 목록. version(data_version) 이 바뀔 때만 다시 조회한다"""
+    return list_users(get_conn())
 
-# ----------------------------- 유틸/로직 ----------------------------- #
-def bfs_shortest_path(start, goals, obstacles):
-    queue = deque([(start, [])])
-    visited = {start}
-    while queue:
-        current, path = queue.popleft()
-        if current in goals:
-            return path
-        for d in MOVE_OFFSET.values():
-            nx, ny = current[0] + d[0], current[1] + d[1]
-            nxt = (nx, ny)
-            if 0 <= nx < MAP_SIZE and 0 <= ny < MAP_SIZE and nxt not in obstacles and nxt not in visited:
-                visited.add(nxt)
-                queue.append((nxt, path + [nxt]))
-    return []
-
-def generate_map(obstacle_count, goal_count=2, use_portals=False):
-    while True:
-        positions = [(i, j) for i in range(MAP_SIZE) for j in range(MAP_SIZE)]
-        start = random.choice(positions)
-        positions.remove(start)
-
-        obstacles = set(random.sample(positions, obstacle_count))
-        positions = [p for p in positions if p not in obstacles]
-
-        goals = random.sample(positions, goal_count)
-        positions = [p for p in positions if p not in goals]
-
-        portals = random.sample(positions, 2) if use_portals else []
-
-        if all(bfs_shortest_path(start, [g], obstacles) for g in goals):
-            break
-    return start, obstacles, goals, portals
-
-def rotate(current_direction, rotation_command):
-    idx = DIRECTIONS.index(current_direction)
-    if rotation_command == "오른쪽 회전":
-        return DIRECTIONS[(idx + 1) % 4]
-    elif rotation_command == "왼쪽 회전":
-        return DIRECTIONS[(idx - 1) % 4]
-    return current_direction
-
-def move_forward(pos, direction, steps=1):
-    for _ in range(steps):
-        dx, dy = MOVE_OFFSET[direction]
-        pos = (pos[0] + dx, pos[1] + dy)
-        if not (0 <= pos[0] < MAP_SIZE and 0 <= pos[1] < MAP_SIZE):
-            return None
-    return pos
-
-def move_ghost(pos, target, obstacles, ignore_obstacles=False):
-    dx, dy = target[0] - pos[0], target[1] - pos[1]
-    options = []
-    if dx != 0:
-        options.append((pos[0] + (1 if dx > 0 else -1), pos[1]))
-    if dy != 0:
-        options.append((pos[0], pos[1] + (1 if dy > 0 else -1)))
-    for opt in options:
-        if 0 <= opt[0] < MAP_SIZE and 0 <= opt[1] < MAP_SIZE:
-            if ignore_obstacles or opt not in obstacles:
-                return opt
-    return pos
-
-def draw_grid(position, direction, ghost, ghost_path, obstacles, goals, portals):
-    grid = ""
-    for i in range(MAP_SIZE):
-        for j in range(MAP_SIZE):
-            cell = '⬜'
-            if (i, j) == position:
-                cell = '🤡'
-            elif (i, j) in obstacles:
-                cell = '⬛'
-            elif (i, j) in goals:
-                cell = '🎯'
-            elif (i, j) == ghost:
-                cell = '👻'
-            elif (i, j) in ghost_path:
-                cell = '·'
-            elif (i, j) in portals:
-                cell = PORTAL_SYMBOL
-            grid += cell
-        grid += '\n'
-    st.text(grid)
-
-def path_to_commands(path, initial_direction='UP'):
-    cmds = []
-    direction = initial_direction
-    forward_count = 0
-
-    def flush_forward():
-        nonlocal forward_count
-        if forward_count == 1:
-            cmds.append("앞으로")
-        elif forward_count > 1:
-            cmds.append(f"앞으로 {forward_count}칸")
-        forward_count = 0
-
-    for i in range(1, len(path)):
-        cur = path[i - 1]
-        nxt = path[i]
-        dx, dy = nxt[0] - cur[0], nxt[1] - cur[1]
-        target_dir = None
-        for dir_name, (dx_off, dy_off) in MOVE_OFFSET.items():
-            if (dx, dy) == (dx_off, dy_off):
-                target_dir = dir_name
-                break
-        if target_dir is None:
-            continue
-
-        if direction == target_dir:
-            forward_count += 1
-        else:
-            flush_forward()
-            while direction != target_dir:
-                cur_idx = DIRECTIONS.index(direction)
-                tgt_idx = DIRECTIONS.index(target_dir)
-                if (tgt_idx - cur_idx) % 4 == 1:
-                    cmds.append("오른쪽 회전")
-                    direction = rotate(direction, "오른쪽 회전")
-                else:
-                    cmds.append("왼쪽 회전")
-                    direction = rotate(direction, "왼쪽 회전")
-            forward_count = 1
-
-    flush_forward()
-    cmds.append("집기")
-    return cmds
-
-def _rerun():
-    try:
-        st.rerun()
-    except Exception:
-        st.experimental_rerun()
+@st.cache_data(max_entries=64)
+def cached_export_preview(version, user_id, level, since, until):
+    """내보내기 줄 수 / 예상 크기"""
+    return export_preview(get_conn(), user_id, level, since, until)
+
+@st.cache_data(max_entries=256)
+def cached_run_aggregates(user_id, level, version):
+    """(사용자, 레벨) 필터별 평균 / 표준편차 / 성공률. 새 기록이 들어와 version 이 바뀔 때만 다시 센다"""
+    return run_aggregates(get_conn(), user_id, level)
 
 # ----------------------------- 앱 시작 ----------------------------- #
-conn = get_conn()
+with phase("get_conn"):
+    conn = get_conn()
 
 st.title("🤖 로봇 명령 퍼즐 게임")
 
@@ -282,7 +86,8 @@ st.markdown(
 
 # 사용자 ID + 통계
 user_id = st.text_input("사용자 ID (학번 또는 닉네임)", key="user_id")
-user_stats = get_user_stats(conn, user_id, k=20)
+with phase("get_user_stats"):
+    user_stats = get_user_stats(conn, user_id, k=20)
 
 c_info = st.columns(3)
 with c_info[0]:
@@ -298,24 +103,12 @@ st.caption("추천 레벨은 최근 성공률을 바탕으로 개인 맞춤으
 # 상태 초기화
 if "state" not in st.session_state:
     default_level = rec_level if user_stats else LEVEL_NAMES[0]
-    level_info = LEVELS[default_level]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
     st.session_state.state = {
         'level': default_level,
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
+        **new_game(default_level),
         'score': 0,
         'high_score': 0,
         'total_score': 0,
-        'result': '',
-        'commands': []
     }
 
 # command_input 상태 변수 (위젯 key로 쓰지 않음)
@@ -326,21 +119,9 @@ if "command_input" not in st.session_state:
 current_level = st.session_state.state['level']
 selected_level = st.selectbox("레벨 선택", LEVEL_NAMES, index=LEVEL_NAMES.index(current_level))
 if selected_level != st.session_state.state['level']:
-    level_info = LEVELS[selected_level]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
     st.session_state.state.update({
         'level': selected_level,
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
-        'result': '',
-        'commands': []
+        **new_game(selected_level),
     })
     st.session_state["command_input"] = ""
 
@@ -352,15 +133,14 @@ input_text = st.text_area(
 # 사용자가 바꾼 값을 다시 상태에 반영
 st.session_state["command_input"] = input_text
 
-# 간단 보정 + 리스트화
-fixed = []
-for line in input_text.strip().split('\n'):
-    s = line.strip()
-    if s == "앞":
-        s = "앞으로"
-    if s:
-        fixed.append(s)
-command_list = fixed
+# 컴파일 (같은 입력은 캐시에서 바로 꺼냄)
+with phase("compile"):
+    program, command_lines, command_errors = compile_commands(input_text)
+command_list = list(command_lines)
+if command_errors:
+    st.warning("명령어를 확인해 주세요.\n\n" + "\n".join(
+        f"- {line_no}번째 줄 `{cmd}`: {msg}" for line_no, cmd, msg in command_errors
+    ))
 
 # 자동완성
 auto_options = ["앞으로", "앞으로 2", "앞으로 3", "왼쪽으로 이동", "오른쪽으로 이동", "뒤로 이동", "집기"]
@@ -371,144 +151,37 @@ with c2:
     if st.button("➕ 추가"):
         cur = st.session_state.get("command_input", "")
         st.session_state["command_input"] = cur + ("\n" if cur else "") + chosen
-        _rerun()
+        rerun()
 
 # 실행 버튼
-if st.button("실행"):
+c_run1, c_run2 = st.columns([2, 1])
+with c_run1:
+    step_delay_ms = st.slider("애니메이션 속도 (한 명령당 ms)", 50, 1000, 200, step=50)
+with c_run2:
+    skip_animation = st.checkbox("애니메이션 건너뛰기")
+    image_board = st.checkbox("🖼️ 이미지로 보기", key="image_board")
+run_clicked = st.button("실행")
+if run_clicked and command_errors:
+    st.error("잘못된 명령어가 있어서 실행하지 않았습니다.")
+if run_clicked and not command_errors:
     try:
         s = st.session_state.state
-        pos = s['position']
-        direction = s['direction']
-        ghost = s['ghost']
-        ghost_path = []
-        visited_goals = set()
-        failed = False
-
-        for raw in command_list:
-            cmd = raw.strip()
-            if not cmd:
-                continue
-
-            if cmd.startswith("앞으로"):
-                parts = cmd.split()
-                steps = 1
-                if len(parts) > 1:
-                    num = parts[1]
-                    if num.endswith("칸"):
-                        num = num[:-1]
-                    if num.isdigit():
-                        steps = int(num)
-                for _ in range(steps):
-                    tmp = move_forward(pos, direction, 1)
-                    if tmp is None or tmp in s['obstacles']:
-                        s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                        failed = True
-                        break
-                    pos = tmp
-
-            elif cmd == "왼쪽으로 이동":
-                left_dir = DIRECTIONS[(DIRECTIONS.index(direction) - 1) % 4]
-                tmp = move_forward(pos, left_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd == "오른쪽으로 이동":
-                right_dir = DIRECTIONS[(DIRECTIONS.index(direction) + 1) % 4]
-                tmp = move_forward(pos, right_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd == "뒤로 이동":
-                back_dir = DIRECTIONS[(DIRECTIONS.index(direction) + 2) % 4]
-                tmp = move_forward(pos, back_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd in ("왼쪽 회전", "오른쪽 회전"):
-                direction = rotate(direction, cmd)
-
-            elif cmd == "집기" and pos in s['goals']:
-                visited_goals.add(pos)
-
-            if failed:
-                break
-
-            # 귀신 이동
-            if ghost:
-                ghost = move_ghost(ghost, pos, s['obstacles'],
-                                   ignore_obstacles=LEVELS[s['level']].get('ignore_obstacles', False))
-                ghost_path.append(ghost)
-                if pos == ghost:
-                    s['result'] = '👻 귀신에게 잡힘!'
-                    failed = True
-                    break
-
-            # 맵 그리기 + 딜레이
-            draw_grid(pos, direction, ghost, ghost_path, s['obstacles'], s['goals'], s['portals'])
-            time.sleep(0.2)
-
-            # 포탈 처리
-            if s['portals'] and pos in s['portals']:
-                dest = [p for p in s['portals'] if p != pos][0]
-                around = [(dest[0] + d[0], dest[1] + d[1]) for d in MOVE_OFFSET.values()]
-                random.shuffle(around)
-                for a in around:
-                    if 0 <= a[0] < MAP_SIZE and 0 <= a[1] < MAP_SIZE and a not in s['obstacles']:
-                        pos = a
-                        break
-
-        success_flag = False
-        if not failed:
-            score = len(visited_goals) * LEVELS[s['level']]['score']
-            s['score'] = score
-            s['total_score'] += score
-            s['high_score'] = max(s['high_score'], score)
-            s['result'] = f"🎯 목표 도달: {len(visited_goals)}개, 점수: {score}"
-
-            shortest = bfs_shortest_path(s['start'], s['goals'], s['obstacles'])
-            if shortest and len(command_list) == len(shortest) + 2 and len(visited_goals) == 2:
-                s['result'] += '\n🌟 Perfect!'
-
-            # 목표 1개 이상 집으면 성공 판정
-            success_flag = len(visited_goals) > 0
-
-        s.update({
-            'position': pos,
-            'direction': direction,
-            'ghost': ghost,
-            'ghost_path': ghost_path,
-            'commands': command_list
-        })
-
-        # 기록 저장용 steps / optimal_steps
-        steps = len(command_list)
-        optimal_steps = None
-        try:
-            shortest_for_log = bfs_shortest_path(s['start'], s['goals'], s['obstacles'])
-            if shortest_for_log:
-                optimal_steps = len(shortest_for_log) + 2  # 집기 2번 포함 가정
-        except Exception:
-            optimal_steps = None
-
-        log_run(
-            conn=conn,
-            user_id=user_id,
-            level=s['level'],
-            difficulty=LEVEL_DIFFICULTY[s['level']],
-            commands='\n'.join(command_list),
-            success=success_flag,
-            steps=steps,
-            optimal_steps=optimal_steps,
-        )
+        run, solution = run_program(s, program, command_list, step_delay_ms, skip_animation, image_board)
+
+        # 끝까지 실행하고 목표 1개 이상 집으면 성공 판정
+        success_flag = run['outcome'] == OUTCOME_CLEAR and len(run['visited_goals']) > 0
+
+        # 큐에 넣기만 하고 바로 돌아온다 (쓰기는 run-writer 스레드가 모아서)
+        with phase("log_run"):
+            get_run_writer().log_run(
+                user_id=user_id,
+                level=s['level'],
+                difficulty=LEVEL_DIFFICULTY[s['level']],
+                commands='\n'.join(command_list),
+                success=success_flag,
+                steps=len(command_list),
+                optimal_steps=solution['steps'] if solution else None,
+            )
 
     except Exception:
         st.error("실행 중 예외가 발생했습니다. 아래 로그를 확인하세요.")
@@ -517,35 +190,32 @@ if st.button("실행"):
 # 상태 + 맵 표시
 st.markdown(f"**현재 점수:** {st.session_state.state['score']} / **최고 점수:** {st.session_state.state['high_score']} / **누적 점수:** {st.session_state.state['total_score']}")
 st.markdown(f"**결과:** {st.session_state.state['result']}")
-draw_grid(
-    st.session_state.state['position'],
-    st.session_state.state['direction'],
-    st.session_state.state['ghost'],
-    st.session_state.state['ghost_path'],
-    st.session_state.state['obstacles'],
-    st.session_state.state['goals'],
-    st.session_state.state['portals']
-)
+with phase("render"):
+    draw_grid(
+        st.session_state.state['position'],
+        st.session_state.state['direction'],
+        st.session_state.state['ghost'],
+        st.session_state.state['ghost_path'],
+        st.session_state.state['obstacles'],
+        st.session_state.state['goals'],
+        st.session_state.state['portals'],
+        map_renderer(st.session_state.state) if image_board else None,
+    )
+st.caption(f"맵 번호(seed): {st.session_state.state['seed']}")
 
 # 다시 시작
 if st.button("🔁 다시 시작"):
-    level_info = LEVELS[st.session_state.state['level']]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
-    st.session_state.state.update({
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
-        'result': '',
-        'commands': []
-    })
+    st.session_state.state.update(new_game(st.session_state.state['level']))
     st.session_state['command_input'] = ""
-    _rerun()
+    rerun()
+
+# 같은 seed 로 다른 사람의 판을 그대로 다시 만들기
+with st.expander("🔢 맵 번호로 불러오기"):
+    seed_text = st.text_input("맵 번호(seed)", key="load_seed")
+    if st.button("이 맵으로 시작") and seed_text.strip().isdigit():
+        st.session_state.state.update(new_map_state(st.session_state.state['level'], int(seed_text.strip())))
+        st.session_state['command_input'] = ""
+        rerun()
 
 # 설명
 with st.expander("📘 게임 설명"):
@@ -558,53 +228,43 @@ with st.expander("📘 게임 설명"):
 """)
 
 # AI 힌트
-if st.button("🧠 AI 힌트 보기 (-30점)"):
-    s = st.session_state.state
-    if s['total_score'] < 30:
-        st.warning("포인트가 부족합니다! (30점 필요)")
-    else:
-        path = None
-        for g in s['goals']:
-            p = bfs_shortest_path(s['position'], [g], s['obstacles'])
-            if p:
-                path = p
-                break
-        if not path:
-            st.error("경로를 찾을 수 없습니다.")
-        else:
-            s['total_score'] -= 30
-            hint = path_to_commands([s['position']] + path, s['direction'])
-            st.info("**AI 추천 명령어**\n\n" + "\n".join(hint))
+if st.button(f"🧠 AI 힌트 보기 (-{HINT_COST}점)"):
+    show_hint(st.session_state.state)
 
 # ----------------------------- 기록 / 통계 ----------------------------- #
 st.markdown("---")
 st.subheader("📊 명령어 기록 / 통계")
 
-df = load_runs_df(conn)
-if df.empty:
+with phase("data_version"):
+    version = data_version(conn)
+if version == 0:
     st.info("아직 저장된 기록이 없습니다. 먼저 게임을 플레이해 주세요.")
+    log_user = log_level = None
 else:
-    user_options = ["전체"] + sorted([u for u in df["user_id"].dropna().unique().tolist() if u])
+    user_options = ["전체"] + cached_user_options(version)
     selected_user = st.selectbox("사용자 선택", user_options, key="log_user")
     level_options = ["전체"] + LEVEL_NAMES
     selected_level_for_log = st.selectbox("레벨 선택", level_options, key="log_level")
-
-    filtered = df.copy()
-    if selected_user != "전체":
-        filtered = filtered[filtered["user_id"] == selected_user]
-    if selected_level_for_log != "전체":
-        filtered = filtered[filtered["level"] == selected_level_for_log]
-
-    st.dataframe(
-        filtered[["id", "user_id", "run_time", "level", "difficulty", "success", "steps", "optimal_steps", "commands"]],
-        use_container_width=True,
-        height=300,
-    )
-
-    if not filtered.empty:
-        steps_mean = filtered["steps"].mean()
-        steps_std = filtered["steps"].std(ddof=1) if len(filtered) > 1 else 0.0
-        success_rate = filtered["success"].mean()
+    log_user = None if selected_user == "전체" else selected_user
+    log_level = None if selected_level_for_log == "전체" else selected_level_for_log
+
+    with phase("run_aggregates"):
+        agg = cached_run_aggregates(log_user, log_level, version)
+    total_rows = agg["n"] if agg else 0
+    n_pages = max(1, (total_rows + PAGE_SIZE - 1) // PAGE_SIZE)
+    # 필터가 바뀌면 key 가 바뀌어 1페이지부터 다시 본다
+    page = st.number_input("페이지", min_value=1, max_value=n_pages, value=1, step=1,
+                           key=f"log_page_{selected_user}_{selected_level_for_log}")
+    st.caption(f"전체 {total_rows}건 중 {min(total_rows, (page - 1) * PAGE_SIZE + 1)}~{min(total_rows, page * PAGE_SIZE)}번째 (최신순)")
+
+    with phase("load_runs"):
+        runs_page = load_runs_page(conn, log_user, log_level, page=page - 1)
+    st.dataframe(runs_page, use_container_width=True, height=300)
+
+    if agg:
+        steps_mean = agg["steps_mean"]
+        steps_std = agg["steps_std"]
+        success_rate = agg["success_rate"]
 
         c1, c2, c3 = st.columns(3)
         with c1:
@@ -615,28 +275,54 @@ else:
             st.metric("성공률", f"{success_rate*100:.1f}%")
 
 
-import io  # 파일 맨 위에 이미 있으면 또 쓸 필요 없음
-
-# filtered가 존재하지 않는 경우 대비 (기본값)
-if 'filtered' not in locals():
-    filtered = df.copy()
-
-
 # --- CSV 다운로드: 한셀 호환 버전 ---
-safe_df = filtered.copy()
-
-# 줄바꿈 많고 길어서 문제 잘 일으키는 commands 열 제거
-safe_df = safe_df.drop(columns=["commands"], errors="ignore")
-
-# 1) 판다스로 CSV 문자열 만들기 (인코딩 지정 X)
-csv_text = safe_df.to_csv(index=False)
-
-# 2) 우리가 직접 cp949로 인코딩해서 바이트로 변환
-csv_bytes = csv_text.encode("cp949", errors="ignore")
-
-st.download_button(
-    label="현재 데이터 CSV 다운로드",
-    data=csv_bytes,
-    file_name="robot_game_runs.csv",
-    mime="text/csv",
-)
+# 누를 때만 만든다. DB 커서에서 조금씩 꺼내 cp949 로 인코딩하면서 임시 파일에 쓴다.
+with st.expander("📥 CSV 내보내기"):
+    if version == 0:
+        st.caption("내보낼 기록이 없습니다.")
+    else:
+        e1, e2 = st.columns(2)
+        # 처음에는 위 기록 화면에서 고른 필터 그대로
+        with e1:
+            export_user = st.selectbox("사용자", user_options, index=user_options.index(selected_user), key="export_user")
+        with e2:
+            export_level = st.selectbox("레벨", level_options, index=level_options.index(selected_level_for_log), key="export_level")
+        export_dates = st.date_input("기간 (비워 두면 전체)", value=(), key="export_dates")
+        export_filter = {
+            "user_id": None if export_user == "전체" else export_user,
+            "level": None if export_level == "전체" else export_level,
+            "since": export_dates[0].isoformat() if len(export_dates) > 0 else None,
+            "until": (export_dates[-1] + timedelta(days=1)).isoformat() if len(export_dates) > 0 else None,
+        }
+        with phase("export_preview"):
+            n_export, size_export = cached_export_preview(version, **export_filter)
+        st.caption(f"{n_export}줄, 예상 크기 약 {size_export / 1024:,.1f} KB (앞쪽 200줄로 어림한 값)")
+
+        # DB 읽기와 인코딩은 묶음 단위지만, Streamlit 은 돌려받은 파일을 끝까지 읽어 메모리에 올린 뒤 보낸다.
+        # 그래서 다운로드 한 번의 최대 메모리는 CSV 파일 하나 크기다 (위 예상 크기 참고).
+        def build_csv():
+            out = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)  # 만드는 동안 8MB 넘으면 디스크로
+            export_conn = connect()  # 다른 스레드에서 돌기 때문에 따로 연결
+            try:
+                with phase("csv"):  # 스크립트 스레드가 아니라서 프로세스 전체 샘플에만 남는다
+                    export_runs_csv(export_conn, out, **export_filter)
+            finally:
+                export_conn.close()
+            out.seek(0)
+            return out
+
+        if n_export:
+            st.download_button(
+                label="CSV 다운로드",
+                data=build_csv,
+                file_name="robot_game_runs.csv",
+                mime="text/csv",
+            )
+
+
+# 큰 맵 모드 (지금 고른 레벨의 밀도로)
+large_board_panel(st.session_state.state['level'])
+
+# 관리자 사이드바 + 이번 rerun 전체 시간 (맨 마지막에)
+admin_sidebar()
+metrics.finish_rerun()
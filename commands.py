@@ -0,0 +1,208 @@
+# commands.py
+# 한글 명령어 텍스트 -> 정수 opcode 프로그램 컴파일러
+import re
+from functools import lru_cache
+
+# opcode (이동 계열은 0~3, arg = 칸 수)
+OP_FORWARD = 0
+OP_MOVE_LEFT = 1
+OP_MOVE_RIGHT = 2
+OP_MOVE_BACK = 3
+OP_TURN_LEFT = 4
+OP_TURN_RIGHT = 5
+OP_PICK = 6
+OP_NOP = 7  # 알 수 없는 명령 (예전처럼 귀신만 한 칸 움직인다)
+
+# 방향은 DIRECTIONS 인덱스 (0=UP, 1=RIGHT, 2=DOWN, 3=LEFT)
+TURN_LEFT = [3, 0, 1, 2]
+TURN_RIGHT = [1, 2, 3, 0]
+# MOVE_DIR[op][d]: 바라보는 방향 d 에서 이동 계열 op 가 실제로 움직이는 방향
+MOVE_DIR = [
+    [d for d in range(4)],
+    [(d + 3) % 4 for d in range(4)],
+    [(d + 1) % 4 for d in range(4)],
+    [(d + 2) % 4 for d in range(4)],
+]
+
+SIMPLE_COMMANDS = {
+    "왼쪽으로 이동": OP_MOVE_LEFT,
+    "오른쪽으로 이동": OP_MOVE_RIGHT,
+    "뒤로 이동": OP_MOVE_BACK,
+    "왼쪽 회전": OP_TURN_LEFT,
+    "오른쪽 회전": OP_TURN_RIGHT,
+    "집기": OP_PICK,
+}
+FORWARD_RE = re.compile(r"^앞으로(?:\s+(\d+)\s*칸?)?$")
+
+
+def _legacy_forward_steps(cmd):
+    # 문법에 맞지 않는 "앞으로..." 줄을 예전 인터프리터가 해석하던 칸 수
+    parts = cmd.split()
+    steps = 1
+    if len(parts) > 1:
+        num = parts[1]
+        if num.endswith("칸"):
+            num = num[:-1]
+        if num.isdigit():
+            steps = int(num)
+    return steps
+
+
+def compile_line(cmd):
+    """명령어 한 줄 -> (op, arg, 오류 메시지 또는 None)"""
+    m = FORWARD_RE.match(cmd)
+    if m:
+        return OP_FORWARD, int(m.group(1)) if m.group(1) else 1, None
+    op = SIMPLE_COMMANDS.get(cmd)
+    if op is not None:
+        return op, 1, None
+    if cmd.startswith("앞으로"):
+        return OP_FORWARD, _legacy_forward_steps(cmd), "'앞으로', '앞으로 2', '앞으로 3칸' 형식으로 써 주세요"
+    return OP_NOP, 0, "알 수 없는 명령어입니다"
+
+
+@lru_cache(maxsize=1024)
+def compile_commands(text):
+    """명령어 텍스트를 컴파일한다. 같은 텍스트는 캐시에서 바로 돌려준다.
+
+    반환값 (program, lines, errors)
+      program: (op, arg) 를 이어 붙인 정수 튜플
+      lines:   빈 줄을 뺀 정리된 명령어 문자열 튜플 ("앞" -> "앞으로")
+      errors:  (줄 번호, 원문, 메시지) 튜플. 오류 줄도 예전 인터프리터와
+               같은 뜻으로 program 에 들어가 있다.
+    """
+    program = []
+    lines = []
+    errors = []
+    for line_no, raw in enumerate(text.split('\n'), start=1):
+        cmd = raw.strip()
+        if cmd == "앞":
+            cmd = "앞으로"
+        if not cmd:
+            continue
+        op, arg, error = compile_line(cmd)
+        program.extend((op, arg))
+        lines.append(cmd)
+        if error:
+            errors.append((line_no, cmd, error))
+    return tuple(program), tuple(lines), tuple(errors)
+
+
+def as_program(commands):
+    """명령어 텍스트 / 명령어 리스트 / 이미 컴파일된 프로그램을 프로그램으로 맞춘다"""
+    if isinstance(commands, str):
+        return compile_commands(commands)[0]
+    if commands and isinstance(commands[0], str):
+        return compile_commands('\n'.join(commands))[0]
+    return tuple(commands)
+
+
+# ----------------------------- 저장용 바이너리 인코딩 ----------------------------- #
+# runs.commands 에 텍스트 대신 넣는 BLOB. 첫 바이트는 형식 버전, 그 뒤로 줄마다 토큰 하나.
+#   0~6            : 바뀐 글자 없는 기본 명령 한 줄 (opcode 그대로, 0 = "앞으로")
+#   CODE_FORWARD_N : "앞으로 N"   + varint N
+#   CODE_FORWARD_KAN: "앞으로 N칸" + varint N
+#   CODE_REPEAT    : 바로 앞 줄을 varint 번 더 반복
+#   CODE_LITERAL   : 위 형태가 아닌 줄 (띄어쓰기가 다르거나 잘못된 명령) + varint 길이 + UTF-8
+# 어떤 텍스트든 decode_commands(encode_commands(t)) == t 이다.
+ENCODING_VERSION = 1
+CODE_FORWARD_N = 8
+CODE_FORWARD_KAN = 9
+CODE_REPEAT = 10
+CODE_LITERAL = 11
+
+_CODE_TEXT = {OP_FORWARD: "앞으로", **{op: text for text, op in SIMPLE_COMMANDS.items()}}
+_TEXT_CODE = {text: op for op, text in _CODE_TEXT.items()}
+_CODE_TEXT_LIST = [_CODE_TEXT[code] for code in range(OP_NOP)]
+_FORWARD_N_RE = re.compile(r"^앞으로 ([1-9][0-9]*)(칸?)$")  # \d 는 ٣ 같은 다른 숫자도 받아서 되돌릴 수 없다
+
+
+def _put_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(data, i):
+    n = shift = 0
+    while True:
+        b = data[i]
+        i += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, i
+        shift += 7
+
+
+def _encode_line(out, line):
+    code = _TEXT_CODE.get(line)
+    if code is not None:
+        out.append(code)
+        return
+    m = _FORWARD_N_RE.match(line)
+    if m:
+        out.append(CODE_FORWARD_KAN if m.group(2) else CODE_FORWARD_N)
+        _put_varint(out, int(m.group(1)))
+        return
+    raw = line.encode("utf-8")
+    out.append(CODE_LITERAL)
+    _put_varint(out, len(raw))
+    out += raw
+
+
+def encode_commands(text):
+    """명령어 텍스트 -> 저장용 bytes (None 은 None)"""
+    if text is None:
+        return None
+    out = bytearray((ENCODING_VERSION,))
+    if text == "":
+        return bytes(out)
+    lines = text.split("\n")
+    i = 0
+    while i < len(lines):
+        j = i + 1
+        while j < len(lines) and lines[j] == lines[i]:
+            j += 1
+        _encode_line(out, lines[i])
+        if j - i > 1:
+            out.append(CODE_REPEAT)
+            _put_varint(out, j - i - 1)
+        i = j
+    return bytes(out)
+
+
+def decode_commands(data):
+    """encode_commands 의 반대. 예전 텍스트(str)와 None 은 그대로 돌려준다"""
+    if data is None or isinstance(data, str):
+        return data
+    if not data or data[0] != ENCODING_VERSION:
+        raise ValueError(f"알 수 없는 명령어 인코딩 버전: {data[:1]!r}")
+    code_text = _CODE_TEXT_LIST
+    lines = []
+    append = lines.append
+    i = 1
+    end = len(data)
+    while i < end:
+        code = data[i]
+        i += 1
+        if code < OP_NOP:
+            append(code_text[code])
+            continue
+        if code == OP_NOP or code > CODE_LITERAL:
+            raise ValueError(f"알 수 없는 명령어 코드: {code}")
+        # 뒤따르는 varint (대부분 한 바이트)
+        n = data[i]
+        i += 1
+        if n >= 0x80:
+            n, i = _get_varint(data, i - 1)
+        if code == CODE_FORWARD_N:
+            append(f"앞으로 {n}")
+        elif code == CODE_FORWARD_KAN:
+            append(f"앞으로 {n}칸")
+        elif code == CODE_REPEAT:
+            lines.extend([lines[-1]] * n)
+        else:
+            append(bytes(data[i:i + n]).decode("utf-8"))
+            i += n
+    return "\n".join(lines)
@@ -0,0 +1,215 @@
+# engine.py
+# 화면 없이 명령어를 실행하는 시뮬레이터 (채점 / 다시보기 / 부하 테스트용)
+import random
+from array import array
+
+from game_core import DIRECTIONS, MOVE_OFFSET, LEVELS, MAP_SIZE, blocked_cells, cell_index
+from commands import OP_MOVE_BACK, OP_TURN_LEFT, OP_TURN_RIGHT, OP_PICK, MOVE_DIR, TURN_LEFT, TURN_RIGHT, as_program
+from large_grid import step_ghosts, ghost_hits
+
+# 실행 결과
+OUTCOME_CLEAR = 'clear'    # 명령어를 끝까지 실행
+OUTCOME_CRASH = 'crash'    # 장애물 충돌 또는 벽 밖으로 벗어남
+OUTCOME_CAUGHT = 'caught'  # 귀신에게 잡힘
+
+# DIRECTIONS 순서(0=UP, 1=RIGHT, 2=DOWN, 3=LEFT)의 이동량
+DIR_DR = [MOVE_OFFSET[d][0] for d in DIRECTIONS]
+DIR_DC = [MOVE_OFFSET[d][1] for d in DIRECTIONS]
+
+
+def prepare_map(game_map):
+    """맵 하나를 시뮬레이션용 자료로 바꿔 둔다 (여러 번 실행할 때 재사용)"""
+    level_info = LEVELS[game_map['level']]
+    return {
+        'blocked': blocked_cells(game_map['obstacles']),
+        'goals': set(game_map['goals']),
+        'portals': list(game_map['portals']),
+        'ignore_obstacles': level_info.get('ignore_obstacles', False),
+        'score': level_info['score'],
+    }
+
+
+def _run(prepared, start_state, program, rng, trajectory):
+    blocked = prepared['blocked']
+    goals = prepared['goals']
+    portals = prepared['portals']
+    ignore_obstacles = prepared['ignore_obstacles']
+
+    r, c = start_state['position']
+    d = DIRECTIONS.index(start_state['direction'])
+    ghost = start_state['ghost']
+    ghost_path = []
+    visited_goals = set()
+    outcome = OUTCOME_CLEAR
+
+    for i in range(0, len(program), 2):
+        op = program[i]
+        if op <= OP_MOVE_BACK:
+            dr, dc = DIR_DR[MOVE_DIR[op][d]], DIR_DC[MOVE_DIR[op][d]]
+            for _ in range(program[i + 1]):
+                nr, nc = r + dr, c + dc
+                if not (0 <= nr < MAP_SIZE and 0 <= nc < MAP_SIZE) or blocked[nr * MAP_SIZE + nc]:
+                    outcome = OUTCOME_CRASH
+                    break
+                r, c = nr, nc
+            if outcome == OUTCOME_CRASH:
+                break
+        elif op == OP_TURN_LEFT:
+            d = TURN_LEFT[d]
+        elif op == OP_TURN_RIGHT:
+            d = TURN_RIGHT[d]
+        elif op == OP_PICK and (r, c) in goals:
+            visited_goals.add((r, c))
+
+        # 귀신 이동 (game_core.move_ghost 와 같은 규칙)
+        if ghost:
+            gr, gc = ghost
+            if gr != r:
+                nr = gr + (1 if r > gr else -1)
+                if 0 <= nr < MAP_SIZE and (ignore_obstacles or not blocked[nr * MAP_SIZE + gc]):
+                    ghost = (nr, gc)
+            if ghost == (gr, gc) and gc != c:
+                nc = gc + (1 if c > gc else -1)
+                if 0 <= nc < MAP_SIZE and (ignore_obstacles or not blocked[gr * MAP_SIZE + nc]):
+                    ghost = (gr, nc)
+            ghost_path.append(ghost)
+            if (r, c) == ghost:
+                outcome = OUTCOME_CAUGHT
+                break
+
+        # 화면에 한 장면 그려지는 시점
+        if trajectory is not None:
+            trajectory.extend((r * MAP_SIZE + c, d, cell_index(ghost) if ghost else -1))
+
+        # 포탈 처리
+        if portals and (r, c) in portals:
+            dest = [p for p in portals if p != (r, c)][0]
+            around = [(dest[0] + dd[0], dest[1] + dd[1]) for dd in MOVE_OFFSET.values()]
+            rng.shuffle(around)
+            for a in around:
+                if 0 <= a[0] < MAP_SIZE and 0 <= a[1] < MAP_SIZE and not blocked[a[0] * MAP_SIZE + a[1]]:
+                    r, c = a
+                    break
+
+    return {
+        'outcome': outcome,
+        'position': (r, c),
+        'direction': DIRECTIONS[d],
+        'ghost': ghost,
+        'ghost_path': ghost_path,
+        'visited_goals': visited_goals,
+        'score': len(visited_goals) * prepared['score'] if outcome == OUTCOME_CLEAR else 0,
+    }
+
+
+def simulate(game_map, start_state, commands, record=False, rng=random):
+    """commands 를 끝까지 실행한 최종 상태와 결과
+
+    game_map 은 level / obstacles / goals / portals, start_state 는
+    position / direction / ghost 를 가진 dict (세션 state 를 그대로 넘겨도 된다).
+    commands 는 명령어 텍스트, 명령어 리스트, compile_commands 로 만든 program 중 하나.
+    record=True 이면 'trajectory' 에 장면마다 (위치 칸, 방향, 귀신 칸) 정수 3개를
+    이어 붙인 array 를 담는다. 포탈 도착 칸은 rng 로 정한다.
+    """
+    trajectory = array('i') if record else None
+    result = _run(prepare_map(game_map), start_state, as_program(commands), rng, trajectory)
+    result['trajectory'] = trajectory
+    return result
+
+
+def script_rng(seed, i):
+    """simulate_batch 의 i 번째 스크립트가 쓰는 포탈 난수 (하나만 다시 돌릴 때 simulate(rng=...) 에 넘긴다)"""
+    return random.Random(f"{seed}:{i}")
+
+
+def simulate_batch(game_map, start_state, scripts, seed=0):
+    """한 맵에 대해 여러 명령어 스크립트를 한 번에 채점한다
+
+    scripts 의 각 항목은 명령어 텍스트, 명령어 리스트 또는 컴파일된 program.
+    포탈 난수는 스크립트마다 script_rng(seed, 번호) 로 따로 정하므로, 앞 스크립트가
+    난수를 몇 번 썼는지와 상관없이 각 결과를 하나씩 다시 만들 수 있다.
+    """
+    prepared = prepare_map(game_map)
+    results = []
+    for i, script in enumerate(scripts):
+        program = as_program(script)
+        res = _run(prepared, start_state, program, script_rng(seed, i), None)
+        results.append({
+            'outcome': res['outcome'],
+            'goals': len(res['visited_goals']),
+            'score': res['score'],
+            'steps': len(program) // 2,
+        })
+    return results
+
+
+def iter_frames(trajectory):
+    """trajectory array 를 (위치, 방향, 귀신) 장면으로 풀어낸다"""
+    for i in range(0, len(trajectory), 3):
+        pos, d, ghost = trajectory[i], trajectory[i + 1], trajectory[i + 2]
+        yield divmod(pos, MAP_SIZE), DIRECTIONS[d], divmod(ghost, MAP_SIZE) if ghost >= 0 else None
+
+
+# ----------------------------- 큰 맵 ----------------------------- #
+def simulate_board(board, start_state, commands, rng=random):
+    """large_grid 의 큰 맵(board dict)에서 commands 를 끝까지 실행한 결과 (simulate 와 같은 규칙, trajectory 없음)
+
+    start_state 는 position / direction / ghosts((N, 2) 배열) 를 가진 dict (large_grid.new_board_state 의 상태).
+    칸 검사는 테두리에 벽을 두른 board['blocked_flat'] 하나로 하므로 맵 밖으로 나가는 것도 충돌이다.
+    귀신은 명령 하나마다 step_ghosts 로 한꺼번에 움직이고, 잡혔는지도 배열 비교 한 번으로 본다.
+    """
+    program = as_program(commands)
+    stride = board['stride']
+    blocked = board['blocked_flat']
+    goal_mask = board['goal_mask']
+    portals = [tuple(p) for p in board['portals'].tolist()]
+    ignore_obstacles = LEVELS[board['level']].get('ignore_obstacles', False)
+
+    r, c = start_state['position']
+    d = DIRECTIONS.index(start_state['direction'])
+    ghosts = start_state['ghosts']
+    visited_goals = set()
+    outcome = OUTCOME_CLEAR
+
+    for i in range(0, len(program), 2):
+        op = program[i]
+        if op <= OP_MOVE_BACK:
+            dr, dc = DIR_DR[MOVE_DIR[op][d]], DIR_DC[MOVE_DIR[op][d]]
+            for _ in range(program[i + 1]):
+                if blocked[(r + dr + 1) * stride + c + dc + 1]:
+                    outcome = OUTCOME_CRASH
+                    break
+                r, c = r + dr, c + dc
+            if outcome == OUTCOME_CRASH:
+                break
+        elif op == OP_TURN_LEFT:
+            d = TURN_LEFT[d]
+        elif op == OP_TURN_RIGHT:
+            d = TURN_RIGHT[d]
+        elif op == OP_PICK and goal_mask[r, c]:
+            visited_goals.add((r, c))
+
+        if len(ghosts):
+            ghosts = step_ghosts(board, ghosts, (r, c), ignore_obstacles)
+            if ghost_hits(ghosts, (r, c)).any():
+                outcome = OUTCOME_CAUGHT
+                break
+
+        # 포탈 처리 (_run 과 같은 규칙)
+        if portals and (r, c) in portals:
+            dest = [p for p in portals if p != (r, c)][0]
+            around = [(dest[0] + dd[0], dest[1] + dd[1]) for dd in MOVE_OFFSET.values()]
+            rng.shuffle(around)
+            for a in around:
+                if not blocked[(a[0] + 1) * stride + a[1] + 1]:
+                    r, c = a
+                    break
+
+    return {
+        'outcome': outcome,
+        'position': (r, c),
+        'direction': DIRECTIONS[d],
+        'ghosts': ghosts,
+        'visited_goals': visited_goals,
+        'score': len(visited_goals) * LEVELS[board['level']]['score'] if outcome == OUTCOME_CLEAR else 0,
+    }
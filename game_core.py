@@ -0,0 +1,317 @@
+# game_core.py
+# catch.py / main.py 가 같이 쓰는 게임 로직 (streamlit 없이 import 가능)
+import random
+from collections import deque
+
+# ----------------------------- 설정 ----------------------------- #
+DIRECTIONS = ['UP', 'RIGHT', 'DOWN', 'LEFT']
+MOVE_OFFSET = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
+# large_ghost_cells: 큰 맵 모드(large_grid)에서 이 칸 수마다 귀신 한 마리. 9x9 맵에서는 귀신 한 마리
+LEVELS = {
+    "Level 1 (5점, 착한맛)": {"obstacles": 8, "score": 5, "ghost": False},
+    "Level 2 (10점, 보통맛)": {"obstacles": 14, "score": 10, "ghost": False},
+    "Level 3 (20점, 매운맛)": {"obstacles": 20, "score": 20, "ghost": False},
+    "Level 4 (30점, 불닭맛)": {"obstacles": 24, "score": 30, "ghost": True, "ghost_range": 4, "ignore_obstacles": False, "large_ghost_cells": 2000},
+    "Level 5 (50점, 핵불닭맛)": {"obstacles": 28, "score": 50, "ghost": True, "ghost_range": 3, "ignore_obstacles": True, "portals": True, "large_ghost_cells": 1500},
+}
+MAP_SIZE = 9
+PORTAL_SYMBOL = '🌀'
+
+LEVEL_NAMES = list(LEVELS.keys())
+LEVEL_DIFFICULTY = {name: i + 1 for i, name in enumerate(LEVEL_NAMES)}  # 난이도 1~5
+
+# 평면 배열 격자: 칸 (r, c) 의 인덱스는 r * MAP_SIZE + c
+# NEIGHBORS[i] 는 MOVE_OFFSET 순서(위/아래/왼쪽/오른쪽)의 이웃 인덱스
+NEIGHBORS = [
+    [
+        (r + dr) * MAP_SIZE + (c + dc)
+        for dr, dc in MOVE_OFFSET.values()
+        if 0 <= r + dr < MAP_SIZE and 0 <= c + dc < MAP_SIZE
+    ]
+    for r in range(MAP_SIZE)
+    for c in range(MAP_SIZE)
+]
+# RING[i] 는 칸 i 를 둘러싼 8칸 (위부터 시계방향, 짝수 자리가 상하좌우 이웃), 격자 밖은 -1
+RING = [
+    [
+        (r + dr) * MAP_SIZE + (c + dc) if 0 <= r + dr < MAP_SIZE and 0 <= c + dc < MAP_SIZE else -1
+        for dr, dc in ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+    ]
+    for r in range(MAP_SIZE)
+    for c in range(MAP_SIZE)
+]
+# 칸 i 를 비트 i 로 둔 81비트 정수 (generate_map 의 연결 확인용)
+ALL_BITS = (1 << (MAP_SIZE * MAP_SIZE)) - 1
+FIRST_COL_BITS = sum(1 << (r * MAP_SIZE) for r in range(MAP_SIZE))
+LAST_COL_BITS = FIRST_COL_BITS << (MAP_SIZE - 1)
+NEIGHBOR_BITS = [sum(1 << n for n in NEIGHBORS[i]) for i in range(MAP_SIZE * MAP_SIZE)]
+
+# ----------------------------- 최단 경로 ----------------------------- #
+def cell_index(pos):
+    return pos[0] * MAP_SIZE + pos[1]
+
+def cell_pos(idx):
+    return divmod(idx, MAP_SIZE)
+
+def blocked_cells(obstacles):
+    blocked = bytearray(MAP_SIZE * MAP_SIZE)
+    for o in obstacles:
+        blocked[cell_index(o)] = 1
+    return blocked
+
+def distance_field(source, obstacles, stop_at=None):
+    """source 에서 BFS. (거리 배열, 부모 배열) 반환, 도달 불가 칸은 -1
+
+    stop_at 에 인덱스 집합을 주면 그 중 하나에 처음 닿는 순간 멈추고
+    (dist, parent, 닿은 인덱스) 를 반환한다.
+    """
+    blocked = blocked_cells(obstacles)
+    dist = [-1] * (MAP_SIZE * MAP_SIZE)
+    parent = [-1] * (MAP_SIZE * MAP_SIZE)
+    s = cell_index(source)
+    dist[s] = 0
+    queue = deque([s])
+    while queue:
+        cur = queue.popleft()
+        if stop_at is not None and cur in stop_at:
+            return dist, parent, cur
+        d = dist[cur] + 1
+        for nxt in NEIGHBORS[cur]:
+            if dist[nxt] < 0 and not blocked[nxt]:
+                dist[nxt] = d
+                parent[nxt] = cur
+                queue.append(nxt)
+    if stop_at is not None:
+        return dist, parent, None
+    return dist, parent
+
+def _walk_parents(parent, idx, root):
+    """parent 포인터를 따라 idx -> root 로 걸으며 지나는 칸 목록 (idx 제외, root 포함)"""
+    path = []
+    while idx != root:
+        idx = parent[idx]
+        path.append(cell_pos(idx))
+    return path
+
+def _path_from_root(parent, idx, root):
+    """root 에서 idx 까지의 칸 목록 (root 제외, idx 포함)"""
+    # 부모를 따라가면 idx -> root 순서이므로 뒤집는다
+    path = [cell_pos(idx)] + _walk_parents(parent, idx, root)[:-1]
+    path.reverse()
+    return path
+
+def bfs_shortest_path(start, goals, obstacles):
+    """start 에서 가장 가까운 goal 까지의 칸 목록 (start 제외, goal 포함). 없으면 []"""
+    targets = {cell_index(g) for g in goals}
+    _, parent, hit = distance_field(start, obstacles, stop_at=targets)
+    if hit is None or hit == cell_index(start):
+        return []
+    return _path_from_root(parent, hit, cell_index(start))
+
+# ----------------------------- 유틸/로직 ----------------------------- #
+def _keeps_connected_locally(idx, blocked):
+    """idx 를 막아도 주변 8칸 안에서 상하좌우 빈 이웃끼리 계속 이어져 있는지"""
+    ring = RING[idx]
+    free = [r >= 0 and not blocked[r] for r in ring]
+    edges = links = 0
+    for k in range(0, 8, 2):
+        if free[k]:
+            edges += 1
+            # 이전 이웃(k-2)과 그 사이 대각선 칸(k-1)이 비어 있으면 둘은 이어져 있다
+            if free[k - 1] and free[k - 2]:
+                links += 1
+    return edges - links <= 1
+
+def _keeps_connected(idx, free_bits):
+    """idx 를 막은 뒤에도 idx 의 빈 이웃끼리 서로 닿는지 (비트보드 flood fill)
+
+    막기 전에는 빈 칸이 전부 이어져 있으므로, 이웃끼리만 이어져 있으면 나머지 칸도 모두 이어져 있다.
+    한 번에 BFS 한 층을 정수 시프트 몇 번으로 넓히고, 이웃을 다 만나면 바로 멈춘다.
+    """
+    free = free_bits & ~(1 << idx)
+    targets = NEIGHBOR_BITS[idx] & free
+    reach = targets & -targets  # 이웃 하나에서 시작
+    if reach == targets:
+        return True
+    while True:
+        grown = (
+            reach
+            | (reach << 1 & ~FIRST_COL_BITS)
+            | (reach >> 1 & ~LAST_COL_BITS)
+            | reach << MAP_SIZE
+            | reach >> MAP_SIZE
+        ) & free
+        if grown & targets == targets:
+            return True
+        if grown == reach:
+            return False
+        reach = grown
+
+def generate_map(obstacle_count, goal_count=2, use_portals=False, rng=random):
+    """장애물을 하나씩 놓되, 빈 칸 전체가 시작점과 이어진 상태를 항상 유지한다.
+
+    빈 칸이 모두 연결돼 있으므로 목표/포탈을 어디에 놓아도 도달 가능하고,
+    맵을 버리고 다시 만드는 일이 없다. rng 에 random.Random(seed) 를 주면 재현 가능.
+    """
+    cells = MAP_SIZE * MAP_SIZE
+    start = rng.randrange(cells)
+    blocked = bytearray(cells)
+    free_bits = ALL_BITS
+    candidates = [i for i in range(cells) if i != start]
+    rng.shuffle(candidates)
+    placed = 0
+    while placed < obstacle_count:
+        skipped = []
+        for idx in candidates:
+            if placed == obstacle_count:
+                break
+            # 대부분은 주변 8칸만 보고 판정되고, 애매할 때만 비트보드로 이웃끼리 이어지는지 확인한다
+            if _keeps_connected_locally(idx, blocked) or _keeps_connected(idx, free_bits):
+                blocked[idx] = 1
+                free_bits &= ~(1 << idx)
+                placed += 1
+            else:
+                skipped.append(idx)
+        if len(skipped) == len(candidates):
+            raise ValueError(f"장애물 {obstacle_count}개를 연결을 유지하며 놓을 수 없습니다")
+        # 건너뛴 칸도 다른 칸이 막힌 뒤에는 놓을 수 있게 될 수 있다
+        candidates = skipped
+
+    positions = [cell_pos(i) for i in range(cells) if i != start and not blocked[i]]
+    goals = rng.sample(positions, goal_count)
+    positions = [p for p in positions if p not in goals]
+
+    portals = rng.sample(positions, 2) if use_portals else []
+    obstacles = {cell_pos(i) for i in range(cells) if blocked[i]}
+    return cell_pos(start), obstacles, goals, portals
+
+def rotate(current_direction, rotation_command):
+    idx = DIRECTIONS.index(current_direction)
+    if rotation_command == "오른쪽 회전":
+        return DIRECTIONS[(idx + 1) % 4]
+    elif rotation_command == "왼쪽 회전":
+        return DIRECTIONS[(idx - 1) % 4]
+    return current_direction
+
+def move_forward(pos, direction, steps=1):
+    for _ in range(steps):
+        dx, dy = MOVE_OFFSET[direction]
+        pos = (pos[0] + dx, pos[1] + dy)
+        if not (0 <= pos[0] < MAP_SIZE and 0 <= pos[1] < MAP_SIZE):
+            return None
+    return pos
+
+def move_ghost(pos, target, obstacles, ignore_obstacles=False):
+    dx, dy = target[0] - pos[0], target[1] - pos[1]
+    options = []
+    if dx != 0:
+        options.append((pos[0] + (1 if dx > 0 else -1), pos[1]))
+    if dy != 0:
+        options.append((pos[0], pos[1] + (1 if dy > 0 else -1)))
+    for opt in options:
+        if 0 <= opt[0] < MAP_SIZE and 0 <= opt[1] < MAP_SIZE:
+            if ignore_obstacles or opt not in obstacles:
+                return opt
+    return pos
+
+def render_grid(position, direction, ghost, ghost_path, obstacles, goals, portals):
+    """맵 한 장면을 이모지 문자열로 만든다 (화면 출력은 호출하는 쪽에서)"""
+    grid = ""
+    for i in range(MAP_SIZE):
+        for j in range(MAP_SIZE):
+            cell = '⬜'
+            if (i, j) == position:
+                cell = '🤡'
+            elif (i, j) in obstacles:
+                cell = '⬛'
+            elif (i, j) in goals:
+                cell = '🎯'
+            elif (i, j) == ghost:
+                cell = '👻'
+            elif (i, j) in ghost_path:
+                cell = '·'
+            elif (i, j) in portals:
+                cell = PORTAL_SYMBOL
+            grid += cell
+        grid += '\n'
+    return grid
+
+def path_to_commands(path, initial_direction='UP'):
+    cmds = []
+    direction = initial_direction
+    forward_count = 0
+
+    def flush_forward():
+        nonlocal forward_count
+        if forward_count == 1:
+            cmds.append("앞으로")
+        elif forward_count > 1:
+            cmds.append(f"앞으로 {forward_count}칸")
+        forward_count = 0
+
+    for i in range(1, len(path)):
+        cur = path[i - 1]
+        nxt = path[i]
+        dx, dy = nxt[0] - cur[0], nxt[1] - cur[1]
+        target_dir = None
+        for dir_name, (dx_off, dy_off) in MOVE_OFFSET.items():
+            if (dx, dy) == (dx_off, dy_off):
+                target_dir = dir_name
+                break
+        if target_dir is None:
+            continue
+
+        if direction == target_dir:
+            forward_count += 1
+        else:
+            flush_forward()
+            while direction != target_dir:
+                cur_idx = DIRECTIONS.index(direction)
+                tgt_idx = DIRECTIONS.index(target_dir)
+                if (tgt_idx - cur_idx) % 4 == 1:
+                    cmds.append("오른쪽 회전")
+                    direction = rotate(direction, "오른쪽 회전")
+                else:
+                    cmds.append("왼쪽 회전")
+                    direction = rotate(direction, "왼쪽 회전")
+            forward_count = 1
+
+    flush_forward()
+    cmds.append("집기")
+    return cmds
+
+def new_seed():
+    return random.getrandbits(32)
+
+def generate_level_map(level_name, seed):
+    """seed 가 같으면 항상 같은 level_name 맵 (start, obstacles, goals, portals)"""
+    level_info = LEVELS[level_name]
+    return generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False), rng=random.Random(seed))
+
+def new_map_state(level_name, seed=None, layout=None):
+    """level_name 레벨의 새 맵과 초기 위치/귀신 상태
+
+    맵 은행에서 꺼낸 (seed, layout) 을 넘기면 그대로 쓰고, 없으면 여기서 만든다.
+    """
+    if seed is None:
+        seed = new_seed()
+    if layout is None:
+        layout = generate_level_map(level_name, seed)
+    level_info = LEVELS[level_name]
+    start, obstacles, goals, portals = layout
+    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
+    return {
+        'seed': seed,
+        'start': start,
+        'position': start,
+        'direction': 'UP',
+        'obstacles': obstacles,
+        'goals': goals,
+        'portals': portals,
+        'ghost': ghost,
+        'ghost_path': [],
+        'result': '',
+        'commands': [],
+        'solutions': {},  # solver.map_solution 이 (위치, 방향) 별 최적 풀이를 채운다
+        'renderer': None,  # board_render.map_renderer 가 맵마다 한 번 만든다
+    }
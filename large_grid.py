@@ -0,0 +1,346 @@
+# large_grid.py
+# 큰 맵 모드 (최대 512x512). 장애물 / 목표 / 방문 표시를 NumPy 배열로 들고,
+# 도달 가능 여부와 거리장을 칸 단위 파이썬 반복 대신 프런티어 전체를 한 번에 넓히는 BFS 로 계산한다.
+#   python large_grid.py bench --sizes 9 64 128 256 512
+#
+# 배열은 가장자리에 한 칸씩 벽을 두른 (size + 2) x (size + 2) 를 1차원으로 편 것이다.
+# 칸 (r, c) 는 (r + 1) * stride + (c + 1) 이고, 이웃은 +-1 / +-stride 라서 범위 검사가 필요 없다.
+#
+# 귀신 여럿: 귀신 위치는 (N, 2) 배열이고, 명령 하나마다 step_ghosts 한 번으로 전부 움직인다.
+# 귀신 레벨은 LEVELS 의 large_ghost_cells 칸마다 한 마리 (512x512 레벨 4 -> 131마리, 레벨 5 -> 175마리).
+#   python large_grid.py ghosts --counts 10 100 1000
+#
+# 게임에서는 두 앱의 "큰 맵 모드" 패널(app_ui.large_board_panel)이 new_board_state 로 판을 만들고
+# engine.simulate_board 로 명령어를 돌린다.
+import time
+from collections import deque
+
+import numpy as np
+
+from game_core import LEVELS, MAP_SIZE, new_seed
+
+LARGE_MAX_SIZE = 512
+MAX_GENERATE_TRIES = 100
+
+
+def level_density(level_name):
+    """LEVELS 의 장애물 수를 9x9 맵(시작 칸 제외) 기준 밀도로 바꾼 값"""
+    return LEVELS[level_name]['obstacles'] / (MAP_SIZE * MAP_SIZE - 1)
+
+
+# ----------------------------- 좌표 ----------------------------- #
+def flat_index(board, pos):
+    """(r, c) 또는 (N, 2) 배열 -> 테두리 포함 평면 인덱스"""
+    pos = np.asarray(pos)
+    return (pos[..., 0] + 1) * board['stride'] + pos[..., 1] + 1
+
+
+def flat_pos(board, idx):
+    """평면 인덱스(또는 배열) -> (r, c) 배열"""
+    r, c = np.divmod(np.asarray(idx), board['stride'])
+    return np.stack([r - 1, c - 1], axis=-1)
+
+
+def _offsets(stride):
+    # game_core.MOVE_OFFSET 순서 (위 / 아래 / 왼쪽 / 오른쪽)
+    return np.array([-stride, stride, -1, 1], dtype=np.int64)
+
+
+# ----------------------------- 거리장 ----------------------------- #
+def distance_field(board, sources):
+    """sources(칸 하나 또는 (N, 2) 배열)에서의 BFS 거리 (size x size int32, 도달 불가 -1)
+
+    한 단계마다 프런티어 칸 전부의 이웃을 배열 연산으로 모아 아직 안 간 빈 칸만 남긴다.
+    모든 칸은 한 번씩만 프런티어에 들어가므로 전체 일은 칸 수에 비례하고,
+    파이썬 반복은 BFS 깊이만큼만 돈다. 여러 출발점을 주면 가장 가까운 곳까지의 거리.
+    """
+    stride = board['stride']
+    unseen = ~board['blocked_flat']  # 아직 안 간 빈 칸
+    dist = np.full(unseen.shape, -1, dtype=np.int32)
+    owner = np.empty(unseen.shape, dtype=np.int64)
+    frontier = np.unique(np.atleast_1d(flat_index(board, np.asarray(sources).reshape(-1, 2))))
+    frontier = frontier[unseen[frontier]]
+    unseen[frontier] = False
+    dist[frontier] = 0
+    offsets = _offsets(stride)
+    d = 0
+    while frontier.size:
+        d += 1
+        nxt = (frontier[:, None] + offsets).ravel()
+        nxt = nxt[unseen[nxt]]
+        # 같은 칸이 여러 프런티어 칸의 이웃일 수 있다. 칸마다 마지막으로 쓴 자리만 남겨 중복을 없앤다
+        # (np.unique 는 정렬이라 느리다)
+        order = np.arange(nxt.size)
+        owner[nxt] = order
+        nxt = nxt[owner[nxt] == order]
+        unseen[nxt] = False
+        dist[nxt] = d
+        frontier = nxt
+    return dist.reshape(stride, stride)[1:-1, 1:-1]
+
+
+def reachable(board, source=None):
+    """source(기본: 시작 칸)에서 갈 수 있는 칸 (size x size bool)"""
+    return distance_field(board, board['start'] if source is None else source) >= 0
+
+
+def python_distance_field(board, source):
+    """같은 BFS 를 칸 하나씩 deque 로 (벤치마크 비교용, game_core.distance_field 와 같은 방식)"""
+    stride = board['stride']
+    blocked = board['blocked_flat'].tolist()
+    dist = [-1] * len(blocked)
+    s = int(flat_index(board, source))
+    dist[s] = 0
+    queue = deque([s])
+    offsets = (-stride, stride, -1, 1)
+    while queue:
+        cur = queue.popleft()
+        d = dist[cur] + 1
+        for off in offsets:
+            nxt = cur + off
+            if dist[nxt] < 0 and not blocked[nxt]:
+                dist[nxt] = d
+                queue.append(nxt)
+    return np.array(dist, dtype=np.int32).reshape(stride, stride)[1:-1, 1:-1]
+
+
+# ----------------------------- 맵 만들기 ----------------------------- #
+def _pick_cells(board, mask, n, rng):
+    # mask 가 True 인 칸 중 n 개를 겹치지 않게 뽑아 (n, 2) 배열로
+    cells = np.flatnonzero(mask)
+    if cells.size < n:
+        raise ValueError(f"빈 칸이 {cells.size}개뿐이라 {n}개를 놓을 수 없습니다")
+    return np.stack(np.divmod(rng.choice(cells, n, replace=False), board['size']), axis=-1)
+
+
+def generate_large_map(size, level_name, seed=None, goal_count=2):
+    """size x size 큰 맵 (board dict). seed 가 같으면 같은 맵
+
+    장애물은 level_name 의 밀도대로 무작위로 깔고, 시작 칸과 이어지지 않은 빈 칸(막힌 웅덩이)은
+    장애물로 메워서 빈 칸 전체가 연결되게 한다.
+    (9x9 의 generate_map 처럼 하나씩 연결을 확인하며 놓으면 큰 맵에서는 너무 느리다)
+    목표 / 포탈은 시작 칸이 아닌 빈 칸 중에서 뽑는다.
+    """
+    if not 2 <= size <= LARGE_MAX_SIZE:
+        raise ValueError(f"맵 크기는 2 ~ {LARGE_MAX_SIZE} 이어야 합니다: {size}")
+    rng = np.random.default_rng(seed)
+    level_info = LEVELS[level_name]
+    needed = goal_count + (2 if level_info.get('portals') else 0)
+    stride = size + 2
+    # 작은 맵에서는 시작 칸이 갇혀 목표를 놓을 자리가 모자랄 수 있다. 그러면 장애물을 다시 깐다
+    for _ in range(MAX_GENERATE_TRIES):
+        padded = np.ones((stride, stride), dtype=bool)
+        inner = rng.random((size, size)) < level_density(level_name)
+        start = np.array(divmod(int(rng.integers(size * size)), size))
+        inner[tuple(start)] = False
+        padded[1:-1, 1:-1] = inner
+        board = {
+            'size': size,
+            'stride': stride,
+            'level': level_name,
+            'seed': seed,
+            'blocked_flat': padded.ravel(),
+            'start': start,
+        }
+        # blocked / visited 는 테두리를 뺀 size x size 뷰 (blocked 는 blocked_flat 과 메모리를 같이 쓴다)
+        board['blocked'] = board['blocked_flat'].reshape(stride, stride)[1:-1, 1:-1]
+        board['blocked'] |= ~reachable(board)
+        if (~board['blocked']).sum() > needed:
+            break
+    else:
+        raise ValueError(f"{size}x{size} {level_name}: 목표를 놓을 빈 칸이 있는 맵을 만들지 못했습니다")
+    free = ~board['blocked']
+    free[tuple(start)] = False  # 목표 / 포탈은 시작 칸에 놓지 않는다
+    board['goals'] = _pick_cells(board, free, needed, rng)
+    board['portals'] = board['goals'][goal_count:]
+    board['goals'] = board['goals'][:goal_count]
+    board['goal_mask'] = np.zeros((size, size), dtype=bool)
+    board['goal_mask'][tuple(board['goals'].T)] = True
+    board['visited'] = np.zeros((size, size), dtype=bool)
+    board['visited'][tuple(start)] = True
+    return board
+
+
+def new_board_state(level_name, size, seed=None):
+    """큰 맵 한 판의 상태 (game_core.new_map_state 의 큰 맵판). 맵은 'board', 귀신은 'ghosts' ((N, 2) 배열)"""
+    if seed is None:
+        seed = new_seed()
+    board = generate_large_map(size, level_name, seed)
+    return {
+        'level': level_name,
+        'seed': seed,
+        'board': board,
+        'position': tuple(board['start'].tolist()),
+        'direction': 'UP',
+        'ghosts': spawn_ghosts(board, seed=seed),
+        'visited_goals': set(),
+        'result': '',
+        'renderer': None,  # app_ui.large_renderer 가 판마다 한 번 만든다
+    }
+
+
+def mark_visited(board, cells):
+    """지나간 칸들((N, 2) 배열)을 방문 표시하고, 그 중 목표 칸을 (M, 2) 배열로 돌려준다"""
+    cells = np.asarray(cells).reshape(-1, 2)
+    board['visited'][tuple(cells.T)] = True
+    return cells[board['goal_mask'][tuple(cells.T)]]
+
+
+# ----------------------------- 귀신 여럿 ----------------------------- #
+def ghost_count(level_name, size):
+    """큰 맵에 놓을 귀신 수. 귀신 없는 레벨은 0, 있으면 맵 넓이에 비례 (최소 1)"""
+    level_info = LEVELS[level_name]
+    if not level_info['ghost']:
+        return 0
+    return max(1, round(size * size / level_info['large_ghost_cells']))
+
+
+def spawn_ghosts(board, count=None, seed=None):
+    """빈 칸 중 시작 칸에서 ghost_range 칸 이상 떨어진 곳에 귀신 count 마리. (N, 2) 배열을 board['ghosts'] 에도 넣는다
+
+    귀신끼리는 같은 칸에 겹쳐도 된다 (9x9 의 귀신 한 마리 규칙에 귀신끼리 충돌은 없다).
+    """
+    level_info = LEVELS[board['level']]
+    if count is None:
+        count = ghost_count(board['level'], board['size'])
+    rng = np.random.default_rng(seed)
+    rows, cols = np.indices((board['size'], board['size']))
+    far = np.abs(rows - board['start'][0]) + np.abs(cols - board['start'][1]) >= level_info.get('ghost_range', 1)
+    cells = np.flatnonzero(~board['blocked'] & far)
+    picked = rng.choice(cells, count) if count and cells.size else np.empty(0, dtype=np.int64)
+    board['ghosts'] = np.stack(np.divmod(picked, board['size']), axis=-1).astype(np.int64)
+    return board['ghosts']
+
+
+def step_ghosts(board, ghosts, target, ignore_obstacles=False):
+    """귀신 전부를 target 쪽으로 한 칸씩 (game_core.move_ghost / engine 과 같은 규칙). 새 (N, 2) 배열
+
+    세로로 먼저 다가가고, 막혔거나 같은 행이면 가로로. 둘 다 안 되면 그대로.
+    다가가는 방향으로만 움직이므로 맵 밖으로 나갈 일은 없다.
+    """
+    stride = board['stride']
+    blocked = board['blocked_flat']
+    r, c = ghosts[:, 0], ghosts[:, 1]
+    dr = np.sign(target[0] - r)
+    dc = np.sign(target[1] - c)
+    vertical = dr != 0
+    horizontal = dc != 0
+    if not ignore_obstacles:
+        vertical &= ~blocked[(r + dr + 1) * stride + c + 1]
+        horizontal &= ~blocked[(r + 1) * stride + c + dc + 1]
+    horizontal &= ~vertical
+    moved = ghosts.copy()
+    moved[:, 0] += np.where(vertical, dr, 0)
+    moved[:, 1] += np.where(horizontal, dc, 0)
+    return moved
+
+
+def ghost_hits(ghosts, position):
+    """position 과 같은 칸에 있는 귀신 (N,) bool. .any() 면 잡힌 것"""
+    return (ghosts[:, 0] == position[0]) & (ghosts[:, 1] == position[1])
+
+
+def python_step_ghosts(board, ghosts, target, ignore_obstacles=False):
+    """step_ghosts 를 귀신 하나씩 튜플로 (벤치마크 비교용, engine 의 귀신 이동을 그대로 옮긴 것)"""
+    size = board['size']
+    blocked = board['blocked']
+    moved = []
+    for gr, gc in ghosts:
+        ghost = (gr, gc)
+        if gr != target[0]:
+            nr = gr + (1 if target[0] > gr else -1)
+            if 0 <= nr < size and (ignore_obstacles or not blocked[nr, gc]):
+                ghost = (nr, gc)
+        if ghost == (gr, gc) and gc != target[1]:
+            nc = gc + (1 if target[1] > gc else -1)
+            if 0 <= nc < size and (ignore_obstacles or not blocked[gr, nc]):
+                ghost = (gr, nc)
+        moved.append(ghost)
+    return moved
+
+
+# ----------------------------- 벤치마크 ----------------------------- #
+def bench(sizes, level_name, repeat=3, seed=0):
+    """맵 크기별 (size, 생성 ms, NumPy BFS ms, 파이썬 BFS ms, 빈 칸 수). 각 값은 repeat 번 중 가장 빠른 것"""
+    rows = []
+    for size in sizes:
+        timings = {'gen': [], 'np': [], 'py': []}
+        for k in range(repeat):
+            t = time.perf_counter()
+            board = generate_large_map(size, level_name, seed=seed + k)
+            timings['gen'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            fast = distance_field(board, board['start'])
+            timings['np'].append(time.perf_counter() - t)
+            t = time.perf_counter()
+            slow = python_distance_field(board, board['start'])
+            timings['py'].append(time.perf_counter() - t)
+            if not np.array_equal(fast, slow):
+                raise AssertionError(f"{size}x{size} seed {seed + k}: 두 BFS 결과가 다릅니다")
+        rows.append((size, *(min(timings[key]) * 1000 for key in ('gen', 'np', 'py')), int((~board['blocked']).sum())))
+    return rows
+
+
+def bench_ghosts(counts, level_name, size=LARGE_MAX_SIZE, steps=200, seed=0):
+    """귀신 수별 명령 한 번(귀신 이동 + 충돌 판정) 시간 (count, NumPy µs, 파이썬 µs)
+
+    로봇은 빈 칸을 무작위로 걸어 다니고, 매 단계 두 방식의 결과가 같은지도 확인한다.
+    """
+    board = generate_large_map(size, level_name, seed=seed)
+    ignore_obstacles = LEVELS[level_name].get('ignore_obstacles', False)
+    rng = np.random.default_rng(seed)
+    path = [tuple(board['start'])]
+    offsets = ((-1, 0), (1, 0), (0, -1), (0, 1))
+    while len(path) < steps:
+        dr, dc = offsets[rng.integers(4)]
+        nxt = (path[-1][0] + dr, path[-1][1] + dc)
+        if 0 <= nxt[0] < size and 0 <= nxt[1] < size and not board['blocked'][nxt]:
+            path.append(nxt)
+    rows = []
+    for count in counts:
+        start = spawn_ghosts(board, count, seed=seed)
+        ghosts = start
+        t = time.perf_counter()
+        for pos in path:
+            ghosts = step_ghosts(board, ghosts, pos, ignore_obstacles)
+            ghost_hits(ghosts, pos).any()
+        np_us = (time.perf_counter() - t) / len(path) * 1e6
+        slow = [tuple(g) for g in start.tolist()]
+        t = time.perf_counter()
+        for pos in path:
+            slow = python_step_ghosts(board, slow, pos, ignore_obstacles)
+            any(g == pos for g in slow)
+        py_us = (time.perf_counter() - t) / len(path) * 1e6
+        if not np.array_equal(ghosts, np.array(slow, dtype=np.int64).reshape(-1, 2)):
+            raise AssertionError(f"귀신 {count}마리: 두 방식의 결과가 다릅니다")
+        rows.append((count, np_us, py_us))
+    return rows
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from game_core import LEVEL_NAMES
+
+    parser = argparse.ArgumentParser(description="큰 맵 모드 벤치마크")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_bench = sub.add_parser("bench", help="맵 크기별 생성 / BFS 시간 (NumPy vs 파이썬)")
+    p_bench.add_argument("--sizes", type=int, nargs="+", default=[9, 32, 64, 128, 256, 512])
+    p_bench.add_argument("--level", choices=LEVEL_NAMES, default=LEVEL_NAMES[2])
+    p_bench.add_argument("--repeat", type=int, default=3)
+    p_ghosts = sub.add_parser("ghosts", help="귀신 수별 한 단계 시간 (NumPy vs 파이썬)")
+    p_ghosts.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000])
+    p_ghosts.add_argument("--size", type=int, default=LARGE_MAX_SIZE)
+    p_ghosts.add_argument("--level", choices=LEVEL_NAMES, default=LEVEL_NAMES[3])
+    args = parser.parse_args()
+
+    if args.command == "ghosts":
+        print(f"{args.level} {args.size}x{args.size} (ignore_obstacles={LEVELS[args.level].get('ignore_obstacles', False)})")
+        print(f"  {'ghosts':>6} {'numpy':>10} {'python':>10} {'speedup':>8}")
+        for count, np_us, py_us in bench_ghosts(args.counts, args.level, args.size):
+            print(f"  {count:>6} {np_us:>8.1f}us {py_us:>8.1f}us {py_us / np_us:>7.1f}x")
+    else:
+        print(f"{args.level} (density {level_density(args.level):.2f})")
+        print(f"  {'size':>5} {'free':>8} {'generate':>10} {'bfs numpy':>10} {'bfs python':>11} {'speedup':>8}")
+        for size, gen_ms, np_ms, py_ms, free in bench(args.sizes, args.level, args.repeat):
+            print(f"  {size:>5} {free:>8} {gen_ms:>8.2f}ms {np_ms:>8.2f}ms {py_ms:>9.2f}ms {py_ms / np_ms:>7.1f}x")
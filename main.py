@@ -1,164 +1,25 @@
 # streamlit_app.py
 import streamlit as st
-import random
-import time
 import traceback
-from collections import deque
 
-st.set_page_config(page_title="🤖 로봇 명령 퍼즐", page_icon="🤖", layout="centered")
-
-# ----------------------------- 설정 ----------------------------- #
-DIRECTIONS = ['UP', 'RIGHT', 'DOWN', 'LEFT']
-MOVE_OFFSET = {'UP': (-1, 0), 'DOWN': (1, 0), 'LEFT': (0, -1), 'RIGHT': (0, 1)}
-LEVELS = {
-    "Level 1 (5점, 착한맛)": {"obstacles": 8, "score": 5, "ghost": False},
-    "Level 2 (10점, 보통맛)": {"obstacles": 14, "score": 10, "ghost": False},
-    "Level 3 (20점, 매운맛)": {"obstacles": 20, "score": 20, "ghost": False},
-    "Level 4 (30점, 불닭맛)": {"obstacles": 24, "score": 30, "ghost": True, "ghost_range": 4, "ignore_obstacles": False},
-    "Level 5 (50점, 핵불닭맛)": {"obstacles": 28, "score": 50, "ghost": True, "ghost_range": 3, "ignore_obstacles": True, "portals": True},
-}
-MAP_SIZE = 9
-PORTAL_SYMBOL = '🌀'
-
-# ----------------------------- 유틸/로직 ----------------------------- #
-def bfs_shortest_path(start, goals, obstacles):
-    queue = deque([(start, [])])
-    visited = {start}
-    while queue:
-        current, path = queue.popleft()
-        if current in goals:
-            return path
-        for d in MOVE_OFFSET.values():
-            nx, ny = current[0] + d[0], current[1] + d[1]
-            nxt = (nx, ny)
-            if 0 <= nx < MAP_SIZE and 0 <= ny < MAP_SIZE and nxt not in obstacles and nxt not in visited:
-                visited.add(nxt)
-                queue.append((nxt, path + [nxt]))
-    return []
-
-def generate_map(obstacle_count, goal_count=2, use_portals=False):
-    while True:
-        positions = [(i, j) for i in range(MAP_SIZE) for j in range(MAP_SIZE)]
-        start = random.choice(positions)
-        positions.remove(start)
-
-        obstacles = set(random.sample(positions, obstacle_count))
-        positions = [p for p in positions if p not in obstacles]
-
-        goals = random.sample(positions, goal_count)
-        positions = [p for p in positions if p not in goals]
-
-        portals = random.sample(positions, 2) if use_portals else []
-
-        if all(bfs_shortest_path(start, [g], obstacles) for g in goals):
-            break
-    return start, obstacles, goals, portals
-
-def rotate(current_direction, rotation_command):
-    idx = DIRECTIONS.index(current_direction)
-    if rotation_command == "오른쪽 회전":
-        return DIRECTIONS[(idx + 1) % 4]
-    elif rotation_command == "왼쪽 회전":
-        return DIRECTIONS[(idx - 1) % 4]
-    return current_direction
-
-def move_forward(pos, direction, steps=1):
-    for _ in range(steps):
-        dx, dy = MOVE_OFFSET[direction]
-        pos = (pos[0] + dx, pos[1] + dy)
-        if not (0 <= pos[0] < MAP_SIZE and 0 <= pos[1] < MAP_SIZE):
-            return None
-    return pos
-
-def move_ghost(pos, target, obstacles, ignore_obstacles=False):
-    dx, dy = target[0] - pos[0], target[1] - pos[1]
-    options = []
-    if dx != 0:
-        options.append((pos[0] + (1 if dx > 0 else -1), pos[1]))
-    if dy != 0:
-        options.append((pos[0], pos[1] + (1 if dy > 0 else -1)))
-    for opt in options:
-        if 0 <= opt[0] < MAP_SIZE and 0 <= opt[1] < MAP_SIZE:
-            if ignore_obstacles or opt not in obstacles:
-                return opt
-    return pos
-
-def draw_grid(position, direction, ghost, ghost_path, obstacles, goals, portals):
-    grid = ""
-    for i in range(MAP_SIZE):
-        for j in range(MAP_SIZE):
-            cell = '⬜'
-            if (i, j) == position:
-                cell = '🤡'
-            elif (i, j) in obstacles:
-                cell = '⬛'
-            elif (i, j) in goals:
-                cell = '🎯'
-            elif (i, j) == ghost:
-                cell = '👻'
-            elif (i, j) in ghost_path:
-                cell = '·'
-            elif (i, j) in portals:
-                cell = PORTAL_SYMBOL
-            grid += cell
-        grid += '\n'
-    st.text(grid)
-
-def path_to_commands(path, initial_direction='UP'):
-    cmds = []
-    direction = initial_direction
-    forward_count = 0
-
-    def flush_forward():
-        nonlocal forward_count
-        if forward_count == 1:
-            cmds.append("앞으로")
-        elif forward_count > 1:
-            cmds.append(f"앞으로 {forward_count}칸")
-        forward_count = 0
-
-    for i in range(1, len(path)):
-        cur = path[i - 1]
-        nxt = path[i]
-        dx, dy = nxt[0] - cur[0], nxt[1] - cur[1]
-        target_dir = None
-        for dir_name, (dx_off, dy_off) in MOVE_OFFSET.items():
-            if (dx, dy) == (dx_off, dy_off):
-                target_dir = dir_name
-                break
-        if target_dir is None:
-            continue
-
-        if direction == target_dir:
-            forward_count += 1
-        else:
-            flush_forward()
-            while direction != target_dir:
-                cur_idx = DIRECTIONS.index(direction)
-                tgt_idx = DIRECTIONS.index(target_dir)
-                if (tgt_idx - cur_idx) % 4 == 1:
-                    cmds.append("오른쪽 회전")
-                    direction = rotate(direction, "오른쪽 회전")
-                else:
-                    cmds.append("왼쪽 회전")
-                    direction = rotate(direction, "왼쪽 회전")
-            forward_count = 1
-
-    flush_forward()
-    cmds.append("집기")
-    return cmds
+from game_core import (
+    LEVELS,
+    new_map_state,
+)
+from board_render import map_renderer
+import metrics
+from metrics import phase
+from commands import compile_commands
+from app_ui import (
+    HINT_COST, rerun, new_game, draw_grid, run_program, show_hint, large_board_panel, admin_sidebar,
+)
 
-def _rerun():
-    try:
-        st.rerun()
-    except Exception:
-        st.experimental_rerun()
+st.set_page_config(page_title="🤖 로봇 명령 퍼즐", page_icon="🤖", layout="centered")
+metrics.start_rerun(st.session_state.setdefault("metrics", {}))
 
 # ----------------------------- 앱 ----------------------------- #
 st.title("🤖 로봇 명령 퍼즐")
 
-import streamlit as st
-
 st.markdown(
     """
     <audio controls loop>
@@ -176,45 +37,21 @@ st.markdown(
 # 초기 상태
 if 'state' not in st.session_state:
     default_level = list(LEVELS.keys())[0]
-    level_info = LEVELS[default_level]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
     st.session_state.state = {
         'level': default_level,
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
+        **new_game(default_level),
         'score': 0,
         'high_score': 0,
         'total_score': 0,
-        'result': '',
-        'commands': []
     }
     st.session_state['command_input'] = ""
 
 # 레벨 선택
 selected_level = st.selectbox("레벨 선택", list(LEVELS.keys()))
 if selected_level != st.session_state.state['level']:
-    level_info = LEVELS[selected_level]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
     st.session_state.state.update({
         'level': selected_level,
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
-        'result': '',
-        'commands': []
+        **new_game(selected_level),
     })
     st.session_state["command_input"] = ""
 
@@ -235,15 +72,14 @@ input_text = st.text_area(
     key="command_input"
 )
 
-# 간단 보정 + 리스트화
-fixed = []
-for line in input_text.strip().split('\n'):
-    s = line.strip()
-    if s == "앞":
-        s = "앞으로"
-    fixed.append(s)
-input_text = "\n".join(fixed)
-command_list = [c for c in input_text.split('\n') if c.strip()]
+# 컴파일 (같은 입력은 캐시에서 바로 꺼냄)
+with phase("compile"):
+    program, command_lines, command_errors = compile_commands(input_text)
+command_list = list(command_lines)
+if command_errors:
+    st.warning("명령어를 확인해 주세요.\n\n" + "\n".join(
+        f"- {line_no}번째 줄 `{cmd}`: {msg}" for line_no, cmd, msg in command_errors
+    ))
 
 # 자동완성
 auto_options = ["앞으로", "앞으로 2", "앞으로 3", "왼쪽으로 이동", "오른쪽으로 이동", "뒤로 이동", "집기"]
@@ -253,118 +89,21 @@ with c1:
 with c2:
     if st.button("➕ 추가"):
         st.session_state['_append'] = chosen   # ← 플래그만 설정
-        _rerun()
+        rerun()
 
 # 실행
-if st.button("실행"):
+c_run1, c_run2 = st.columns([2, 1])
+with c_run1:
+    step_delay_ms = st.slider("애니메이션 속도 (한 명령당 ms)", 50, 1000, 200, step=50)
+with c_run2:
+    skip_animation = st.checkbox("애니메이션 건너뛰기")
+    image_board = st.checkbox("🖼️ 이미지로 보기", key="image_board")
+run_clicked = st.button("실행")
+if run_clicked and command_errors:
+    st.error("잘못된 명령어가 있어서 실행하지 않았습니다.")
+if run_clicked and not command_errors:
     try:
-        s = st.session_state.state
-        pos = s['position']
-        direction = s['direction']
-        ghost = s['ghost']
-        ghost_path = []
-        visited_goals = set()
-        failed = False
-
-        for raw in command_list:
-            cmd = raw.strip()
-            if not cmd:
-                continue
-
-            if cmd.startswith("앞으로"):
-                parts = cmd.split()
-                steps = 1
-                if len(parts) > 1:
-                    num = parts[1]
-                    if num.endswith("칸"):
-                        num = num[:-1]
-                    if num.isdigit():
-                        steps = int(num)
-                for _ in range(steps):
-                    tmp = move_forward(pos, direction, 1)
-                    if tmp is None or tmp in s['obstacles']:
-                        s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                        failed = True
-                        break
-                    pos = tmp
-
-            elif cmd == "왼쪽으로 이동":
-                left_dir = DIRECTIONS[(DIRECTIONS.index(direction) - 1) % 4]
-                tmp = move_forward(pos, left_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd == "오른쪽으로 이동":
-                right_dir = DIRECTIONS[(DIRECTIONS.index(direction) + 1) % 4]
-                tmp = move_forward(pos, right_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd == "뒤로 이동":
-                back_dir = DIRECTIONS[(DIRECTIONS.index(direction) + 2) % 4]
-                tmp = move_forward(pos, back_dir, 1)
-                if tmp is None or tmp in s['obstacles']:
-                    s['result'] = '❌ 장애물 충돌 또는 벽 밖으로 벗어남'
-                    failed = True
-                    break
-                pos = tmp
-
-            elif cmd in ("왼쪽 회전", "오른쪽 회전"):
-                direction = rotate(direction, cmd)
-
-            elif cmd == "집기" and pos in s['goals']:
-                visited_goals.add(pos)
-
-            if failed:
-                break
-
-            # 귀신 이동
-            if ghost:
-                ghost = move_ghost(ghost, pos, s['obstacles'],
-                                   ignore_obstacles=LEVELS[s['level']].get('ignore_obstacles', False))
-                ghost_path.append(ghost)
-                if pos == ghost:
-                    s['result'] = '👻 귀신에게 잡힘!'
-                    failed = True
-                    break
-
-            draw_grid(pos, direction, ghost, ghost_path, s['obstacles'], s['goals'], s['portals'])
-            time.sleep(0.2)
-
-            # 포탈 처리
-            if s['portals'] and pos in s['portals']:
-                dest = [p for p in s['portals'] if p != pos][0]
-                around = [(dest[0] + d[0], dest[1] + d[1]) for d in MOVE_OFFSET.values()]
-                random.shuffle(around)
-                for a in around:
-                    if 0 <= a[0] < MAP_SIZE and 0 <= a[1] < MAP_SIZE and a not in s['obstacles']:
-                        pos = a
-                        break
-
-        if not failed:
-            score = len(visited_goals) * LEVELS[s['level']]['score']
-            s['score'] = score
-            s['total_score'] += score
-            s['high_score'] = max(s['high_score'], score)
-            s['result'] = f"🎯 목표 도달: {len(visited_goals)}개, 점수: {score}"
-
-            shortest = bfs_shortest_path(s['start'], s['goals'], s['obstacles'])
-            if shortest and len(command_list) == len(shortest) + 2 and len(visited_goals) == 2:
-                s['result'] += '\n🌟 Perfect!'
-
-        s.update({
-            'position': pos,
-            'direction': direction,
-            'ghost': ghost,
-            'ghost_path': ghost_path,
-            'commands': command_list
-        })
+        run_program(st.session_state.state, program, command_list, step_delay_ms, skip_animation, image_board)
         # ❌ 위젯 키 직접 수정 금지 → 다른 키로 저장
         st.session_state['last_run_commands'] = '\n'.join(command_list)
 
@@ -375,36 +114,33 @@ if st.button("실행"):
 # 상태 + 맵
 st.markdown(f"**현재 점수:** {st.session_state.state['score']} / **최고 점수:** {st.session_state.state['high_score']} / **누적 점수:** {st.session_state.state['total_score']}")
 st.markdown(f"**결과:** {st.session_state.state['result']}")
-draw_grid(
-    st.session_state.state['position'],
-    st.session_state.state['direction'],
-    st.session_state.state['ghost'],
-    st.session_state.state['ghost_path'],
-    st.session_state.state['obstacles'],
-    st.session_state.state['goals'],
-    st.session_state.state['portals']
-)
+with phase("render"):
+    draw_grid(
+        st.session_state.state['position'],
+        st.session_state.state['direction'],
+        st.session_state.state['ghost'],
+        st.session_state.state['ghost_path'],
+        st.session_state.state['obstacles'],
+        st.session_state.state['goals'],
+        st.session_state.state['portals'],
+        map_renderer(st.session_state.state) if image_board else None,
+    )
+st.caption(f"맵 번호(seed): {st.session_state.state['seed']}")
 
 # 다시 시작
 if st.button("🔁 다시 시작"):
-    level_info = LEVELS[st.session_state.state['level']]
-    start, obstacles, goals, portals = generate_map(level_info['obstacles'], use_portals=level_info.get('portals', False))
-    ghost = (min(MAP_SIZE - 1, start[0] + level_info.get('ghost_range', 0)), start[1]) if level_info['ghost'] else None
-    st.session_state.state.update({
-        'start': start,
-        'position': start,
-        'direction': 'UP',
-        'obstacles': obstacles,
-        'goals': goals,
-        'portals': portals,
-        'ghost': ghost,
-        'ghost_path': [],
-        'result': '',
-        'commands': []
-    })
+    st.session_state.state.update(new_game(st.session_state.state['level']))
     # 입력창은 플래그로 비우고 rerun에서 적용
     st.session_state['_clear_input'] = True
-    _rerun()
+    rerun()
+
+# 같은 seed 로 다른 사람의 판을 그대로 다시 만들기
+with st.expander("🔢 맵 번호로 불러오기"):
+    seed_text = st.text_input("맵 번호(seed)", key="load_seed")
+    if st.button("이 맵으로 시작") and seed_text.strip().isdigit():
+        st.session_state.state.update(new_map_state(st.session_state.state['level'], int(seed_text.strip())))
+        st.session_state['_clear_input'] = True
+        rerun()
 
 with st.expander("📘 게임 설명 보기"):
     st.markdown(
@@ -414,7 +150,7 @@ with st.expander("📘 게임 설명 보기"):
         "### ✏️ 사용 가능한 명령어 (기본 방향: 위)\n"
         "- 편의를 위한 자동완성 명령어 기능 존재\n"
         "- **앞으로**: 위로 한 칸 이동\n"
-        "- **앞으로 2칸**, **위로 3칸**: 위로 2,3칸 이동\n"
+        "- **앞으로 2칸**, **앞으로 3**: 위로 2,3칸 이동\n"
         "- **왼쪽으로 이동**: 왼쪽 방향으로 1칸 이동\n"
         "- **오른쪽으로 이동**: 오른쪽 방향으로 1칸 이동\n"
         "- **뒤로 이동**: 밑으로 1칸 이동\n"
@@ -426,7 +162,7 @@ with st.expander("📘 게임 설명 보기"):
         "- 레벨 4: 귀신은 장애물을 피해서 이동\n"
         "- 레벨 5: 귀신은 장애물을 무시하고 직진 추적\n\n"
         "### 🏆 Perfect 판정\n"
-        "- 최단 경로 + 모든 목표 수집 + 명령 수 최소일 때 Perfect! 🌟\n\n"
+        "- 모든 목표를 집고, 명령 수(회전 포함)가 가장 적을 때 Perfect! 🌟\n\n"
         "### 🧱 각 레벨 정보\n"
         "- Level 1 (5점, 착한맛): 장애물 8개, 귀신 없음\n"
         "- Level 2 (10점, 보통맛): 장애물 14개, 귀신 없음\n"
@@ -437,20 +173,13 @@ with st.expander("📘 게임 설명 보기"):
     )
 
 # AI 힌트(선택)
-if st.button("🧠 AI 힌트 보기 (-30점)"):
-    s = st.session_state.state
-    if s['total_score'] < 30:
-        st.warning("포인트가 부족합니다! (30점 필요)")
-    else:
-        path = None
-        for g in s['goals']:
-            p = bfs_shortest_path(s['position'], [g], s['obstacles'])
-            if p:
-                path = p
-                break
-        if not path:
-            st.error("경로를 찾을 수 없습니다.")
-        else:
-            s['total_score'] -= 30
-            hint = path_to_commands([s['position']] + path, s['direction'])
-            st.info("**AI 추천 명령어**\n\n" + "\n".join(hint))
+if st.button(f"🧠 AI 힌트 보기 (-{HINT_COST}점)"):
+    show_hint(st.session_state.state)
+
+
+# 큰 맵 모드 (지금 고른 레벨의 밀도로)
+large_board_panel(st.session_state.state['level'])
+
+# 관리자 사이드바 + 이번 rerun 전체 시간 (맨 마지막에)
+admin_sidebar()
+metrics.finish_rerun()
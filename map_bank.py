@@ -0,0 +1,87 @@
+# map_bank.py
+# 레벨별로 미리 만들어 둔 맵 보관소. 새 게임은 여기서 꺼내 쓰기만 한다.
+import os
+import threading
+from collections import deque
+
+from bank_file import BankFile
+from game_core import LEVEL_NAMES, new_seed, generate_level_map
+
+BANK_CAPACITY = 16  # 레벨당 미리 만들어 둘 맵 수
+BANK_FILE_PATH = "maps.bank"  # bank_file.py 로 만든 파일. 있으면 여기서 먼저 꺼낸다
+
+
+class MapBank:
+    """레벨마다 (seed, layout) 를 쌓아 두고, 백그라운드 스레드가 모자란 만큼 채운다
+
+    bank_path 파일이 있으면 그 파일에 맵이 있는 레벨은 파일(mmap)에서 바로 꺼내고 스레드로 채우지 않는다.
+    """
+
+    def __init__(self, capacity=BANK_CAPACITY, levels=LEVEL_NAMES, bank_path=BANK_FILE_PATH):
+        self.capacity = capacity
+        self.file = BankFile(bank_path) if bank_path and os.path.exists(bank_path) else None
+        self._maps = {
+            name: deque() for name in levels
+            if self.file is None or not self.file.level_count(name)
+        }
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.generated = 0  # 백그라운드에서 만든 맵 수
+        self.misses = 0     # 은행이 비어 있어서 직접 만든 횟수
+
+    def start(self):
+        """채우기 스레드 시작 (이미 돌고 있으면 무시)"""
+        with self._cond:
+            if self._thread is not None:
+                return self
+            self._thread = threading.Thread(target=self._refill_loop, name="map-bank-refill", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    def take(self, level_name):
+        """level_name 맵 하나를 (seed, layout) 으로 꺼낸다. 비어 있으면 그 자리에서 만든다"""
+        if level_name not in self._maps:
+            return self.file.take(level_name)
+        with self._cond:
+            bank = self._maps[level_name]
+            if bank:
+                item = bank.popleft()
+                self._cond.notify_all()
+                return item
+            self.misses += 1
+            self._cond.notify_all()
+        seed = new_seed()
+        return seed, generate_level_map(level_name, seed)
+
+    def sizes(self):
+        with self._cond:
+            return {name: len(bank) for name, bank in self._maps.items()}
+
+    def _next_level_to_fill(self):
+        # 가장 많이 비어 있는 레벨부터 채운다
+        if not self._maps:
+            return None
+        name = min(self._maps, key=lambda n: len(self._maps[n]))
+        return name if len(self._maps[name]) < self.capacity else None
+
+    def _refill_loop(self):
+        while True:
+            with self._cond:
+                name = self._next_level_to_fill()
+                while name is None and not self._stopped:
+                    self._cond.wait()
+                    name = self._next_level_to_fill()
+                if self._stopped:
+                    return
+            # 맵 생성은 락 밖에서 해서 take() 를 막지 않는다
+            seed = new_seed()
+            layout = generate_level_map(name, seed)
+            with self._cond:
+                self._maps[name].append((seed, layout))
+                self.generated += 1
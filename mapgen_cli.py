@@ -0,0 +1,134 @@
+# mapgen_cli.py
+# 대회용 맵을 레벨마다 N개씩 여러 프로세스로 미리 만들고 검증하는 도구
+#   python mapgen_cli.py --per-level 1000 --seed 2024 --out maps.jsonl
+# 같은 --seed / --per-level 이면 worker 수와 상관없이 같은 파일이 나온다.
+import argparse
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+from game_core import LEVELS, LEVEL_NAMES, LEVEL_DIFFICULTY, cell_index, distance_field, new_map_state
+from engine import simulate, iter_frames, OUTCOME_CAUGHT
+from solver import solve, plan_with_ghost, portal_plan
+
+# 귀신 피하는 풀이 탐색은 노드 수로만 자른다. 시간으로 자르면 기계 부하 / worker 수에 따라 결과가 달라진다
+PLAN_BUDGET = 200000
+
+
+def map_seed(base_seed, level_name, i):
+    """(기본 seed, 레벨, 번호) -> 맵 seed. 어느 프로세스에서 계산해도 같다 (문자열 seed 는 sha512)"""
+    return random.Random(f"{base_seed}:{level_name}:{i}").getrandbits(32)
+
+
+def _manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def vet_map(task):
+    """(레벨, 번호, seed) 맵 하나를 만들고 검증 / 지표 계산. JSON 으로 쓸 dict 를 돌려준다"""
+    level_name, i, seed = task
+    s = new_map_state(level_name, seed)
+    s['level'] = level_name
+    level_info = LEVELS[level_name]
+    ignore_obstacles = level_info.get('ignore_obstacles', False)
+
+    # 도달 가능성: 목표와 포탈이 모두 시작점과 이어져 있어야 한다
+    dist, _ = distance_field(s['start'], s['obstacles'])
+    reachable = all(dist[cell_index(p)] >= 0 for p in list(s['goals']) + list(s['portals']))
+
+    solution = solve(s['start'], s['direction'], s['obstacles'], s['goals'], s['portals'])
+    record = {
+        'level': level_name,
+        'index': i,
+        'seed': seed,
+        'difficulty': LEVEL_DIFFICULTY[level_name],
+        'start': list(s['start']),
+        'obstacles': sorted(list(o) for o in s['obstacles']),
+        'goals': [list(g) for g in s['goals']],
+        'portals': [list(p) for p in s['portals']],
+        'ghost': list(s['ghost']) if s['ghost'] else None,
+        'reachable': reachable,
+        'optimal_steps': solution['steps'] if solution else None,
+    }
+
+    if s['ghost']:
+        plan, stats = plan_with_ghost(
+            s['start'], s['direction'], s['ghost'], s['obstacles'], s['goals'], s['portals'],
+            ignore_obstacles=ignore_obstacles, budget=PLAN_BUDGET, time_ms=float("inf"),
+        )
+        record['safe_steps'] = plan['steps'] if plan else None
+        record['plan_expanded'] = stats['expanded']
+        record['plan_exhausted'] = stats['exhausted']  # True 면 예산 안에 풀이를 못 찾은 맵
+        # 귀신 위협 거리: 시작 거리와, 귀신을 무시한 최적 풀이를 실제로 돌렸을 때 가장 가까워진 거리
+        record['ghost_start_distance'] = _manhattan(s['start'], s['ghost'])
+        if solution:
+            run = simulate(s, s, solution['program'], record=True)
+            closest = min(
+                (_manhattan(pos, ghost) for pos, _, ghost in iter_frames(run['trajectory']) if ghost),
+                default=record['ghost_start_distance'],
+            )
+            record['ghost_min_distance'] = 0 if run['outcome'] == OUTCOME_CAUGHT else closest
+            record['naive_caught'] = run['outcome'] == OUTCOME_CAUGHT
+    if s['portals']:
+        portal = portal_plan(s['start'], s['direction'], s['obstacles'], s['goals'], s['portals'])
+        record['portal_worst_steps'] = portal['worst']['steps'] if portal['worst'] else None
+        record['portal_expected_steps'] = round(portal['expected']['steps'], 4) if portal['expected'] else None
+
+    # 대회에 쓸 수 있는 맵: 다 이어져 있고, 반드시 끝낼 수 있는 풀이가 있다
+    finishable = record['optimal_steps'] is not None or record.get('portal_worst_steps') is not None
+    if s['ghost']:
+        finishable = record['safe_steps'] is not None
+    record['valid'] = reachable and finishable
+    return record
+
+
+def iter_tasks(per_level, base_seed, levels=LEVEL_NAMES):
+    for level_name in levels:
+        for i in range(per_level):
+            yield level_name, i, map_seed(base_seed, level_name, i)
+
+
+def generate(out, per_level, base_seed, workers=None, levels=LEVEL_NAMES, chunksize=16):
+    """레벨마다 per_level 개를 만들어 out(텍스트 파일)에 JSON 한 줄씩 쓴다. 레벨별 요약을 돌려준다
+
+    Pool.imap 은 입력 순서대로 결과를 돌려주므로 worker 수가 달라도 파일 내용이 같다.
+    """
+    summary = {name: {'maps': 0, 'valid': 0, 'exhausted': 0, 'optimal_sum': 0, 'optimal_n': 0} for name in levels}
+    with Pool(workers) as pool:
+        for record in pool.imap(vet_map, iter_tasks(per_level, base_seed, levels), chunksize=chunksize):
+            out.write(json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n")
+            level = summary[record['level']]
+            level['maps'] += 1
+            level['valid'] += record['valid']
+            level['exhausted'] += record.get('plan_exhausted', False)
+            if record['optimal_steps'] is not None:
+                level['optimal_sum'] += record['optimal_steps']
+                level['optimal_n'] += 1
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="레벨별 맵을 여러 프로세스로 만들어 JSONL 로 저장")
+    parser.add_argument("--per-level", type=int, default=1000, help="레벨마다 만들 맵 수")
+    parser.add_argument("--seed", type=int, default=0, help="기본 seed (같으면 같은 결과)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="프로세스 수 (기본: CPU 코어 수)")
+    parser.add_argument("--level", action="append", choices=LEVEL_NAMES, help="특정 레벨만 (여러 번 쓸 수 있음)")
+    parser.add_argument("--out", default="maps.jsonl")
+    args = parser.parse_args(argv)
+
+    levels = args.level or LEVEL_NAMES
+    t0 = time.perf_counter()
+    with open(args.out, "w", encoding="utf-8") as out:
+        summary = generate(out, args.per_level, args.seed, args.workers, levels)
+    elapsed = time.perf_counter() - t0
+    total = sum(level['maps'] for level in summary.values())
+    print(f"{total} maps, {args.workers} workers, {elapsed:.1f} s ({total / elapsed:.0f} maps/s) -> {args.out}")
+    for name, level in summary.items():
+        mean = level['optimal_sum'] / level['optimal_n'] if level['optimal_n'] else float("nan")
+        print(f"  {name}: valid {level['valid']}/{level['maps']}, plan budget exhausted {level['exhausted']}, optimal steps mean {mean:.2f}")
+
+
+if __name__ == "__main__":
+    main()
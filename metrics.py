@@ -0,0 +1,275 @@
+# metrics.py
+# 스크립트 재실행(rerun) 한 번을 단계별로 재는 가벼운 계측.
+#   with phase("get_user_stats"):
+#       ...
+# 세션별 / 프로세스 전체 최근 샘플로 p50 / p95 / p99 를 보여 주고,
+# 샘플은 로컬 SQLite 표(robot_game_metrics.db) 또는 Prometheus 텍스트 파일로 내보낸다.
+#
+# 기본은 꺼져 있다. 켜는 방법: 환경 변수 ROBOT_METRICS=sqlite | prom | memory,
+# 또는 관리자 사이드바(?admin=1)에서 켜기. 꺼져 있을 때 phase() 는 미리 만든 빈 컨텍스트를 돌려줄 뿐이다.
+#   python metrics.py summary              (SQLite 표의 단계별 분위수)
+#   python metrics.py overhead             (꺼져 있을 때 / 켜져 있을 때 phase 한 번 비용)
+import atexit
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+METRICS_ENV = "ROBOT_METRICS"
+SINKS = ("memory", "sqlite", "prom")
+METRICS_DB_PATH = "robot_game_metrics.db"
+PROM_PATH = "robot_game_metrics.prom"
+PROCESS_WINDOW = 2000   # 프로세스 전체: 단계마다 남기는 최근 샘플 수
+SESSION_WINDOW = 200    # 세션 하나: 단계마다 남기는 최근 샘플 수
+FLUSH_INTERVAL = 5.0    # 싱크로 내보내는 최소 간격(초)
+QUANTILES = (0.5, 0.95, 0.99)
+RERUN_PHASE = "rerun"   # 스크립트 처음부터 끝까지
+
+_config = {'enabled': False, 'sink': None}
+_lock = threading.Lock()
+_samples = {}       # 단계 -> deque(ms)
+_pending = []       # 아직 내보내지 않은 (시각, 세션 id, 단계, ms)
+_last_flush = [0.0]
+_local = threading.local()  # Streamlit 은 세션 스크립트를 스레드 하나에서 돌린다 -> 지금 rerun
+
+
+class _Noop:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _Noop()
+
+
+class _Phase:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        # 예외(st.rerun 포함)로 빠져나가도 걸린 시간은 남긴다
+        record(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+# ----------------------------- 설정 ----------------------------- #
+def configure(sink=None):
+    """sink 가 memory / sqlite / prom 이면 켜고, None 이나 빈 값이면 끈다"""
+    if sink and sink not in SINKS:
+        raise ValueError(f"{METRICS_ENV} 는 {', '.join(SINKS)} 중 하나여야 합니다: {sink}")
+    with _lock:
+        _config['enabled'] = bool(sink)
+        _config['sink'] = sink or None
+
+
+def enabled():
+    return _config['enabled']
+
+
+def sink():
+    return _config['sink']
+
+
+# ----------------------------- 기록 ----------------------------- #
+def start_rerun(session):
+    """rerun 시작. session 은 세션마다 하나인 dict (st.session_state 안에 둔다)"""
+    if not _config['enabled']:
+        _local.rerun = None
+        return
+    if 'id' not in session:
+        session['id'] = uuid.uuid4().hex[:8]
+        session['samples'] = {}
+    _local.rerun = {'session': session, 'started': time.perf_counter()}
+
+
+def phase(name):
+    """with phase(name): 블록 시간을 잰다. 꺼져 있으면 아무 일도 하지 않는 컨텍스트"""
+    if not _config['enabled']:
+        return _NOOP
+    return _Phase(name)
+
+
+def record(name, ms):
+    """샘플 하나. rerun 안(스크립트 스레드)이면 세션에도, 다른 스레드(다운로드 등)면 프로세스에만 남는다"""
+    rerun = getattr(_local, 'rerun', None)
+    session_id = None
+    if rerun is not None:
+        session = rerun['session']
+        session_id = session['id']
+        samples = session['samples'].get(name)
+        if samples is None:
+            samples = session['samples'][name] = deque(maxlen=SESSION_WINDOW)
+        samples.append(ms)
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=PROCESS_WINDOW)
+        samples.append(ms)
+        if _config['sink'] == "sqlite":
+            _pending.append((time.time(), session_id, name, ms))
+
+
+def finish_rerun():
+    """rerun 끝. 전체 시간을 RERUN_PHASE 로 남기고, 때가 되면 싱크로 내보낸다
+
+    st.rerun / st.stop 으로 스크립트가 중간에 끝나면 불리지 않는다 (그 rerun 의 단계 샘플은 남는다).
+    """
+    rerun = getattr(_local, 'rerun', None)
+    if rerun is None:
+        return
+    record(RERUN_PHASE, (time.perf_counter() - rerun['started']) * 1000)
+    _local.rerun = None
+    flush()
+
+
+def flush(force=False):
+    """FLUSH_INTERVAL 마다 한 번 SQLite 표에 쓰거나 Prometheus 파일을 새로 쓴다"""
+    now = time.monotonic()
+    with _lock:
+        if not force and now - _last_flush[0] < FLUSH_INTERVAL:
+            return
+        _last_flush[0] = now
+        rows = _pending[:]
+        del _pending[:]
+        target = _config['sink']
+    if target == "sqlite" and rows:
+        write_samples(rows)
+    elif target == "prom":
+        write_prometheus(process_summary())
+
+
+@atexit.register
+def _flush_at_exit():
+    if _config['enabled']:
+        flush(force=True)
+
+
+# ----------------------------- 싱크 ----------------------------- #
+def _metrics_conn(path=METRICS_DB_PATH):
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS phase_samples ("
+        " ts REAL NOT NULL, session TEXT, phase TEXT NOT NULL, ms REAL NOT NULL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_phase_samples_phase_ts ON phase_samples(phase, ts)")
+    return conn
+
+
+def write_samples(rows, path=METRICS_DB_PATH):
+    conn = _metrics_conn(path)
+    try:
+        with conn:
+            conn.executemany("INSERT INTO phase_samples (ts, session, phase, ms) VALUES (?, ?, ?, ?)", rows)
+    finally:
+        conn.close()
+
+
+def prometheus_text(summary):
+    """process_summary() -> Prometheus 텍스트 형식 (summary 타입, 단위 ms)"""
+    lines = [
+        "# HELP robot_game_phase_ms Streamlit rerun phase duration in milliseconds (recent window)",
+        "# TYPE robot_game_phase_ms summary",
+    ]
+    for name, stats in sorted(summary.items()):
+        for q in QUANTILES:
+            lines.append(f'robot_game_phase_ms{{phase="{name}",quantile="{q}"}} {stats[_qkey(q)]:.3f}')
+        lines.append(f'robot_game_phase_ms_sum{{phase="{name}"}} {stats["sum"]:.3f}')
+        lines.append(f'robot_game_phase_ms_count{{phase="{name}"}} {stats["n"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(summary, path=PROM_PATH):
+    # 다른 프로세스(node_exporter textfile 등)가 반쯤 쓴 파일을 읽지 않게 바꿔치기
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(summary))
+    os.replace(tmp, path)
+
+
+# ----------------------------- 요약 ----------------------------- #
+def _qkey(q):
+    return f"p{q * 100:g}"
+
+
+def summarize(samples_by_phase):
+    """{단계: 샘플 목록} -> {단계: {n, mean, sum, p50, p95, p99}} (ms, 가까운 순위 분위수)"""
+    out = {}
+    for name, samples in samples_by_phase.items():
+        values = sorted(samples)
+        if not values:
+            continue
+        n = len(values)
+        stats = {'n': n, 'sum': sum(values)}
+        stats['mean'] = stats['sum'] / n
+        for q in QUANTILES:
+            stats[_qkey(q)] = values[min(n - 1, max(0, int(q * n + 0.999999) - 1))]
+        out[name] = stats
+    return out
+
+
+def process_summary():
+    with _lock:
+        snapshot = {name: list(samples) for name, samples in _samples.items()}
+    return summarize(snapshot)
+
+
+def session_summary(session):
+    return summarize({name: list(samples) for name, samples in session.get('samples', {}).items()})
+
+
+def summary_rows(summary):
+    """표로 보여 주기 좋게 [(단계, n, p50, p95, p99, 평균)], 전체 시간이 큰 단계부터"""
+    return [
+        (name, s['n'], s['p50'], s['p95'], s['p99'], s['mean'])
+        for name, s in sorted(summary.items(), key=lambda kv: -kv[1]['sum'])
+    ]
+
+
+configure(os.environ.get(METRICS_ENV))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="rerun 단계별 시간 계측")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_summary = sub.add_parser("summary", help="SQLite 표에 쌓인 샘플의 단계별 분위수")
+    p_summary.add_argument("--db", default=METRICS_DB_PATH)
+    p_summary.add_argument("--since-hours", type=float, help="최근 몇 시간만")
+    sub.add_parser("overhead", help="phase() 한 번 비용 (꺼짐 / 켜짐)")
+    args = parser.parse_args()
+
+    if args.command == "summary":
+        conn = _metrics_conn(args.db)
+        since = time.time() - args.since_hours * 3600 if args.since_hours else 0
+        by_phase = {}
+        for name, ms in conn.execute("SELECT phase, ms FROM phase_samples WHERE ts >= ?", (since,)):
+            by_phase.setdefault(name, []).append(ms)
+        print(f"  {'phase':<20} {'n':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'mean':>9}  (ms)")
+        for name, n, p50, p95, p99, mean in summary_rows(summarize(by_phase)):
+            print(f"  {name:<20} {n:>7} {p50:>9.2f} {p95:>9.2f} {p99:>9.2f} {mean:>9.2f}")
+    else:
+        n = 1000000
+        for label, sink_name in (("off", None), ("on (memory)", "memory")):
+            configure(sink_name)
+            start_rerun({})
+            t = time.perf_counter()
+            for _ in range(n):
+                with phase("x"):
+                    pass
+            per_call = (time.perf_counter() - t) / n * 1e9
+            t = time.perf_counter()
+            for _ in range(n):
+                pass
+            per_call -= (time.perf_counter() - t) / n * 1e9
+            print(f"  {label:<12} {per_call:7.0f} ns per phase")
@@ -0,0 +1,736 @@
+# run_db.py
+# 게임 기록 DB (robot_game_runs.db) 접근
+import atexit
+import csv
+import io
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from commands import encode_commands, decode_commands
+
+DB_PATH = "robot_game_runs.db"
+
+# 연결마다 한 번 적용하는 설정
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",    # 읽기와 쓰기가 서로 막지 않게
+    "PRAGMA synchronous=NORMAL",  # WAL 에서는 커밋마다 fsync 하지 않아도 안전
+    "PRAGMA busy_timeout=5000",   # 잠겨 있으면 바로 실패하지 않고 5초까지 기다림
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",    # 8MB
+)
+
+_conns = {}
+_conns_lock = threading.Lock()
+# 여러 스레드가 같은 연결을 쓰므로 쓰기 트랜잭션은 한 번에 하나씩
+_write_lock = threading.Lock()
+
+
+# ----------------------------- 스키마 마이그레이션 ----------------------------- #
+# (버전, SQL 또는 conn 을 받는 함수) 목록. PRAGMA user_version 에 마지막으로 적용한 버전을 기록하고,
+# 기존 robot_game_runs.db 도 열 때 모자란 단계만 이어서 적용한다.
+MIGRATIONS = [
+    (1, """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            run_time TEXT,
+            level TEXT,
+            difficulty INTEGER,
+            commands TEXT,
+            success INTEGER,
+            steps INTEGER,
+            optimal_steps INTEGER
+        );
+    """),
+    (2, """
+        -- get_user_stats: user_id 로 찾고 run_time 역순, difficulty/success 는 인덱스에서 바로 읽음
+        CREATE INDEX IF NOT EXISTS idx_runs_user_time ON runs (user_id, run_time, difficulty, success);
+        -- load_runs_df: 전체를 run_time 순으로
+        CREATE INDEX IF NOT EXISTS idx_runs_time ON runs (run_time);
+        -- 통계 화면: 사용자 + 레벨 / 레벨만 골랐을 때
+        CREATE INDEX IF NOT EXISTS idx_runs_user_level_time ON runs (user_id, level, run_time);
+        CREATE INDEX IF NOT EXISTS idx_runs_level_time ON runs (level, run_time);
+    """),
+    (3, """
+        -- 사용자별 최근 STATS_WINDOW 판 결과 ('1'/'0', 최신이 앞) 와 누적 값
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id TEXT PRIMARY KEY,
+            recent TEXT NOT NULL,
+            n_total INTEGER NOT NULL,
+            success_total INTEGER NOT NULL,
+            last_diff INTEGER,
+            last_run_time TEXT
+        ) WITHOUT ROWID;
+    """),
+    (4, lambda conn: rebuild_user_stats(conn)),
+    # commands 텍스트를 commands.encode_commands 바이너리로 (열 타입은 그대로, 값만 BLOB)
+    (5, lambda conn: encode_stored_commands(conn)),
+    (6, """
+        -- rebuild_user_stats: 같은 초에 들어온 기록은 id(넣은 순서)로 정렬해야 upsert 와 같은 순서가 된다
+        DROP INDEX IF EXISTS idx_runs_user_time;
+        CREATE INDEX IF NOT EXISTS idx_runs_user_time_id ON runs (user_id, run_time, id, difficulty, success);
+    """),
+    # 4단계에서 같은 초 기록 순서가 뒤섞인 채 만들어진 user_stats 를 다시 계산
+    (7, lambda conn: rebuild_user_stats(conn)),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def migrate(conn):
+    """모자란 마이그레이션을 순서대로 적용하고 최종 버전을 돌려준다"""
+    with _write_lock:
+        # 다른 프로세스와 동시에 올리지 않도록 쓰기 잠금을 먼저 잡는다
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for target, sql in MIGRATIONS:
+                if target <= version:
+                    continue
+                if callable(sql):
+                    sql(conn)
+                else:
+                    for statement in sql.split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {target}")
+                version = target
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return version
+
+
+def connect(path=DB_PATH):
+    """설정을 적용한 새 연결 (스키마는 만들지 않음)"""
+    # sqlite3.threadsafety == 3 (serialized) 빌드에서는 연결을 스레드끼리 나눠 써도 안전하다
+    conn = sqlite3.connect(path, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    # 조회할 때 SELECT decode_commands(commands) 로 바로 텍스트를 받는다
+    conn.create_function("decode_commands", 1, decode_commands, deterministic=True)
+    return conn
+
+
+def get_conn(path=DB_PATH):
+    """프로세스 전체가 같이 쓰는 연결. 처음 한 번만 열고 스키마를 최신으로 올린다"""
+    conn = _conns.get(path)
+    if conn is not None:
+        return conn
+    with _conns_lock:
+        conn = _conns.get(path)
+        if conn is None:
+            conn = connect(path)
+            migrate(conn)
+            _conns[path] = conn
+    return conn
+
+
+def close_all():
+    with _conns_lock:
+        for conn in _conns.values():
+            conn.close()
+        _conns.clear()
+
+
+INSERT_RUN_SQL = """
+    INSERT INTO runs (user_id, run_time, level, difficulty, commands, success, steps, optimal_steps)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+STATS_WINDOW = 20  # user_stats 에 남기는 최근 판 수 (get_user_stats 의 k 최대값)
+
+UPSERT_USER_STATS_SQL = f"""
+    INSERT INTO user_stats (user_id, recent, n_total, success_total, last_diff, last_run_time)
+    VALUES (?, ?, 1, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        recent = substr(excluded.recent || user_stats.recent, 1, {STATS_WINDOW}),
+        n_total = user_stats.n_total + 1,
+        success_total = user_stats.success_total + excluded.success_total,
+        last_diff = excluded.last_diff,
+        last_run_time = excluded.last_run_time
+"""
+
+
+def insert_runs(conn, records):
+    """runs 에 기록을 넣고 user_stats 도 같이 갱신한다 (트랜잭션은 호출하는 쪽에서)"""
+    conn.executemany(INSERT_RUN_SQL, records)
+    conn.executemany(
+        UPSERT_USER_STATS_SQL,
+        [
+            (user_id, str(success), success, difficulty, run_time)
+            for user_id, run_time, _, difficulty, _, success, _, _ in records
+        ],
+    )
+
+
+def run_record(user_id, level, difficulty, commands, success, steps, optimal_steps):
+    """runs 한 줄 (INSERT_RUN_SQL 파라미터 순서)"""
+    return (
+        user_id,
+        datetime.now().isoformat(timespec="seconds"),
+        level,
+        difficulty,
+        encode_commands(commands),
+        int(success),
+        steps,
+        optimal_steps if optimal_steps is not None else None,
+    )
+
+
+def log_run(conn, user_id, level, difficulty, commands, success, steps, optimal_steps):
+    """한 판 결과 기록 (바로 커밋, 화면에서는 RunWriter.log_run 을 쓴다)"""
+    if not user_id:
+        return
+    with _write_lock, conn:
+        insert_runs(conn, [run_record(user_id, level, difficulty, commands, success, steps, optimal_steps)])
+
+
+WRITE_RETRY_DELAYS = (0.1, 0.5, 2.0)  # RunWriter: 쓰기 실패 뒤 다시 시도하기 전 기다리는 시간(초)
+
+
+class RunWriter:
+    """기록을 메모리 큐에 받아 두고, 전용 스레드가 모아서 한 트랜잭션으로 쓴다
+
+    log_run 은 큐에 넣기만 하므로 게임 화면이 디스크를 기다리지 않는다.
+    큐가 가득 차면 기록을 버리고 dropped 를 올린다. 큐에서 delay_warn 초 넘게
+    기다린 기록은 delayed 로 센다. 쓰기가 실패하면(busy_timeout 을 넘긴 잠김 등)
+    retry_delays 간격으로 같은 묶음을 다시 쓰고(retried), 그래도 안 되면 버리고 failed 를 올린다.
+    프로세스 종료 때 남은 기록을 모두 쓴다.
+    """
+
+    def __init__(self, path=DB_PATH, max_queue=10000, batch_size=500, flush_interval=0.2, delay_warn=1.0,
+                 retry_delays=WRITE_RETRY_DELAYS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.delay_warn = delay_warn
+        self.retry_delays = retry_delays
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats_lock = threading.Lock()
+        self._close_lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.delayed = 0
+        self.failed = 0
+        self.retried = 0
+        self._closed = False
+        get_conn(path)  # 스키마 준비
+        self._thread = threading.Thread(target=self._writer_loop, name="run-writer", daemon=True)
+        self._thread.start()
+
+    def log_run(self, user_id, level, difficulty, commands, success, steps, optimal_steps):
+        """한 판 결과를 큐에 넣는다. 큐가 가득 찼거나 닫혔으면 False"""
+        if not user_id:
+            return False
+        record = run_record(user_id, level, difficulty, commands, success, steps, optimal_steps)
+        return self.submit(record)
+
+    def submit(self, record):
+        with self._close_lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait((time.monotonic(), record))
+                    return True
+                except queue.Full:
+                    pass
+        with self._stats_lock:
+            self.dropped += 1
+        return False
+
+    def flush(self):
+        """지금까지 넣은 기록이 모두 디스크에 쓰일 때까지 기다린다"""
+        self._queue.join()
+
+    def close(self):
+        """남은 기록을 모두 쓰고 쓰기 스레드를 끝낸다"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "pending": self._queue.qsize(),
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "delayed": self.delayed,
+                "failed": self.failed,
+                "retried": self.retried,
+            }
+
+    def _next_batch(self):
+        # 첫 기록은 올 때까지 기다리고, 이후로는 flush_interval 동안 더 모은다
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while first is not None and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is None:
+                break
+        return batch
+
+    def _writer_loop(self):
+        conn = connect(self.path)
+        while True:
+            batch = self._next_batch()
+            items = [item for item in batch if item is not None]
+            try:
+                if items:
+                    self._write(conn, items)
+            except Exception:
+                # 어떤 오류로든 이 스레드가 죽으면 flush / close 가 queue.join 에서 영원히 기다린다
+                with self._stats_lock:
+                    self.failed += len(items)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(items) != len(batch):
+                conn.close()
+                return
+
+    def _write(self, conn, items):
+        records = [record for _, record in items]
+        for delay in self.retry_delays + (None,):
+            try:
+                with conn:
+                    insert_runs(conn, records)
+                break
+            except sqlite3.Error:
+                # with conn 이 롤백했으므로 같은 묶음을 처음부터 다시 쓴다
+                if delay is None:
+                    with self._stats_lock:
+                        self.failed += len(items)
+                    return
+                with self._stats_lock:
+                    self.retried += 1
+                time.sleep(delay)
+        now = time.monotonic()
+        with self._stats_lock:
+            self.written += len(items)
+            self.batches += 1
+            self.delayed += sum(1 for enqueued, _ in items if now - enqueued > self.delay_warn)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_run_writer(path=DB_PATH):
+    """프로세스 전체가 같이 쓰는 RunWriter"""
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = RunWriter(path)
+    return writer
+
+
+@atexit.register
+def _close_writers():
+    for writer in list(_writers.values()):
+        writer.close()
+
+
+def get_user_stats(conn, user_id, k=STATS_WINDOW):
+    """개인 최근 k판 기준 성공률 / 마지막 난이도 (user_stats 기본 키 조회 한 번)"""
+    if not user_id:
+        return None
+    row = conn.execute(
+        "SELECT recent, last_diff FROM user_stats WHERE user_id = ?",
+        (user_id,),
+    ).fetchone()
+    if row is None or not row[0]:
+        return None
+    recent = row[0][:k]
+    n = len(recent)
+    success_rate = recent.count("1") / n
+    last_diff = row[1]
+    return {
+        "n": n,
+        "success_rate": success_rate,
+        "last_diff": last_diff,
+    }
+
+
+def rebuild_user_stats(conn):
+    """runs 전체로 user_stats 를 다시 계산한다 (트랜잭션은 호출하는 쪽에서)"""
+    conn.execute("DELETE FROM user_stats")
+    rows = conn.execute(
+        """
+        SELECT user_id, success, difficulty, run_time
+        FROM runs
+        WHERE user_id IS NOT NULL AND user_id != ''
+        ORDER BY user_id DESC, run_time DESC, id DESC
+        """
+    )
+
+    def per_user():
+        current = None
+        for user_id, success, difficulty, run_time in rows:
+            if user_id != current:
+                if current is not None:
+                    yield current, "".join(recent), n_total, success_total, last_diff, last_run_time
+                current, recent, n_total, success_total = user_id, [], 0, 0
+                last_diff, last_run_time = difficulty, run_time
+            if len(recent) < STATS_WINDOW:
+                recent.append("1" if success else "0")
+            n_total += 1
+            success_total += 1 if success else 0
+        if current is not None:
+            yield current, "".join(recent), n_total, success_total, last_diff, last_run_time
+
+    conn.executemany(
+        "INSERT INTO user_stats (user_id, recent, n_total, success_total, last_diff, last_run_time) VALUES (?, ?, ?, ?, ?, ?)",
+        per_user(),
+    )
+
+
+def encode_stored_commands(conn, chunk_size=10000):
+    """텍스트로 남아 있는 runs.commands 를 바이너리로 바꾼다 (트랜잭션은 호출하는 쪽에서)
+
+    줄어든 파일 크기는 VACUUM 해야 돌려받는다 (python run_db.py vacuum).
+    """
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, commands FROM runs WHERE id > ? AND typeof(commands) = 'text' ORDER BY id LIMIT ?",
+            (last_id, chunk_size),
+        ).fetchall()
+        if not rows:
+            return
+        conn.executemany("UPDATE runs SET commands = ? WHERE id = ?", [(encode_commands(text), id_) for id_, text in rows])
+        last_id = rows[-1][0]
+
+
+def fill_synthetic_runs(conn, rows, seed=0, users=300):
+    """벤치마크용 가짜 기록 rows 줄 (사용자 users 명, 레벨 5개, 명령어 10~20줄, 15초 간격)"""
+    import random
+    from datetime import timedelta
+
+    from game_core import LEVEL_NAMES
+
+    rng = random.Random(seed)
+    lines = ["앞으로", "앞으로 2칸", "앞으로 3칸", "왼쪽 회전", "오른쪽 회전", "왼쪽으로 이동", "집기"]
+    start = datetime(2024, 3, 1)
+    chunk = []
+    with _write_lock, conn:
+        for i in range(rows):
+            level_i = rng.randrange(len(LEVEL_NAMES))
+            n_cmd = rng.randint(10, 20)
+            chunk.append((
+                f"u{rng.randrange(users)}",
+                (start + timedelta(seconds=i * 15)).isoformat(timespec="seconds"),
+                LEVEL_NAMES[level_i],
+                level_i + 1,
+                encode_commands("\n".join(rng.choice(lines) for _ in range(n_cmd))),
+                rng.randint(0, 1),
+                n_cmd,
+                rng.randint(6, 14),
+            ))
+            if len(chunk) == 10000:
+                insert_runs(conn, chunk)
+                chunk = []
+        if chunk:
+            insert_runs(conn, chunk)
+
+
+# ----------------------------- 기록 조회 ----------------------------- #
+# 통계 화면용 조회. 필터 / 정렬 / 페이지 나누기는 전부 SQLite 에서 하고
+# 화면에 보이는 만큼만 가져온다.
+RUN_COLUMNS = ("id", "user_id", "run_time", "level", "difficulty", "success", "steps", "optimal_steps", "commands")
+PAGE_SIZE = 50
+
+
+def select_list(columns):
+    """SELECT 절. commands 는 저장된 바이너리를 텍스트로 풀어서 돌려준다"""
+    return ", ".join("decode_commands(commands) AS commands" if c == "commands" else c for c in columns)
+
+
+def run_filter(user_id=None, level=None, since=None, until=None):
+    """(WHERE 절, 파라미터). None 이면 그 조건은 걸지 않는다
+
+    since / until 은 run_time 과 같은 ISO 문자열 ('2024-03-01' 처럼 날짜만 써도 된다).
+    since 이상, until 미만.
+    """
+    conds = []
+    params = []
+    if user_id is not None:
+        conds.append("user_id = ?")
+        params.append(user_id)
+    if level is not None:
+        conds.append("level = ?")
+        params.append(level)
+    if since is not None:
+        conds.append("run_time >= ?")
+        params.append(since)
+    if until is not None:
+        conds.append("run_time < ?")
+        params.append(until)
+    return (" WHERE " + " AND ".join(conds) if conds else ""), tuple(params)
+
+
+def data_version(conn):
+    """runs 가 바뀌었는지 확인하는 값 (마지막 id, 비어 있으면 0). 캐시 키로 쓴다"""
+    return conn.execute("SELECT MAX(id) FROM runs").fetchone()[0] or 0
+
+
+def list_users(conn):
+    """기록이 있는 사용자 ID 목록 (user_stats 기본 키 순서 그대로)"""
+    return [row[0] for row in conn.execute("SELECT user_id FROM user_stats WHERE user_id != '' ORDER BY user_id")]
+
+
+def count_runs(conn, user_id=None, level=None, since=None, until=None):
+    where, params = run_filter(user_id, level, since, until)
+    return conn.execute("SELECT COUNT(*) FROM runs" + where, params).fetchone()[0]
+
+
+def load_runs_page(conn, user_id=None, level=None, page=0, page_size=PAGE_SIZE, columns=RUN_COLUMNS):
+    """필터에 맞는 기록을 최신순으로 page_size 개씩 나눈 page 번째 묶음 (DataFrame)"""
+    where, params = run_filter(user_id, level)
+    return pd.read_sql_query(
+        f"SELECT {select_list(columns)} FROM runs{where} ORDER BY run_time DESC LIMIT ? OFFSET ?",
+        conn,
+        params=params + (page_size, page * page_size),
+    )
+
+
+def load_runs_df(conn, user_id=None, level=None, columns=RUN_COLUMNS):
+    """필터에 맞는 기록 전부 (DataFrame, 최신순)"""
+    where, params = run_filter(user_id, level)
+    return pd.read_sql_query(
+        f"SELECT {select_list(columns)} FROM runs{where} ORDER BY run_time DESC",
+        conn,
+        params=params,
+    )
+
+
+def run_aggregates(conn, user_id=None, level=None):
+    """필터에 맞는 기록의 명령어 수 평균 / 표준편차(ddof=1) / 성공률
+
+    개수, 합, 제곱합만 SQLite 에서 세고 나머지는 여기서 계산한다.
+    pandas 의 mean() / std(ddof=1) 처럼 NULL 은 빼고 센다. 기록이 없으면 None.
+    """
+    where, params = run_filter(user_id, level)
+    n_rows, n, total, total_sq, n_success, success_sum = conn.execute(
+        "SELECT COUNT(*), COUNT(steps), SUM(steps), SUM(steps * steps), COUNT(success), SUM(success) FROM runs" + where,
+        params,
+    ).fetchone()
+    if n_rows == 0:
+        return None
+    nan = float("nan")
+    steps_mean = total / n if n else nan
+    if n_rows <= 1:
+        steps_std = 0.0
+    elif n < 2:
+        steps_std = nan
+    else:
+        # 정수 합이면 분자가 정확히 계산된다. 부동소수 오차로 음수가 되는 것만 막는다
+        var = (n * total_sq - total * total) / (n * (n - 1))
+        steps_std = max(var, 0.0) ** 0.5
+    return {
+        "n": n_rows,
+        "steps_mean": steps_mean,
+        "steps_std": steps_std,
+        "success_rate": success_sum / n_success if n_success else nan,
+    }
+
+
+def check_aggregates(conn, users=5):
+    """run_aggregates 가 예전 pandas 계산과 같은 값을 내는지 확인. 다르면 RuntimeError
+
+    전체, 레벨별, 사용자 몇 명, 사용자 x 레벨 조합을 비교한다.
+    """
+    import math
+
+    levels = [row[0] for row in conn.execute("SELECT DISTINCT level FROM runs")]
+    some_users = list_users(conn)[:users]
+    filters = [(None, None)] + [(None, lv) for lv in levels] + [(u, None) for u in some_users]
+    filters += [(u, lv) for u in some_users[:2] for lv in levels]
+    problems = []
+    for user_id, level in filters:
+        df = load_runs_df(conn, user_id, level, columns=("steps", "success"))
+        agg = run_aggregates(conn, user_id, level)
+        if df.empty:
+            if agg is not None:
+                problems.append(f"{user_id}/{level}: 기록이 없는데 {agg}")
+            continue
+        expected = {
+            "n": len(df),
+            "steps_mean": df["steps"].mean(),
+            "steps_std": df["steps"].std(ddof=1) if len(df) > 1 else 0.0,
+            "success_rate": df["success"].mean(),
+        }
+        for key, want in expected.items():
+            got = agg[key]
+            same = (math.isnan(want) and math.isnan(got)) or math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-12)
+            if not same:
+                problems.append(f"{user_id}/{level} {key}: pandas {want!r}, SQL {got!r}")
+    if problems:
+        raise RuntimeError("집계 값이 다름:\n" + "\n".join(problems))
+    return len(filters)
+
+
+# ----------------------------- CSV 내보내기 ----------------------------- #
+# 커서에서 EXPORT_CHUNK 줄씩 꺼내 바로 인코딩해 쓴다. 전체를 메모리에 올리지 않는다.
+EXPORT_COLUMNS = tuple(c for c in RUN_COLUMNS if c != "commands")  # 줄바꿈 많은 commands 는 빼고
+EXPORT_CHUNK = 5000
+EXPORT_ENCODING = "cp949"  # 한셀 / 엑셀에서 바로 열리게
+
+
+def iter_run_chunks(conn, user_id=None, level=None, since=None, until=None, columns=EXPORT_COLUMNS,
+                    chunk_size=EXPORT_CHUNK, order="run_time DESC"):
+    """필터에 맞는 기록을 order 순서(기본 최신순)로 chunk_size 줄씩 (튜플 리스트)"""
+    where, params = run_filter(user_id, level, since, until)
+    cur = conn.execute(f"SELECT {select_list(columns)} FROM runs{where} ORDER BY {order}", params)
+    try:
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cur.close()
+
+
+def _csv_bytes(rows, encoding):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    # cp949 에 없는 문자(이모지 등)는 예전처럼 버린다
+    return buf.getvalue().encode(encoding, errors="ignore")
+
+
+def export_runs_csv(conn, out, user_id=None, level=None, since=None, until=None,
+                    columns=EXPORT_COLUMNS, encoding=EXPORT_ENCODING, chunk_size=EXPORT_CHUNK):
+    """필터에 맞는 기록을 CSV 로 out(바이너리 파일)에 쓴다. 쓴 줄 수(머리글 제외)를 돌려준다"""
+    out.write(_csv_bytes([columns], encoding))
+    n = 0
+    for rows in iter_run_chunks(conn, user_id, level, since, until, columns, chunk_size):
+        out.write(_csv_bytes(rows, encoding))
+        n += len(rows)
+    return n
+
+
+def export_preview(conn, user_id=None, level=None, since=None, until=None,
+                   columns=EXPORT_COLUMNS, encoding=EXPORT_ENCODING, sample=200):
+    """내보내기 전에 보여 줄 (줄 수, 예상 파일 크기 bytes). 크기는 앞쪽 sample 줄의 평균으로 어림한다"""
+    n = count_runs(conn, user_id, level, since, until)
+    header = len(_csv_bytes([columns], encoding))
+    if n == 0:
+        return 0, header
+    first = next(iter_run_chunks(conn, user_id, level, since, until, columns, sample))
+    return n, header + round(len(_csv_bytes(first, encoding)) / len(first) * n)
+
+
+# ----------------------------- 쿼리 플랜 점검 ----------------------------- #
+# 매 rerun 마다 도는 쿼리들. 인덱스 없이 전체를 읽거나 따로 정렬하면 안 된다.
+HOT_QUERIES = {
+    "get_user_stats": (
+        "SELECT recent, last_diff FROM user_stats WHERE user_id = ?",
+        ("someone",),
+    ),
+    "rebuild_user_stats": (
+        "SELECT user_id, success, difficulty, run_time FROM runs WHERE user_id IS NOT NULL AND user_id != '' ORDER BY user_id DESC, run_time DESC, id DESC",
+        (),
+    ),
+    "load_runs_page": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps, decode_commands(commands) AS commands FROM runs ORDER BY run_time DESC LIMIT ? OFFSET ?",
+        (50, 0),
+    ),
+    "runs_by_user": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps, decode_commands(commands) AS commands FROM runs WHERE user_id = ? ORDER BY run_time DESC LIMIT ? OFFSET ?",
+        ("someone", 50, 0),
+    ),
+    "runs_by_level": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps, decode_commands(commands) AS commands FROM runs WHERE level = ? ORDER BY run_time DESC LIMIT ? OFFSET ?",
+        ("Level 1", 50, 0),
+    ),
+    "runs_by_user_level": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps, decode_commands(commands) AS commands FROM runs WHERE user_id = ? AND level = ? ORDER BY run_time DESC LIMIT ? OFFSET ?",
+        ("someone", "Level 1", 50, 0),
+    ),
+    "export_by_range": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps FROM runs WHERE run_time >= ? AND run_time < ? ORDER BY run_time DESC",
+        ("2024-01-01", "2024-02-01"),
+    ),
+    "export_by_user_range": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps FROM runs WHERE user_id = ? AND run_time >= ? AND run_time < ? ORDER BY run_time DESC",
+        ("someone", "2024-01-01", "2024-02-01"),
+    ),
+    "export_by_level_range": (
+        "SELECT id, user_id, run_time, level, difficulty, success, steps, optimal_steps FROM runs WHERE level = ? AND run_time >= ? AND run_time < ? ORDER BY run_time DESC",
+        ("Level 1", "2024-01-01", "2024-02-01"),
+    ),
+    "count_runs_by_user": (
+        "SELECT COUNT(*) FROM runs WHERE user_id = ?",
+        ("someone",),
+    ),
+}
+
+
+def explain(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN 의 detail 열 목록"""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def check_query_plans(conn):
+    """HOT_QUERIES 가 전부 인덱스를 타는지 확인. 문제가 있으면 RuntimeError"""
+    problems = []
+    for name, (sql, params) in HOT_QUERIES.items():
+        for detail in explain(conn, sql, params):
+            full_scan = detail.startswith("SCAN") and "USING" not in detail
+            if full_scan or "TEMP B-TREE" in detail:
+                problems.append(f"{name}: {detail}")
+    if problems:
+        raise RuntimeError("인덱스를 타지 않는 쿼리:\n" + "\n".join(problems))
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="robot_game_runs.db 관리")
+    parser.add_argument("command", choices=["migrate", "check-plans", "rebuild-stats", "check-stats", "vacuum"])
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    conn = get_conn(args.db)
+    if args.command == "migrate":
+        print(f"schema version {conn.execute('PRAGMA user_version').fetchone()[0]}")
+    elif args.command == "check-plans":
+        for name, (sql, params) in HOT_QUERIES.items():
+            print(name)
+            for detail in explain(conn, sql, params):
+                print("   ", detail)
+        check_query_plans(conn)
+        print("ok")
+    elif args.command == "rebuild-stats":
+        with _write_lock, conn:
+            rebuild_user_stats(conn)
+        print(f"user_stats {conn.execute('SELECT COUNT(*) FROM user_stats').fetchone()[0]} rows")
+    elif args.command == "check-stats":
+        print(f"ok ({check_aggregates(conn)} filters)")
+    elif args.command == "vacuum":
+        before = os.path.getsize(args.db)
+        with _write_lock:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        print(f"{before / 1e6:.1f} MB -> {os.path.getsize(args.db) / 1e6:.1f} MB")
@@ -0,0 +1,193 @@
+# runs_arrow.py
+# runs 테이블 <-> Parquet / Arrow IPC 파일 (오프라인 분석용 내보내기 / 다시 넣기)
+#   python runs_arrow.py export runs.parquet
+#   python runs_arrow.py import runs.parquet --db other.db
+#   python runs_arrow.py bench --rows 1000000
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+from commands import encode_commands
+from run_db import DB_PATH, RUN_COLUMNS, fill_synthetic_runs, get_conn, iter_run_chunks, rebuild_user_stats, _write_lock
+
+BATCH_ROWS = 65536  # Parquet row group / IPC record batch 하나에 들어가는 줄 수
+
+# user_id / level 은 값 종류가 적어서 사전(dictionary) 인코딩. commands 도 그대로 싣는다.
+SCHEMA = pa.schema([
+    ("id", pa.int64()),
+    ("user_id", pa.dictionary(pa.int32(), pa.string())),
+    ("run_time", pa.string()),  # ISO 문자열 그대로 (정렬 순서 = 시간 순서, 되돌릴 때 그대로 복원)
+    ("level", pa.dictionary(pa.int32(), pa.string())),
+    ("difficulty", pa.int8()),
+    ("success", pa.int8()),
+    ("steps", pa.int32()),
+    ("optimal_steps", pa.int32()),
+    ("commands", pa.string()),  # DB 의 바이너리를 풀어 둔 텍스트
+])
+DICT_COLUMNS = ("user_id", "level")
+
+
+def _format(path, fmt=None):
+    if fmt:
+        return fmt
+    return "arrow" if os.path.splitext(path)[1] in (".arrow", ".feather", ".ipc") else "parquet"
+
+
+def _dictionaries(conn):
+    # 모든 batch 가 같은 사전을 쓰게 미리 뽑아 둔다 (IPC 파일은 중간에 사전을 바꿀 수 없다)
+    return {
+        name: pa.array([row[0] for row in conn.execute(f"SELECT DISTINCT {name} FROM runs WHERE {name} IS NOT NULL ORDER BY {name}")], pa.string())
+        for name in DICT_COLUMNS
+    }
+
+
+def _record_batch(rows, dictionaries):
+    columns = list(zip(*rows))
+    arrays = []
+    for i, field in enumerate(SCHEMA):
+        if field.name in DICT_COLUMNS:
+            dictionary = dictionaries[field.name]
+            index = {v: k for k, v in enumerate(dictionary.to_pylist())}
+            indices = pa.array([index[v] if v is not None else None for v in columns[i]], pa.int32())
+            arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        else:
+            arrays.append(pa.array(columns[i], field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=SCHEMA)
+
+
+def export_runs(conn, path, fmt=None, batch_rows=BATCH_ROWS, **filters):
+    """runs 를 path 에 Parquet(기본) 또는 Arrow IPC 파일로 쓴다. 쓴 줄 수를 돌려준다
+
+    fmt 를 생략하면 확장자(.arrow / .feather / .ipc)로 고른다. filters 는 run_filter 와 같다.
+    batch_rows 줄씩 id 순서로 커서에서 꺼내 바로 쓰므로 메모리는 batch 하나 만큼만 쓴다.
+    """
+    fmt = _format(path, fmt)
+    dictionaries = _dictionaries(conn)
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, SCHEMA, compression="zstd")
+    else:
+        writer = ipc.new_file(path, SCHEMA, options=ipc.IpcWriteOptions(compression="zstd"))
+    n = 0
+    try:
+        # id 순서로 써 두면 다시 넣을 때 테이블 끝에 이어 붙기만 한다
+        for rows in iter_run_chunks(conn, columns=RUN_COLUMNS, chunk_size=batch_rows, order="id", **filters):
+            batch = _record_batch(rows, dictionaries)
+            if fmt == "parquet":
+                writer.write_batch(batch, row_group_size=batch_rows)
+            else:
+                writer.write_batch(batch)
+            n += len(rows)
+    finally:
+        writer.close()
+    return n
+
+
+def _iter_batches(path, fmt=None, batch_rows=BATCH_ROWS):
+    if _format(path, fmt) == "parquet":
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows)
+    else:
+        with ipc.open_file(path) as reader:
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+
+def import_runs(conn, path, fmt=None, keep_ids=True, batch_rows=BATCH_ROWS):
+    """export_runs 로 만든 파일을 runs 에 한 트랜잭션으로 넣는다. 넣은 줄 수를 돌려준다
+
+    keep_ids=True 이면 id 를 그대로 넣는다 (같은 id 가 이미 있으면 IntegrityError 로 전부 취소).
+    다 넣은 뒤 user_stats 를 다시 계산한다.
+    """
+    columns = RUN_COLUMNS if keep_ids else tuple(c for c in RUN_COLUMNS if c != "id")
+    sql = f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    n = 0
+    with _write_lock, conn:
+        for batch in _iter_batches(path, fmt, batch_rows):
+            data = [batch.column(name).to_pylist() for name in columns]
+            # 파일에는 텍스트로 있으니 DB 저장 형식으로 다시 인코딩
+            data[columns.index("commands")] = map(encode_commands, data[columns.index("commands")])
+            conn.executemany(sql, zip(*data))
+            n += batch.num_rows
+        rebuild_user_stats(conn)
+    return n
+
+
+# ----------------------------- 벤치마크 ----------------------------- #
+def bench(rows, workdir):
+    """rows 줄짜리 DB 로 CSV(to_csv) / Parquet / Arrow 내보내기와 다시 넣기 시간, 파일 크기 비교"""
+    import pandas as pd
+
+    from run_db import load_runs_df
+
+    src_path = os.path.join(workdir, "bench_src.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(src_path + suffix):
+            os.remove(src_path + suffix)
+    src = get_conn(src_path)
+    fill_synthetic_runs(src, rows)
+
+    results = []
+
+    def timed(name, fn):
+        t = time.perf_counter()
+        fn()
+        results.append((name, time.perf_counter() - t))
+
+    csv_path = os.path.join(workdir, "runs.csv")
+
+    def csv_export():
+        with open(csv_path, "wb") as f:
+            f.write(load_runs_df(src).to_csv(index=False).encode("cp949", errors="ignore"))
+
+    def csv_import():
+        dst = get_conn(os.path.join(workdir, "bench_csv.db"))
+        df = pd.read_csv(csv_path, encoding="cp949")
+        with _write_lock, dst:
+            df.to_sql("runs", dst, if_exists="append", index=False, chunksize=BATCH_ROWS)
+            rebuild_user_stats(dst)
+
+    timed("export csv (to_csv)", csv_export)
+    timed("import csv (read_csv)", csv_import)
+    for fmt, name in (("parquet", "runs.parquet"), ("arrow", "runs.arrow")):
+        path = os.path.join(workdir, name)
+        timed(f"export {fmt}", lambda: export_runs(src, path))
+        timed(f"import {fmt}", lambda: import_runs(get_conn(os.path.join(workdir, f"bench_{fmt}.db")), path))
+
+    sizes = {name: os.path.getsize(os.path.join(workdir, name)) for name in ("runs.csv", "runs.parquet", "runs.arrow")}
+    return results, sizes
+
+
+if __name__ == "__main__":
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="runs 테이블 Parquet / Arrow 내보내기 / 가져오기")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_export = sub.add_parser("export")
+    p_export.add_argument("path")
+    p_export.add_argument("--db", default=DB_PATH)
+    p_export.add_argument("--format", choices=["parquet", "arrow"])
+    p_import = sub.add_parser("import")
+    p_import.add_argument("path")
+    p_import.add_argument("--db", default=DB_PATH)
+    p_import.add_argument("--format", choices=["parquet", "arrow"])
+    p_import.add_argument("--new-ids", action="store_true", help="id 를 새로 매긴다")
+    p_bench = sub.add_parser("bench")
+    p_bench.add_argument("--rows", type=int, default=1000000)
+    p_bench.add_argument("--dir", help="작업 폴더 (기본: 임시 폴더)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"{export_runs(get_conn(args.db), args.path, args.format)} rows -> {args.path}")
+    elif args.command == "import":
+        print(f"{import_runs(get_conn(args.db), args.path, args.format, keep_ids=not args.new_ids)} rows <- {args.path}")
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            results, sizes = bench(args.rows, args.dir or tmp)
+        print(f"{args.rows} rows")
+        for name, sec in results:
+            print(f"  {name:<24} {sec:8.2f} s")
+        for name, size in sizes.items():
+            print(f"  {name:<24} {size / 1e6:8.1f} MB")
@@ -0,0 +1,429 @@
+# solver.py
+# 인터프리터의 실제 명령 공간에서 최소 명령 수를 구하는 풀이기
+# 상태 = (칸, 바라보는 방향, 집은 목표 비트마스크), 명령 한 줄 = 비용 1
+import heapq
+import time
+from collections import deque
+from functools import lru_cache
+
+from game_core import DIRECTIONS, LEVELS, MAP_SIZE, blocked_cells, cell_index
+from commands import (
+    OP_MOVE_LEFT, OP_MOVE_RIGHT, OP_MOVE_BACK, OP_TURN_LEFT, OP_TURN_RIGHT, OP_PICK,
+    MOVE_DIR, TURN_LEFT, TURN_RIGHT, SIMPLE_COMMANDS,
+)
+
+# 방향별 (행, 열) 이동량 (DIRECTIONS 순서)
+_DR = [-1, 0, 1, 0]
+_DC = [0, 1, 0, -1]
+_OP_TEXT = {op: text for text, op in SIMPLE_COMMANDS.items()}
+
+
+def _forward_text(n):
+    return "앞으로" if n == 1 else f"앞으로 {n}칸"
+
+
+def _moves(idx, d, blocked, portal_cells):
+    """(idx, d) 에서 명령 한 줄로 갈 수 있는 (명령, 새 칸, 새 방향)
+
+    포탈 칸에서 명령이 끝나면 어디로 튈지 모르므로 끝 칸으로는 쓰지 않는다
+    (지나가기만 하는 것은 괜찮다. 포탈은 명령이 끝날 때만 확인한다).
+    """
+    r, c = divmod(idx, MAP_SIZE)
+    # 앞으로 N칸: 막히기 전까지 한 칸씩 늘려 간다
+    nr, nc, n = r, c, 0
+    while True:
+        nr += _DR[d]
+        nc += _DC[d]
+        n += 1
+        if not (0 <= nr < MAP_SIZE and 0 <= nc < MAP_SIZE) or blocked[nr * MAP_SIZE + nc]:
+            break
+        nxt = nr * MAP_SIZE + nc
+        if nxt not in portal_cells:
+            yield _forward_text(n), nxt, d
+    # 옆 / 뒤로 한 칸
+    for op in (OP_MOVE_LEFT, OP_MOVE_RIGHT, OP_MOVE_BACK):
+        md = MOVE_DIR[op][d]
+        nr, nc = r + _DR[md], c + _DC[md]
+        if 0 <= nr < MAP_SIZE and 0 <= nc < MAP_SIZE and not blocked[nr * MAP_SIZE + nc]:
+            nxt = nr * MAP_SIZE + nc
+            if nxt not in portal_cells:
+                yield _OP_TEXT[op], nxt, d
+    # 포탈 칸 위에서는 회전만 해도 명령이 끝날 때 순간 이동한다
+    if idx not in portal_cells:
+        yield _OP_TEXT[OP_TURN_LEFT], idx, TURN_LEFT[d]
+        yield _OP_TEXT[OP_TURN_RIGHT], idx, TURN_RIGHT[d]
+
+
+def solve(start, direction, obstacles, goals, portals=()):
+    """start 에서 direction 을 보고 시작해 goals 를 전부 집는 가장 짧은 명령어 목록
+
+    반환값 {'steps': 명령 수, 'program': 명령어 문자열 리스트}, 불가능하면 None.
+    귀신은 고려하지 않는다. 포탈 칸에서 끝나는 명령은 쓰지 않는다.
+    """
+    blocked = blocked_cells(obstacles)
+    goal_bit = {cell_index(g): 1 << i for i, g in enumerate(goals)}
+    full = (1 << len(goals)) - 1
+    portal_cells = {cell_index(p) for p in portals}
+    n_masks = full + 1
+
+    def key(idx, d, mask):
+        return (idx * 4 + d) * n_masks + mask
+
+    first = key(cell_index(start), DIRECTIONS.index(direction), 0)
+    # parent[state] = (이전 state, 명령)
+    parent = {first: None}
+    queue = deque([(cell_index(start), DIRECTIONS.index(direction), 0)])
+    while queue:
+        idx, d, mask = queue.popleft()
+        state = key(idx, d, mask)
+        if mask == full:
+            program = []
+            while parent[state] is not None:
+                state, text = parent[state]
+                program.append(text)
+            program.reverse()
+            return {'steps': len(program), 'program': program}
+        steps = []
+        bit = goal_bit.get(idx, 0)
+        if bit and not mask & bit:
+            steps.append((_OP_TEXT[OP_PICK], idx, d, mask | bit))
+        for text, nxt, nd in _moves(idx, d, blocked, portal_cells):
+            steps.append((text, nxt, nd, mask))
+        for text, nxt, nd, nmask in steps:
+            nkey = key(nxt, nd, nmask)
+            if nkey not in parent:
+                parent[nkey] = (state, text)
+                queue.append((nxt, nd, nmask))
+    return None
+
+
+def map_solution(s, position=None, direction=None):
+    """맵 상태 s 에서 (position, direction) 으로 시작할 때의 최적 풀이. 맵마다 한 번만 계산해 둔다
+
+    생략하면 현재 위치 / 방향. 결과는 s['solutions'] 에 (위치, 방향) 별로 캐시한다.
+    포탈을 타야만 끝나는 맵이면 portal_plan 의 worst (반드시 끝나는 명령 수), 그것도 없으면
+    expected (기대 명령 수, 반올림) 를 최적으로 본다. 이때 'program' 은 첫 포탈까지이고
+    'branches' 에 도착할 수 있는 칸 수가 들어 있다.
+    """
+    position = s['position'] if position is None else position
+    direction = s['direction'] if direction is None else direction
+    cache = s.setdefault('solutions', {})
+    k = (position, direction)
+    if k not in cache:
+        solution = solve(position, direction, s['obstacles'], s['goals'], s['portals'])
+        if solution is None and s['portals']:
+            via_portal = portal_plan(position, direction, s['obstacles'], s['goals'], s['portals'])
+            solution = via_portal['worst']
+            if solution is None and via_portal['expected']:
+                # 같은 포탈을 운 좋게 다시 타야만 끝나는 맵. 기대 명령 수를 반올림해 쓴다
+                solution = dict(via_portal['expected'], steps=round(via_portal['expected']['steps']))
+        cache[k] = solution
+    return cache[k]
+
+
+def is_perfect(s, command_count, visited_goals, position=None, direction=None):
+    """목표를 전부 집었고 명령 수가 최적 이하이면 Perfect
+
+    포탈 운이 좋으면 풀이기보다 짧을 수 있어서 == 가 아니라 <= 로 본다.
+    """
+    if len(visited_goals) < len(s['goals']):
+        return False
+    solution = map_solution(s, position, direction)
+    return solution is not None and command_count <= solution['steps']
+
+
+# ----------------------------- 귀신을 피하는 계획 (레벨 4, 5) ----------------------------- #
+# 상태 = (칸, 방향, 귀신 칸, 집은 목표). 귀신은 명령 한 줄마다 engine 과 같은 규칙으로 한 칸 쫓아온다.
+# 휴리스틱은 귀신을 뺀 같은 문제의 정확한 남은 명령 수 (역방향 BFS 로 맵마다 한 번 계산).
+# 귀신은 갈 수 있는 길을 줄이기만 하므로 이 값은 실제보다 크지 않다 (admissible).
+PLAN_BUDGET = 50000   # 힌트 한 번에 펼칠 수 있는 최대 노드 수
+PLAN_TIME_MS = 200    # 힌트 한 번에 쓸 수 있는 최대 시간
+
+
+@lru_cache(maxsize=64)
+def _cost_to_go(obstacles, goals, portals):
+    """귀신이 없을 때 state -> 목표를 다 집을 때까지 남은 최소 명령 수 (도달 불가면 없음)"""
+    blocked = blocked_cells(obstacles)
+    goal_bit = {cell_index(g): 1 << i for i, g in enumerate(goals)}
+    full = (1 << len(goals)) - 1
+    portal_cells = {cell_index(p) for p in portals}
+    reverse = {}
+    for idx in range(MAP_SIZE * MAP_SIZE):
+        if blocked[idx] or idx in portal_cells:
+            continue
+        for d in range(4):
+            for mask in range(full + 1):
+                state = (idx, d, mask)
+                bit = goal_bit.get(idx, 0)
+                if bit and not mask & bit:
+                    reverse.setdefault((idx, d, mask | bit), []).append(state)
+                for _, nxt, nd in _moves(idx, d, blocked, portal_cells):
+                    reverse.setdefault((nxt, nd, mask), []).append(state)
+    cost = {}
+    queue = deque()
+    for idx in range(MAP_SIZE * MAP_SIZE):
+        if not blocked[idx] and idx not in portal_cells:
+            for d in range(4):
+                cost[(idx, d, full)] = 0
+                queue.append((idx, d, full))
+    while queue:
+        state = queue.popleft()
+        for prev in reverse.get(state, ()):
+            if prev not in cost:
+                cost[prev] = cost[state] + 1
+                queue.append(prev)
+    return cost
+
+
+def _ghost_step(ghost, pos, blocked, ignore_obstacles):
+    # engine._run 의 귀신 이동과 같은 규칙 (세로 먼저, 못 가면 가로)
+    gr, gc = divmod(ghost, MAP_SIZE)
+    r, c = divmod(pos, MAP_SIZE)
+    if gr != r:
+        nr = gr + (1 if r > gr else -1)
+        if 0 <= nr < MAP_SIZE and (ignore_obstacles or not blocked[nr * MAP_SIZE + gc]):
+            return nr * MAP_SIZE + gc
+    if gc != c:
+        nc = gc + (1 if c > gc else -1)
+        if 0 <= nc < MAP_SIZE and (ignore_obstacles or not blocked[gr * MAP_SIZE + nc]):
+            return gr * MAP_SIZE + nc
+    return ghost
+
+
+def plan_with_ghost(start, direction, ghost, obstacles, goals, portals=(), ignore_obstacles=False,
+                    budget=PLAN_BUDGET, time_ms=PLAN_TIME_MS):
+    """귀신에게 잡히지 않고 goals 를 전부 집는 가장 짧은 명령어 목록 (A*)
+
+    반환값 (plan, stats). plan 은 {'steps', 'program'} 또는 None (불가능 / 예산 초과),
+    stats 는 expanded, generated, elapsed_ms, exhausted(예산이나 시간을 다 썼는지).
+    ghost 가 None 이면 solve 와 같은 답을 낸다.
+    """
+    t0 = time.perf_counter()
+    deadline = t0 + time_ms / 1000
+    obstacles = frozenset(obstacles)
+    goals = tuple(goals)
+    portals = tuple(portals)
+    h = _cost_to_go(obstacles, goals, portals)
+    blocked = blocked_cells(obstacles)
+    goal_bit = {cell_index(g): 1 << i for i, g in enumerate(goals)}
+    full = (1 << len(goals)) - 1
+    portal_cells = {cell_index(p) for p in portals}
+    stats = {'expanded': 0, 'generated': 0, 'elapsed_ms': 0.0, 'exhausted': False}
+
+    first = (cell_index(start), DIRECTIONS.index(direction), cell_index(ghost) if ghost else -1, 0)
+    if (first[0], first[1], 0) not in h:
+        stats['elapsed_ms'] = (time.perf_counter() - t0) * 1000
+        return None, stats
+    # 전치표: 상태 -> (지금까지 명령 수, 이전 상태, 명령)
+    best = {first: (0, None, None)}
+    heap = [(h[(first[0], first[1], 0)], 0, first)]
+    plan = None
+    while heap:
+        f, g, state = heapq.heappop(heap)
+        if best[state][0] < g:
+            continue  # 더 짧게 이미 도착한 상태
+        idx, d, gh, mask = state
+        if mask == full:
+            program = []
+            while best[state][1] is not None:
+                _, prev, text = best[state]
+                program.append(text)
+                state = prev
+            program.reverse()
+            plan = {'steps': len(program), 'program': program}
+            break
+        stats['expanded'] += 1
+        if stats['expanded'] > budget or (stats['expanded'] & 1023 == 0 and time.perf_counter() > deadline):
+            stats['exhausted'] = True
+            break
+        moves = list(_moves(idx, d, blocked, portal_cells))
+        bit = goal_bit.get(idx, 0)
+        if bit and not mask & bit:
+            moves.append((_OP_TEXT[OP_PICK], idx, d))
+        for text, nxt, nd in moves:
+            nmask = mask | bit if text == _OP_TEXT[OP_PICK] else mask
+            ngh = _ghost_step(gh, nxt, blocked, ignore_obstacles) if gh >= 0 else -1
+            if ngh == nxt:
+                continue  # 잡힘
+            rest = h.get((nxt, nd, nmask))
+            if rest is None:
+                continue
+            nstate = (nxt, nd, ngh, nmask)
+            if nstate not in best or best[nstate][0] > g + 1:
+                best[nstate] = (g + 1, state, text)
+                heapq.heappush(heap, (g + 1 + rest, g + 1, nstate))
+                stats['generated'] += 1
+    stats['elapsed_ms'] = (time.perf_counter() - t0) * 1000
+    return plan, stats
+
+
+def hint_plan(s, budget=PLAN_BUDGET, time_ms=PLAN_TIME_MS):
+    """맵 상태 s 의 현재 위치 / 방향 / 귀신에서 시작하는 힌트용 계획 (plan, stats)"""
+    level_info = LEVELS[s['level']]
+    return plan_with_ghost(
+        s['position'], s['direction'], s['ghost'], s['obstacles'], s['goals'], s['portals'],
+        ignore_obstacles=level_info.get('ignore_obstacles', False), budget=budget, time_ms=time_ms,
+    )
+
+
+# ----------------------------- 포탈을 쓰는 계획 ----------------------------- #
+# 포탈 칸에서 명령이 끝나면 다른 포탈 주변 빈 칸 중 하나로 같은 확률로 이동한다 (engine 의 rng.shuffle).
+# 이 지점을 확률 노드로 두고 귀신 없는 (칸, 방향, 집은 목표) 상태 전체의 값을 맵마다 한 번 계산한다.
+#   worst   : 어떤 칸으로 튀어도 반드시 끝나는 최소 명령 수 (AND-OR 역방향 탐색)
+#   expected: 평균 명령 수가 가장 적은 전략의 기대 명령 수 (가치 반복)
+def portal_table(obstacles, portals):
+    """포탈 칸 -> 도착할 수 있는 칸 튜플 (모두 같은 확률). 갈 곳이 없으면 제자리"""
+    blocked = blocked_cells(obstacles)
+    table = {}
+    for p in portals:
+        dest = [q for q in portals if q != p][0]
+        around = []
+        for dr, dc in zip(_DR, _DC):
+            r, c = dest[0] + dr, dest[1] + dc
+            if 0 <= r < MAP_SIZE and 0 <= c < MAP_SIZE and not blocked[r * MAP_SIZE + c]:
+                around.append(r * MAP_SIZE + c)
+        table[cell_index(p)] = tuple(around) or (cell_index(p),)
+    return table
+
+
+@lru_cache(maxsize=64)
+def _portal_values(obstacles, goals, portals):
+    blocked = blocked_cells(obstacles)
+    goal_bit = {cell_index(g): 1 << i for i, g in enumerate(goals)}
+    full = (1 << len(goals)) - 1
+    table = portal_table(obstacles, portals)
+
+    # 상태마다 (명령, 결과 상태 튜플) 목록. 결과가 여럿이면 확률 노드
+    actions = {}
+    for idx in range(MAP_SIZE * MAP_SIZE):
+        if blocked[idx]:
+            continue
+        for d in range(4):
+            for mask in range(full + 1):
+                acts = []
+                bit = goal_bit.get(idx, 0)
+                if bit and not mask & bit:
+                    acts.append((_OP_TEXT[OP_PICK], ((idx, d, mask | bit),)))
+                # 포탈 칸을 빈 칸으로 보고 움직인 뒤, 끝 칸이 포탈이면 확률 노드로 (포탈 위 회전도 여기 해당)
+                for text, nxt, nd in _moves(idx, d, blocked, ()):
+                    if nxt in table:
+                        acts.append((text, tuple((q, nd, mask) for q in table[nxt])))
+                    else:
+                        acts.append((text, ((nxt, nd, mask),)))
+                actions[(idx, d, mask)] = acts
+
+    # worst: 결과가 전부 풀린 행동이 생기는 순간 그 상태의 값이 정해진다 (값이 작은 순서로 처리)
+    worst = {}
+    worst_act = {}
+    waiting = {}
+    reverse = {}
+    for state, acts in actions.items():
+        for i, (_, outcomes) in enumerate(acts):
+            distinct = set(outcomes)
+            waiting[(state, i)] = len(distinct)
+            for o in distinct:
+                reverse.setdefault(o, []).append((state, i))
+    queue = deque()
+    for state in actions:
+        if state[2] == full:
+            worst[state] = 0
+            queue.append(state)
+    while queue:
+        o = queue.popleft()
+        for state, i in reverse.get(o, ()):
+            waiting[(state, i)] -= 1
+            if waiting[(state, i)] == 0 and state not in worst:
+                worst[state] = worst[o] + 1
+                worst_act[state] = i
+                queue.append(state)
+
+    # expected: 운이 좋아야만 끝나는 상태도 있으므로 (worst 는 무한대, 기대값은 유한)
+    # 1) 가장 운 좋은 결과만 따진 명령 수 (아래 한계)
+    best_case = {}
+    queue = deque()
+    for state in actions:
+        if state[2] == full:
+            best_case[state] = 0
+            queue.append(state)
+    while queue:
+        o = queue.popleft()
+        for state, _ in reverse.get(o, ()):
+            if state not in best_case:
+                best_case[state] = best_case[o] + 1
+                queue.append(state)
+    # 2) 확률 1 로 끝낼 수 있는 상태만 남긴다 (결과가 전부 그 안에 있는 행동만 쓴다)
+    alive = set(best_case)
+    while True:
+        allowed = {
+            state: [i for i, (_, outcomes) in enumerate(actions[state]) if all(o in alive for o in outcomes)]
+            for state in alive
+        }
+        reach = {state for state in alive if state[2] == full}
+        queue = deque(reach)
+        while queue:
+            o = queue.popleft()
+            for state, i in reverse.get(o, ()):
+                if state in alive and state not in reach and i in allowed[state]:
+                    reach.add(state)
+                    queue.append(state)
+        if reach == alive:
+            break
+        alive = reach
+    # 3) 아래 한계에서 시작하는 가치 반복 (값이 올라가며 수렴)
+    expected = {state: float(best_case[state]) for state in alive}
+    expected_act = {}
+    order = [state for state in sorted(alive, key=best_case.get) if state[2] != full]
+    choices = {state: [(i, actions[state][i][1]) for i in allowed[state]] for state in order}
+    get = expected.__getitem__
+    for _ in range(1000):
+        change = 0.0
+        for state in order:
+            best_v = best_i = None
+            for i, outcomes in choices[state]:
+                if len(outcomes) == 1:
+                    v = 1 + expected[outcomes[0]]
+                else:
+                    v = 1 + sum(map(get, outcomes)) / len(outcomes)
+                if best_v is None or v < best_v - 1e-12:
+                    best_v, best_i = v, i
+            diff = best_v - expected[state]
+            if diff > change or -diff > change:
+                change = abs(diff)
+            expected[state] = best_v
+            expected_act[state] = best_i
+        if change < 1e-9:
+            break
+    return actions, worst, worst_act, expected, expected_act
+
+
+def _policy_prefix(actions, policy, state, full):
+    # 정책을 따라 확률 노드(포탈)를 처음 만날 때까지의 명령어 (그 명령 포함)와 그때 갈 수 있는 칸 수
+    program = []
+    while state[2] != full:
+        text, outcomes = actions[state][policy[state]]
+        program.append(text)
+        if len(outcomes) > 1:
+            return program, len(outcomes)
+        state = outcomes[0]
+    return program, 0
+
+
+def portal_plan(start, direction, obstacles, goals, portals):
+    """포탈까지 고려한 두 가지 계획. 귀신은 고려하지 않는다
+
+    반환값 {'worst': ..., 'expected': ...}, 각 항목은 None 또는
+      steps:   worst 는 반드시 끝나는 명령 수, expected 는 기대 명령 수 (소수)
+      program: 첫 포탈 진입까지의 명령어 (포탈을 안 쓰면 끝까지)
+      branches: 그 포탈에서 도착할 수 있는 칸 수 (안 쓰면 0). 도착한 곳에서 다시 계획하면 된다.
+    """
+    actions, worst, worst_act, expected, expected_act = _portal_values(frozenset(obstacles), tuple(goals), tuple(portals))
+    full = (1 << len(goals)) - 1
+    state = (cell_index(start), DIRECTIONS.index(direction), 0)
+    result = {'worst': None, 'expected': None}
+    if state in worst:
+        program, branches = _policy_prefix(actions, worst_act, state, full)
+        result['worst'] = {'steps': worst[state], 'program': program, 'branches': branches}
+    if state in expected:
+        program, branches = _policy_prefix(actions, expected_act, state, full)
+        result['expected'] = {'steps': expected[state], 'program': program, 'branches': branches}
+    return result
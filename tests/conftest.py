@@ -0,0 +1,63 @@
+# 테스트 공용: 저장소 루트 모듈(run_db, commands ...)을 import 하고, 예전 스키마 DB 를 만든다
+import os
+import random
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import run_db  # noqa: E402
+
+# catch.py 가 마이그레이션 전에 만들던 그대로의 runs 표 (user_version 0, commands 는 텍스트)
+LEGACY_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id TEXT,
+        run_time TEXT,
+        level TEXT,
+        difficulty INTEGER,
+        commands TEXT,
+        success INTEGER,
+        steps INTEGER,
+        optimal_steps INTEGER
+    );
+"""
+LEGACY_LINES = ["앞으로", "앞으로 2칸", "왼쪽 회전", "오른쪽 회전", "왼쪽으로 이동", "집기"]
+
+
+def write_legacy_db(path, rows, seed=0, users=40):
+    """예전 스키마 DB 에 rows 줄. 넣은 (user_id, ...) 목록을 돌려준다"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        level_i = rng.randrange(5)
+        n_cmd = rng.randint(1, 12)
+        records.append((
+            f"u{rng.randrange(users)}",
+            f"2024-03-{1 + i // 2000:02d}T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+            f"Level {level_i + 1}",
+            level_i + 1,
+            "\n".join(rng.choice(LEGACY_LINES) for _ in range(n_cmd)),
+            rng.randint(0, 1),
+            n_cmd,
+            rng.randint(6, 14),
+        ))
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO runs (user_id, run_time, level, difficulty, commands, success, steps, optimal_steps)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            records,
+        )
+    conn.close()
+    return records
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """임시 DB 경로. 끝나면 run_db 가 들고 있는 공용 연결을 닫는다"""
+    yield str(tmp_path / "runs.db")
+    run_db.close_all()
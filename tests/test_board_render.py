@@ -0,0 +1,24 @@
+# board_render: PNG 캐시가 상태 그 자체로 구분되는지
+import numpy as np
+
+import board_render
+from board_render import BoardRenderer
+
+
+def test_png_cache_keys_are_states():
+    renderer = BoardRenderer({(4, 4)}, [(0, 1)], [])
+    first = renderer.png((1, 1), 'UP', (3, 3), [(3, 4)])
+    assert renderer.png((1, 1), 'UP', (3, 3), [(3, 4)]) is first
+    assert renderer.png((1, 1), 'LEFT', (3, 3), [(3, 4)]) != first
+    assert renderer.png((1, 1), 'UP', None, (), ghosts=np.array([[3, 3], [5, 5]])) != first
+    assert (renderer.hits, renderer.misses) == (1, 3)
+    assert ((1, 1), 'UP', (3, 3), frozenset({(3, 4)}), frozenset()) in renderer._png
+
+
+def test_png_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(board_render, "PNG_CACHE_SIZE", 4)
+    renderer = BoardRenderer(set(), [], [])
+    for c in range(6):
+        renderer.png((0, c), 'UP')
+    assert len(renderer._png) == 4
+    assert ((0, 0), 'UP', None, frozenset(), frozenset()) not in renderer._png
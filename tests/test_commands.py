@@ -0,0 +1,138 @@
+# commands: 명령어 컴파일(오류 / NOP), 저장용 바이너리 인코딩이 어떤 텍스트든 그대로 되돌리는지
+import random
+
+import pytest
+
+from commands import (
+    OP_FORWARD, OP_MOVE_LEFT, OP_MOVE_RIGHT, OP_MOVE_BACK, OP_TURN_LEFT, OP_TURN_RIGHT, OP_PICK, OP_NOP,
+    SIMPLE_COMMANDS, as_program, compile_commands, compile_line, decode_commands, encode_commands,
+)
+
+CASES = [
+    "",
+    "\n",
+    "\n\n\n",
+    "앞으로",
+    "앞으로 2",
+    "앞으로 3칸",
+    "앞으로\n앞으로\n앞으로\n왼쪽 회전",
+    # 잘못된 줄 / 띄어쓰기가 다른 줄
+    "앞",
+    "앞으로 0",
+    "앞으로 007칸",
+    "앞으로  2",
+    "앞으로 2 칸",
+    "앞으로 -1",
+    "앞으로 두칸",
+    "뒤로 점프",
+    "🤖 집기",
+    # 앞뒤 공백
+    "  앞으로 2  ",
+    "\t집기\n 왼쪽 회전 ",
+    "\n앞으로\n",
+    # CRLF
+    "앞으로\r\n왼쪽 회전\r\n",
+    "\r\n\r\n",
+    "앞으로 3\r",
+    # 큰 N (varint 여러 바이트)
+    "앞으로 128",
+    "앞으로 16384칸",
+    f"앞으로 {2 ** 64}",
+    f"앞으로 {10 ** 40}칸",
+    # ASCII 가 아닌 숫자
+    "앞으로 1٣",
+    "앞으로 ٣칸",
+    "앞으로 １２",
+    "앞으로 ²",
+]
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_round_trip(text):
+    data = encode_commands(text)
+    assert isinstance(data, bytes)
+    assert decode_commands(data) == text
+
+
+def test_none_and_legacy_text_pass_through():
+    assert encode_commands(None) is None
+    assert decode_commands(None) is None
+    assert decode_commands("앞으로\n집기") == "앞으로\n집기"
+
+
+def test_common_lines_are_compact():
+    assert len(encode_commands("앞으로")) == 2
+    assert len(encode_commands("앞으로 3칸")) == 3
+    assert len(encode_commands("\n".join(["오른쪽 회전"] * 100))) == 4
+
+
+def test_random_scripts_round_trip():
+    rng = random.Random(0)
+    pieces = list(SIMPLE_COMMANDS) + ["앞으로", "앞으로 ", "앞", "칸", " ", "\t", "\r", "0", "1", "9", "٣", "?"]
+    for _ in range(20000):
+        lines = []
+        for _ in range(rng.randint(0, 12)):
+            if rng.random() < 0.5:
+                lines.append(f"앞으로 {rng.randint(0, 300)}" + rng.choice(["", "칸", " 칸"]))
+            else:
+                lines.append("".join(rng.choice(pieces) for _ in range(rng.randint(0, 3))))
+            if rng.random() < 0.2:
+                lines.extend([lines[-1]] * rng.randint(1, 200))
+        text = "\n".join(lines)
+        assert decode_commands(encode_commands(text)) == text
+
+
+@pytest.mark.parametrize("data", [b"", b"\x02\x00", b"\x01\x07", b"\x01\x0c"])
+def test_decode_rejects_unknown_data(data):
+    with pytest.raises(ValueError):
+        decode_commands(data)
+
+
+# ----------------------------- 컴파일 ----------------------------- #
+def test_compile_valid_lines():
+    program, lines, errors = compile_commands("앞으로\n앞으로 2\n앞으로 3칸\n왼쪽 회전\n오른쪽 회전\n왼쪽으로 이동\n오른쪽으로 이동\n뒤로 이동\n집기")
+    assert program == (
+        OP_FORWARD, 1, OP_FORWARD, 2, OP_FORWARD, 3, OP_TURN_LEFT, 1, OP_TURN_RIGHT, 1,
+        OP_MOVE_LEFT, 1, OP_MOVE_RIGHT, 1, OP_MOVE_BACK, 1, OP_PICK, 1,
+    )
+    assert len(lines) == 9
+    assert errors == ()
+
+
+def test_compile_cleans_lines():
+    # 앞뒤 공백과 빈 줄은 버리고, "앞" 은 "앞으로"
+    program, lines, errors = compile_commands("\n  앞  \n\n\t집기\r\n")
+    assert lines == ("앞으로", "집기")
+    assert program == (OP_FORWARD, 1, OP_PICK, 1)
+    assert errors == ()
+
+
+def test_compile_reports_errors_with_line_numbers():
+    program, lines, errors = compile_commands("앞으로\n\n점프\n앞으로 2 더\n앞으로 두칸")
+    assert [(line_no, cmd) for line_no, cmd, _ in errors] == [(3, "점프"), (4, "앞으로 2 더"), (5, "앞으로 두칸")]
+    # 오류 줄도 예전 인터프리터와 같은 뜻으로 들어간다: 모르는 명령은 NOP, 모양이 틀린 "앞으로..." 는 읽을 수 있는 만큼
+    assert program == (OP_FORWARD, 1, OP_NOP, 0, OP_FORWARD, 2, OP_FORWARD, 1)
+    assert lines == ("앞으로", "점프", "앞으로 2 더", "앞으로 두칸")
+
+
+@pytest.mark.parametrize("line, op, arg", [
+    ("왼쪽으로", OP_NOP, 0),
+    ("집기 집기", OP_NOP, 0),
+    ("앞으로 0", OP_FORWARD, 0),
+    ("앞으로 10", OP_FORWARD, 10),
+    ("앞으로 2 칸", OP_FORWARD, 2),
+    ("앞으로3칸", OP_FORWARD, 1),
+    ("앞으로 3칸 더", OP_FORWARD, 3),
+])
+def test_compile_line(line, op, arg):
+    assert compile_line(line)[:2] == (op, arg)
+
+
+def test_compile_is_cached_and_as_program_accepts_every_form():
+    text = "앞으로 2\n집기"
+    assert compile_commands(text) is compile_commands(text)
+    program = compile_commands(text)[0]
+    assert as_program(text) == program
+    assert as_program(["앞으로 2", "집기"]) == program
+    assert as_program(program) == program
+    assert as_program([]) == ()
@@ -0,0 +1,175 @@
+# engine: 예전 화면 안 인터프리터와 같은 결과를 내는지, 일괄 채점이 재현 가능한지
+import random
+
+import pytest
+
+from commands import compile_commands
+from engine import (
+    simulate, simulate_batch, script_rng, iter_frames,
+    OUTCOME_CLEAR, OUTCOME_CRASH, OUTCOME_CAUGHT,
+)
+from game_core import (
+    DIRECTIONS, LEVELS, LEVEL_NAMES, MAP_SIZE, MOVE_OFFSET,
+    move_forward, move_ghost, new_map_state, rotate,
+)
+
+LINES = [
+    "앞으로", "앞으로 2", "앞으로 3칸", "앞으로 2 칸", "앞", "앞으로 두칸",
+    "왼쪽으로 이동", "오른쪽으로 이동", "뒤로 이동", "왼쪽 회전", "오른쪽 회전", "집기",
+    "점프", "", "  집기 ",
+]
+
+
+def legacy_run(s, command_list, rng):
+    """SQL / 엔진 도입 전 catch.py 실행 버튼 안의 반복문 그대로 (그리기 대신 장면을 모은다)"""
+    pos = s['position']
+    direction = s['direction']
+    ghost = s['ghost']
+    ghost_path = []
+    visited_goals = set()
+    frames = []
+    outcome = OUTCOME_CLEAR
+    failed = False
+
+    for raw in command_list:
+        cmd = raw.strip()
+        if not cmd:
+            continue
+
+        if cmd.startswith("앞으로"):
+            parts = cmd.split()
+            steps = 1
+            if len(parts) > 1:
+                num = parts[1]
+                if num.endswith("칸"):
+                    num = num[:-1]
+                if num.isdigit():
+                    steps = int(num)
+            for _ in range(steps):
+                tmp = move_forward(pos, direction, 1)
+                if tmp is None or tmp in s['obstacles']:
+                    outcome = OUTCOME_CRASH
+                    failed = True
+                    break
+                pos = tmp
+
+        elif cmd in ("왼쪽으로 이동", "오른쪽으로 이동", "뒤로 이동"):
+            turn = {"왼쪽으로 이동": -1, "오른쪽으로 이동": 1, "뒤로 이동": 2}[cmd]
+            tmp = move_forward(pos, DIRECTIONS[(DIRECTIONS.index(direction) + turn) % 4], 1)
+            if tmp is None or tmp in s['obstacles']:
+                outcome = OUTCOME_CRASH
+                failed = True
+                break
+            pos = tmp
+
+        elif cmd in ("왼쪽 회전", "오른쪽 회전"):
+            direction = rotate(direction, cmd)
+
+        elif cmd == "집기" and pos in s['goals']:
+            visited_goals.add(pos)
+
+        if failed:
+            break
+
+        if ghost:
+            ghost = move_ghost(ghost, pos, s['obstacles'],
+                               ignore_obstacles=LEVELS[s['level']].get('ignore_obstacles', False))
+            ghost_path.append(ghost)
+            if pos == ghost:
+                outcome = OUTCOME_CAUGHT
+                break
+
+        frames.append((pos, direction, ghost))
+
+        if s['portals'] and pos in s['portals']:
+            dest = [p for p in s['portals'] if p != pos][0]
+            around = [(dest[0] + d[0], dest[1] + d[1]) for d in MOVE_OFFSET.values()]
+            rng.shuffle(around)
+            for a in around:
+                if 0 <= a[0] < MAP_SIZE and 0 <= a[1] < MAP_SIZE and a not in s['obstacles']:
+                    pos = a
+                    break
+
+    return {
+        'outcome': outcome,
+        'position': pos,
+        'direction': direction,
+        'ghost': ghost,
+        'ghost_path': ghost_path,
+        'visited_goals': visited_goals,
+        'score': len(visited_goals) * LEVELS[s['level']]['score'] if outcome == OUTCOME_CLEAR else 0,
+        'frames': frames,
+    }
+
+
+def level_state(level_name, seed):
+    s = new_map_state(level_name, seed)
+    s['level'] = level_name
+    return s
+
+
+def random_script(rng):
+    return "\n".join(rng.choice(LINES) for _ in range(rng.randint(0, 25)))
+
+
+@pytest.mark.parametrize("level_name", LEVEL_NAMES)
+def test_simulate_matches_legacy_loop(level_name):
+    rng = random.Random(level_name)
+    outcomes = set()
+    for k in range(1600):
+        s = level_state(level_name, rng.getrandbits(32))
+        text = random_script(rng)
+        # 예전 화면은 정리된 줄 목록("앞" -> "앞으로")을 돌렸다
+        lines = list(compile_commands(text)[1])
+        want = legacy_run(s, lines, random.Random(k))
+        got = simulate(s, s, text, record=True, rng=random.Random(k))
+        frames = list(iter_frames(got.pop('trajectory')))
+        assert got == {key: value for key, value in want.items() if key != 'frames'}, text
+        assert frames == want['frames'], text
+        outcomes.add(got['outcome'])
+    assert OUTCOME_CRASH in outcomes and OUTCOME_CLEAR in outcomes
+    if LEVELS[level_name]['ghost']:
+        assert OUTCOME_CAUGHT in outcomes
+
+
+def portal_map():
+    # (5, 4) 에서 위로 한 칸 가면 포탈 (4, 4) -> (1, 1) 둘레 4칸 중 하나에 난수로 떨어진다. 목표는 그중 한 칸
+    s = level_state(LEVEL_NAMES[4], 0)
+    s.update({
+        'ghost': None,
+        'obstacles': set(),
+        'portals': [(4, 4), (1, 1)],
+        'goals': [(0, 1)],
+        'position': (5, 4),
+        'direction': 'UP',
+    })
+    return s
+
+
+def test_simulate_batch_seeds_each_script():
+    s = portal_map()
+    scripts = ["앞으로\n집기", "왼쪽 회전\n오른쪽 회전", "앞으로\n집기", "앞으로\n앞으로"]
+    results = simulate_batch(s, s, scripts, seed=7)
+    assert results == simulate_batch(s, s, scripts, seed=7)
+    # 하나만 다시 돌려도 같은 결과
+    for i, script in enumerate(scripts):
+        alone = simulate(s, s, script, rng=script_rng(7, i))
+        assert (results[i]['outcome'], results[i]['score']) == (alone['outcome'], alone['score'])
+
+
+def test_simulate_batch_earlier_scripts_do_not_shift_portals():
+    s = portal_map()
+    scores = set()
+    for seed in range(40):
+        # 앞 스크립트가 포탈을 타서 난수를 쓰든 말든 뒤 스크립트의 도착 칸은 같다
+        with_portal = simulate_batch(s, s, ["앞으로", "앞으로\n집기"], seed=seed)
+        without = simulate_batch(s, s, ["오른쪽 회전", "앞으로\n집기"], seed=seed)
+        assert with_portal[1] == without[1]
+        scores.add(without[1]['score'])
+    assert scores == {0, LEVELS[LEVEL_NAMES[4]]['score']}
+
+
+def test_simulate_batch_counts_steps():
+    s = level_state(LEVEL_NAMES[0], 3)
+    results = simulate_batch(s, s, ["앞으로\n집기", ["왼쪽 회전", "집기", "집기"], ""])
+    assert [r['steps'] for r in results] == [2, 3, 0]
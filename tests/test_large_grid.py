@@ -0,0 +1,101 @@
+# large_grid / engine.simulate_board: 큰 맵 모드가 9x9 게임과 같은 규칙으로 도는지
+import random
+
+import numpy as np
+import pytest
+
+from engine import simulate, simulate_board, OUTCOME_CLEAR, OUTCOME_CRASH, OUTCOME_CAUGHT
+from game_core import LEVELS, LEVEL_NAMES
+from large_grid import (
+    distance_field, python_distance_field, generate_large_map, new_board_state, reachable,
+    ghost_count, spawn_ghosts, step_ghosts, ghost_hits, python_step_ghosts,
+)
+
+LINES = [
+    "앞으로", "앞으로 2", "앞으로 3칸", "왼쪽으로 이동", "오른쪽으로 이동", "뒤로 이동",
+    "왼쪽 회전", "오른쪽 회전", "집기",
+]
+
+
+def as_small_map(big):
+    """9x9 큰 맵 상태 -> engine.simulate 가 받는 맵 상태"""
+    board = big['board']
+    return {
+        'level': big['level'],
+        'obstacles': set(map(tuple, np.argwhere(board['blocked']).tolist())),
+        'goals': [tuple(g) for g in board['goals'].tolist()],
+        'portals': [tuple(p) for p in board['portals'].tolist()],
+        'position': big['position'],
+        'direction': big['direction'],
+        'ghost': tuple(big['ghosts'][0].tolist()) if len(big['ghosts']) else None,
+    }
+
+
+@pytest.mark.parametrize("level_name", LEVEL_NAMES)
+def test_simulate_board_matches_simulate(level_name):
+    rng = random.Random(level_name)
+    outcomes = set()
+    for k in range(300):
+        big = new_board_state(level_name, 9, seed=k)
+        s = as_small_map(big)
+        script = "\n".join(rng.choice(LINES) for _ in range(rng.randint(0, 30)))
+        want = simulate(s, s, script, rng=random.Random(k))
+        got = simulate_board(big['board'], big, script, rng=random.Random(k))
+        for key in ('outcome', 'position', 'direction', 'visited_goals', 'score'):
+            assert got[key] == want[key], (key, script)
+        # 9x9 에서는 귀신 레벨이라도 한 마리
+        assert [tuple(g) for g in got['ghosts'].tolist()] == ([want['ghost']] if want['ghost'] else [])
+        outcomes.add(got['outcome'])
+    assert outcomes == ({OUTCOME_CLEAR, OUTCOME_CRASH, OUTCOME_CAUGHT} if LEVELS[level_name]['ghost'] else {OUTCOME_CLEAR, OUTCOME_CRASH})
+
+
+@pytest.mark.parametrize("size", [2, 9, 64, 200])
+def test_distance_field_matches_python_bfs(size):
+    for seed in range(3):
+        board = generate_large_map(size, LEVEL_NAMES[2], seed=seed)
+        assert np.array_equal(distance_field(board, board['start']), python_distance_field(board, board['start']))
+
+
+def test_large_map_free_cells_are_connected():
+    board = generate_large_map(128, LEVEL_NAMES[4], seed=1)
+    assert np.array_equal(reachable(board), ~board['blocked'])
+    assert not board['blocked'][tuple(board['goals'].T)].any()
+    assert len(board['portals']) == 2
+
+
+# ----------------------------- 귀신 여럿 ----------------------------- #
+def test_ghost_count_from_levels():
+    assert [ghost_count(name, 512) for name in LEVEL_NAMES] == [0, 0, 0, 131, 175]
+    assert ghost_count(LEVEL_NAMES[3], 9) == 1
+    big = new_board_state(LEVEL_NAMES[4], 256, seed=3)
+    assert big['ghosts'].shape == (ghost_count(LEVEL_NAMES[4], 256), 2)
+    assert not big['board']['blocked'][tuple(big['ghosts'].T)].any()
+
+
+@pytest.mark.parametrize("level_name", LEVEL_NAMES[3:])
+def test_step_ghosts_matches_one_by_one(level_name):
+    board = generate_large_map(128, level_name, seed=5)
+    ignore_obstacles = LEVELS[level_name].get('ignore_obstacles', False)
+    ghosts = spawn_ghosts(board, 400, seed=5)
+    slow = [tuple(g) for g in ghosts.tolist()]
+    rng = np.random.default_rng(5)
+    free = np.argwhere(~board['blocked'])
+    for target in map(tuple, free[rng.integers(len(free), size=60)].tolist()):
+        ghosts = step_ghosts(board, ghosts, target, ignore_obstacles)
+        slow = python_step_ghosts(board, slow, target, ignore_obstacles)
+        assert [tuple(g) for g in ghosts.tolist()] == slow
+        assert ghost_hits(ghosts, target).any() == (target in slow)
+
+
+def test_simulate_board_with_many_ghosts():
+    big = new_board_state(LEVEL_NAMES[4], 64, seed=2)
+    assert len(big['ghosts']) == 3
+    # 귀신 하나를 로봇 바로 아래에 두면 제자리 회전 한 번에 잡힌다
+    r, c = big['position']
+    below = (r + 1, c) if r + 1 < 64 else (r - 1, c)
+    big['ghosts'] = np.vstack([big['ghosts'], [below]])
+    run = simulate_board(big['board'], big, "왼쪽 회전")
+    assert run['outcome'] == OUTCOME_CAUGHT and run['score'] == 0
+    assert len(run['ghosts']) == 4
+    # 시작 상태의 귀신 배열은 그대로
+    assert tuple(big['ghosts'][-1].tolist()) == below
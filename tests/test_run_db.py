@@ -0,0 +1,167 @@
+# run_db: 예전 DB 마이그레이션, 핫 쿼리 플랜, 통계 집계
+import math
+
+import pytest
+from conftest import write_legacy_db
+
+import run_db
+
+
+def test_legacy_db_migrates_in_place(db_path):
+    records = write_legacy_db(db_path, 3000)
+    conn = run_db.get_conn(db_path)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == run_db.SCHEMA_VERSION == 7
+    assert conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == len(records)
+    # 5단계: commands 가 전부 바이너리로 바뀌고, 풀면 원래 텍스트
+    assert conn.execute("SELECT COUNT(*) FROM runs WHERE typeof(commands) = 'text'").fetchone()[0] == 0
+    decoded = [row[0] for row in conn.execute("SELECT decode_commands(commands) FROM runs ORDER BY id")]
+    assert decoded == [r[4] for r in records]
+
+
+def test_hot_queries_use_indexes(db_path):
+    write_legacy_db(db_path, 3000)
+    conn = run_db.get_conn(db_path)
+    assert run_db.check_query_plans(conn)
+
+
+def test_user_stats_rebuilt_from_runs(db_path):
+    records = write_legacy_db(db_path, 3000)
+    conn = run_db.get_conn(db_path)
+
+    n_users = conn.execute("SELECT COUNT(DISTINCT user_id) FROM runs").fetchone()[0]
+    assert conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0] == n_users
+    # 가장 최근 STATS_WINDOW 판이 최신순으로
+    user = records[-1][0]
+    mine = sorted((r for r in records if r[0] == user), key=lambda r: r[1], reverse=True)
+    recent = "".join(str(r[5]) for r in mine[:run_db.STATS_WINDOW])
+    stats = run_db.get_user_stats(conn, user)
+    assert stats["n"] == len(recent)
+    assert stats["success_rate"] == recent.count("1") / len(recent)
+    assert stats["last_diff"] == mine[0][3]
+
+
+def test_rebuild_matches_live_upserts(db_path):
+    # 같은 초에 여러 판이 들어와도 rebuild 가 upsert 와 같은 순서(넣은 순서)로 센다
+    import random
+
+    rng = random.Random(0)
+    writer = run_db.RunWriter(db_path)
+    try:
+        for i in range(600):
+            level_i = rng.randrange(5)
+            writer.log_run(f"u{rng.randrange(4)}", f"Level {level_i + 1}", level_i + 1, "앞으로", rng.randint(0, 1), 1, 1)
+        writer.flush()
+    finally:
+        writer.close()
+    conn = run_db.get_conn(db_path)
+    same_second = conn.execute("SELECT MAX(n) FROM (SELECT COUNT(*) AS n FROM runs GROUP BY user_id, run_time)").fetchone()[0]
+    assert same_second > 1
+
+    def snapshot():
+        return conn.execute("SELECT * FROM user_stats ORDER BY user_id").fetchall()
+
+    live = snapshot()
+    with run_db._write_lock, conn:
+        run_db.rebuild_user_stats(conn)
+    assert snapshot() == live
+
+
+def test_migrate_is_idempotent(db_path):
+    write_legacy_db(db_path, 10)
+    conn = run_db.get_conn(db_path)
+    assert run_db.migrate(conn) == run_db.SCHEMA_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0] > 0
+
+
+# ----------------------------- 통계 집계 ----------------------------- #
+def pandas_aggregates(df):
+    """SQL 로 옮기기 전 통계 화면이 pandas 로 계산하던 값 (한 줄이면 표준편차를 0 으로 보여 줬다)"""
+    return {
+        "n": len(df),
+        "steps_mean": df["steps"].mean(),
+        "steps_std": df["steps"].std(ddof=1) if len(df) > 1 else 0.0,
+        "success_rate": df["success"].mean(),
+    }
+
+
+def assert_same(got, want):
+    assert got.keys() == want.keys()
+    for key, value in want.items():
+        if value != value:  # NaN
+            assert got[key] != got[key], key
+        else:
+            assert math.isclose(got[key], value, rel_tol=1e-9, abs_tol=1e-12), key
+
+
+def add_runs(conn, rows):
+    """(user_id, level, success, steps) 목록을 기록 (steps 는 None 이어도 된다)"""
+    with run_db._write_lock, conn:
+        run_db.insert_runs(conn, [
+            (user_id, f"2024-04-01T00:00:{i:02d}", level, 1, run_db.encode_commands("앞으로"), success, steps, 9)
+            for i, (user_id, level, success, steps) in enumerate(rows)
+        ])
+
+
+@pytest.fixture
+def stats_conn(db_path):
+    write_legacy_db(db_path, 3000, users=8)
+    conn = run_db.get_conn(db_path)
+    add_runs(conn, [
+        ("solo", "Level 1", 1, 7),          # 한 줄뿐
+        ("nulls", "Level 2", 1, None),       # steps 가 NULL 인 줄 섞임
+        ("nulls", "Level 2", 0, 4),
+        ("nulls", "Level 2", 1, 6),
+        ("onestep", "Level 3", 0, None),     # 두 줄 중 steps 는 하나만
+        ("onestep", "Level 3", 1, 5),
+        ("nostep", "Level 4", 1, None),      # steps 가 전부 NULL
+        ("nostep", "Level 4", 0, None),
+    ])
+    return conn
+
+
+@pytest.mark.parametrize("user_id, level", [
+    (None, None),
+    (None, "Level 1"),
+    (None, "Level 5"),
+    ("u0", None),
+    ("u3", "Level 2"),
+    ("solo", None),
+    ("nulls", None),
+    ("nulls", "Level 2"),
+    ("onestep", "Level 3"),
+    ("nostep", None),
+])
+def test_run_aggregates_match_pandas(stats_conn, user_id, level):
+    df = run_db.load_runs_df(stats_conn, user_id, level, columns=("steps", "success"))
+    assert not df.empty
+    assert_same(run_db.run_aggregates(stats_conn, user_id, level), pandas_aggregates(df))
+
+
+def test_run_aggregates_empty_filter(stats_conn):
+    assert run_db.run_aggregates(stats_conn, "nobody") is None
+    assert run_db.run_aggregates(stats_conn, "solo", "Level 2") is None
+    assert run_db.load_runs_df(stats_conn, "nobody").empty
+
+
+def test_run_aggregates_single_row(stats_conn):
+    agg = run_db.run_aggregates(stats_conn, "solo")
+    # pandas 그대로면 std(ddof=1) 은 NaN 이고, 화면은 그 경우 0 으로 보여 줬다
+    df = run_db.load_runs_df(stats_conn, "solo", columns=("steps",))
+    assert math.isnan(df["steps"].std(ddof=1))
+    assert agg == {"n": 1, "steps_mean": 7.0, "steps_std": 0.0, "success_rate": 1.0}
+
+
+def test_run_aggregates_null_steps(stats_conn):
+    agg = run_db.run_aggregates(stats_conn, "nulls")
+    assert agg["n"] == 3
+    assert agg["steps_mean"] == 5.0
+    assert math.isclose(agg["steps_std"], 2 ** 0.5)
+    # 두 줄인데 steps 가 하나뿐 / 전부 NULL 이면 pandas 처럼 NaN
+    assert math.isnan(run_db.run_aggregates(stats_conn, "onestep")["steps_std"])
+    nostep = run_db.run_aggregates(stats_conn, "nostep")
+    assert math.isnan(nostep["steps_mean"]) and math.isnan(nostep["steps_std"])
+
+
+def test_check_aggregates(stats_conn):
+    assert run_db.check_aggregates(stats_conn) > 0
@@ -0,0 +1,126 @@
+# run_db.RunWriter: 큐가 넘칠 때 버리기, 실패 뒤 다시 쓰기, flush / close 가 큐를 비우는지
+import sqlite3
+import threading
+
+import pytest
+
+import run_db
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def log(writer, i=0):
+    return writer.log_run(f"u{i % 3}", "Level 1", 1, "앞으로\n집기", i % 2, 2, 2)
+
+
+@pytest.fixture
+def writers():
+    made = []
+    yield made
+    for writer in made:
+        writer.close()
+
+
+def make_writer(writers, path, **kwargs):
+    writer = run_db.RunWriter(path, **kwargs)
+    writers.append(writer)
+    return writer
+
+
+def test_flush_writes_everything(db_path, writers):
+    writer = make_writer(writers, db_path, flush_interval=0.01)
+    assert all(log(writer, i) for i in range(1200))
+    writer.flush()
+    stats = writer.stats()
+    assert stats["written"] == 1200 and stats["pending"] == 0
+    assert stats["batches"] >= 1200 // writer.batch_size
+    assert count_rows(db_path) == 1200
+    # user_stats 도 같은 트랜잭션으로 갱신된다
+    assert run_db.get_user_stats(run_db.get_conn(db_path), "u0")["n"] == run_db.STATS_WINDOW
+
+
+def test_burst_over_max_queue_is_dropped_and_counted(db_path, writers, monkeypatch):
+    gate = threading.Event()
+    insert = run_db.insert_runs
+
+    def slow_insert(conn, records):
+        gate.wait()
+        insert(conn, records)
+
+    monkeypatch.setattr(run_db, "insert_runs", slow_insert)
+    writer = make_writer(writers, db_path, max_queue=50, batch_size=10, flush_interval=0.01)
+    accepted = sum(log(writer, i) for i in range(500))
+    gate.set()
+    writer.flush()
+    stats = writer.stats()
+    assert stats["dropped"] == 500 - accepted
+    # 쓰기 스레드가 들고 있는 한 묶음 + 가득 찬 큐까지만 받는다
+    assert accepted <= 50 + 10
+    assert stats["written"] == accepted == count_rows(db_path)
+
+
+def test_locked_database_is_retried(db_path, writers, monkeypatch):
+    insert = run_db.insert_runs
+    calls = []
+
+    def flaky_insert(conn, records):
+        calls.append(len(records))
+        if len(calls) <= 2:
+            raise sqlite3.OperationalError("database is locked")
+        insert(conn, records)
+
+    monkeypatch.setattr(run_db, "insert_runs", flaky_insert)
+    writer = make_writer(writers, db_path, flush_interval=0.05, retry_delays=(0.01, 0.01, 0.01))
+    for i in range(20):
+        log(writer, i)
+    writer.flush()
+    stats = writer.stats()
+    assert stats["retried"] == 2
+    assert stats["failed"] == 0
+    assert stats["written"] == 20 == count_rows(db_path)
+
+
+def test_failure_after_retries_counts_and_keeps_thread_alive(db_path, writers, monkeypatch):
+    insert = run_db.insert_runs
+    broken = [sqlite3.OperationalError("database is locked")]
+
+    def failing_insert(conn, records):
+        if broken:
+            raise broken[0]
+        insert(conn, records)
+
+    monkeypatch.setattr(run_db, "insert_runs", failing_insert)
+    writer = make_writer(writers, db_path, flush_interval=0.01, retry_delays=(0.01, 0.01))
+    log(writer)
+    writer.flush()
+    assert writer.stats()["failed"] == 1
+    assert writer.stats()["retried"] == 2
+
+    # sqlite3.Error 가 아닌 예외도 스레드를 죽이지 않는다 (죽으면 flush 가 끝나지 않는다)
+    broken[0] = RuntimeError("boom")
+    log(writer)
+    writer.flush()
+    assert writer.stats()["failed"] == 2
+
+    broken.clear()
+    log(writer)
+    writer.flush()
+    assert writer.stats()["written"] == 1 == count_rows(db_path)
+
+
+def test_close_drains_queue_and_rejects_later_runs(db_path, writers):
+    writer = make_writer(writers, db_path, flush_interval=1.0)
+    for i in range(300):
+        log(writer, i)
+    writer.close()
+    assert count_rows(db_path) == 300
+    assert writer.stats()["pending"] == 0
+    assert log(writer) is False
+    assert writer.stats()["dropped"] == 1
+    writer.close()  # 두 번 불러도 된다
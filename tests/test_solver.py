@@ -0,0 +1,148 @@
+# solver: 풀이기가 낸 명령어를 engine 으로 다시 돌렸을 때 실제로 끝나는지
+import random
+
+import pytest
+
+from engine import simulate, OUTCOME_CLEAR
+from game_core import LEVEL_NAMES, new_map_state
+from solver import solve, map_solution, is_perfect, hint_plan, plan_with_ghost, portal_plan
+
+
+def level_state(level_name, seed):
+    s = new_map_state(level_name, seed)
+    s['level'] = level_name
+    s['ghost'] = None  # 풀이기는 귀신을 고려하지 않는다
+    return s
+
+
+def play_solutions(s, rng, limit=40):
+    """map_solution 의 명령어를 돌리고, 포탈로 튄 곳에서 남은 목표로 다시 풀기를 반복한다. 쓴 명령 수"""
+    here = dict(s)
+    remaining = list(s['goals'])
+    total = 0
+    for _ in range(limit):
+        if not remaining:
+            return total
+        here.update({'goals': remaining, 'solutions': {}})
+        solution = map_solution(here)
+        assert solution is not None
+        run = simulate(here, here, solution['program'], rng=rng)
+        assert run['outcome'] == OUTCOME_CLEAR
+        total += len(solution['program'])
+        remaining = [g for g in remaining if g not in run['visited_goals']]
+        here.update({'position': run['position'], 'direction': run['direction']})
+    raise AssertionError("끝나지 않음")
+
+
+@pytest.mark.parametrize("level_name", LEVEL_NAMES)
+def test_solve_program_clears_map(level_name):
+    solved = 0
+    for seed in range(150):
+        s = level_state(level_name, seed)
+        solution = solve(s['position'], s['direction'], s['obstacles'], s['goals'], s['portals'])
+        if solution is None:
+            continue  # 포탈을 타야만 끝나는 맵 (아래에서)
+        solved += 1
+        run = simulate(s, s, solution['program'], rng=random.Random(seed))
+        assert run['outcome'] == OUTCOME_CLEAR
+        assert run['visited_goals'] == set(s['goals'])
+        assert solution['steps'] == len(solution['program'])
+        assert is_perfect(s, solution['steps'], run['visited_goals'])
+        assert not is_perfect(s, solution['steps'] + 1, run['visited_goals'])
+    assert solved > 100
+
+
+def test_portal_only_maps_get_an_optimum():
+    level_name = LEVEL_NAMES[4]
+    portal_only = 0
+    for seed in range(400):
+        s = level_state(level_name, seed)
+        if solve(s['position'], s['direction'], s['obstacles'], s['goals'], s['portals']) is not None:
+            continue
+        portal_only += 1
+        solution = map_solution(s)
+        assert solution is not None and solution['branches'] > 0
+        assert is_perfect(s, solution['steps'], set(s['goals']))
+        # 도착 칸이 무작위라도 다시 풀기를 이어 가면 끝난다
+        for k in range(5):
+            play_solutions(s, random.Random(k))
+    assert portal_only > 10
+
+
+# ----------------------------- 귀신을 피하는 계획 ----------------------------- #
+@pytest.mark.parametrize("level_name", LEVEL_NAMES[3:])
+def test_hint_plan_clears_without_being_caught(level_name):
+    planned = 0
+    for seed in range(120):
+        s = new_map_state(level_name, seed)
+        s['level'] = level_name
+        plan, stats = hint_plan(s, time_ms=10_000)
+        if plan is None:
+            assert not stats['exhausted']
+            continue
+        planned += 1
+        run = simulate(s, s, plan['program'], rng=random.Random(seed))
+        assert run['outcome'] == OUTCOME_CLEAR, plan['program']
+        assert run['visited_goals'] == set(s['goals'])
+        assert plan['steps'] == len(plan['program'])
+        # 귀신은 길을 줄이기만 한다
+        solution = solve(s['position'], s['direction'], s['obstacles'], s['goals'], s['portals'])
+        assert solution is not None and plan['steps'] >= solution['steps']
+    assert planned > 80
+
+
+def test_plan_without_ghost_matches_solve():
+    for seed in range(60):
+        s = level_state(LEVEL_NAMES[2], seed)
+        plan, _ = plan_with_ghost(s['position'], s['direction'], None, s['obstacles'], s['goals'], s['portals'])
+        solution = solve(s['position'], s['direction'], s['obstacles'], s['goals'], s['portals'])
+        assert plan['steps'] == solution['steps']
+
+
+# ----------------------------- 포탈을 쓰는 계획 ----------------------------- #
+# 포탈 (4, 4) 에서 명령이 끝나면 (1, 1) 둘레 4칸 중 하나로 튄다. 목표는 그중 (0, 1).
+# (0, 4) 가 막혀 있어서 포탈 없이는 최소 5개
+#   (0, 1) 집기 / (2, 1) 앞으로 2칸, 집기 / (1, 0) 앞으로, 오른쪽으로 이동, 집기 / (1, 2) 앞으로, 왼쪽으로 이동, 집기
+# 포탈로 가는 1개를 더하면 최악 1 + 3 = 4, 평균 1 + (1 + 2 + 3 + 3) / 4 = 3.25
+SMALL_OBSTACLES = frozenset({(0, 4)})
+SMALL_GOALS = ((0, 1),)
+SMALL_PORTALS = ((4, 4), (1, 1))
+
+
+def test_portal_plan_small_map():
+    assert solve((5, 4), 'UP', SMALL_OBSTACLES, SMALL_GOALS, SMALL_PORTALS)['steps'] == 5
+    plan = portal_plan((5, 4), 'UP', SMALL_OBSTACLES, SMALL_GOALS, SMALL_PORTALS)
+    assert plan['worst'] == {'steps': 4, 'program': ['앞으로'], 'branches': 4}
+    assert plan['expected']['program'] == ['앞으로'] and plan['expected']['branches'] == 4
+    assert plan['expected']['steps'] == pytest.approx(3.25)
+
+
+def test_portal_plan_turns_on_a_portal_are_chance_nodes():
+    # 포탈 위에서 회전만 해도 명령이 끝날 때 튄다. 왼쪽을 보고 떨어지면 1 / 3 / 3 / 3개 더
+    plan = portal_plan((4, 4), 'UP', frozenset(), SMALL_GOALS, SMALL_PORTALS)
+    assert plan['expected']['program'] == ['왼쪽 회전'] and plan['expected']['branches'] == 4
+    assert plan['expected']['steps'] == pytest.approx(3.5)
+    assert plan['worst']['steps'] == 4
+
+
+def test_portal_plan_replayed_through_engine():
+    s = level_state(LEVEL_NAMES[4], 0)
+    s.update({'obstacles': set(SMALL_OBSTACLES), 'goals': list(SMALL_GOALS), 'portals': list(SMALL_PORTALS),
+              'position': (5, 4), 'direction': 'UP'})
+    totals = []
+    for k in range(400):
+        rng = random.Random(k)
+        here = dict(s)
+        total = 0
+        while True:
+            plan = portal_plan(here['position'], here['direction'], SMALL_OBSTACLES, SMALL_GOALS, SMALL_PORTALS)['expected']
+            run = simulate(here, here, plan['program'], rng=rng)
+            assert run['outcome'] == OUTCOME_CLEAR
+            total += len(plan['program'])
+            if run['visited_goals']:
+                break
+            here.update({'position': run['position'], 'direction': run['direction']})
+        totals.append(total)
+    assert set(totals) == {2, 3, 4}
+    assert max(totals) == 4
+    assert sum(totals) / len(totals) == pytest.approx(3.25, abs=0.15)